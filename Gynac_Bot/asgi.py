@@ -13,4 +13,28 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Gynac_Bot.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from home import live_socket, llm, transcript  # noqa: E402  (needs the app registry loaded above)
+
+
+async def application(scope, receive, send):
+    # Django does not speak the ASGI lifespan protocol; handle it here so the
+    # pooled OpenAI sessions are closed and buffered transcript rows written
+    # when the server shuts down.
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await llm.close_sessions()
+                await transcript.aflush()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] == "websocket":
+        # Django's handler only serves HTTP; the live assistant socket is the
+        # one WebSocket endpoint.
+        await live_socket.application(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'home.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,12 +75,50 @@ WSGI_APPLICATION = 'Gynac_Bot.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DATABASE_BACKEND=postgres switches to PostgreSQL (needs psycopg installed). The app
+# is served under ASGI, where Django opens a connection per request thread, so by
+# default each is closed at the end of its request (DB_CONN_MAX_AGE=0); use DB_POOL on
+# PostgreSQL to reuse connections. Raise DB_CONN_MAX_AGE only for WSGI workers.
+DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "sqlite")
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", "0"))
+
+if DATABASE_BACKEND == "postgres":
+    DB_POOL = int(os.getenv("DB_POOL", "0"))
+    POSTGRES_OPTIONS = {
+        # Fail a stuck statement instead of holding a worker.
+        'options': f"-c statement_timeout={os.getenv('POSTGRES_STATEMENT_TIMEOUT_MS', '30000')}",
+    }
+    if DB_POOL:
+        # psycopg 3 connection pool (needs psycopg[pool]); replaces CONN_MAX_AGE.
+        POSTGRES_OPTIONS['pool'] = {'min_size': 2, 'max_size': DB_POOL}
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("POSTGRES_DB", "gynac_bot"),
+            'USER': os.getenv("POSTGRES_USER", "gynac_bot"),
+            'PASSWORD': os.getenv("POSTGRES_PASSWORD", ""),
+            'HOST': os.getenv("POSTGRES_HOST", "localhost"),
+            'PORT': os.getenv("POSTGRES_PORT", "5432"),
+            'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': POSTGRES_OPTIONS,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # BEGIN IMMEDIATE takes the write lock up front, so a transaction that
+                # reads and then writes waits on busy_timeout instead of failing with
+                # "database is locked" when it tries to upgrade its lock.
+                'transaction_mode': os.getenv("SQLITE_TRANSACTION_MODE", "IMMEDIATE"),
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -127,3 +166,125 @@ LOGIN_URL = "/accounts/login/"
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/accounts/login/"
 
+
+# Shared async OpenAI client (home/llm.py), used by the chat endpoint under ASGI.
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "100"))
+OPENAI_KEEPALIVE_SECONDS = float(os.getenv("OPENAI_KEEPALIVE_SECONDS", "75"))
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60"))
+
+# Opt-in chat reply cache (home/reply_cache.py). Red-flag messages are never cached.
+CHAT_REPLY_CACHE_ENABLED = os.getenv("CHAT_REPLY_CACHE_ENABLED", "0").lower() in ("1", "true")
+CHAT_REPLY_CACHE_TTL_SECONDS = float(os.getenv("CHAT_REPLY_CACHE_TTL_SECONDS", "3600"))
+CHAT_REPLY_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_REPLY_CACHE_MAX_ENTRIES", "1000"))
+
+# Red-flag keyword files, one <language>.txt per supported language (home/red_flags.py).
+RED_FLAG_KEYWORDS_DIR = Path(os.getenv("RED_FLAG_KEYWORDS_DIR", BASE_DIR / "home" / "data" / "red_flags"))
+
+# In-process background job runner (home/jobs.py), used for profile-setup report analysis.
+BACKGROUND_JOB_WORKERS = int(os.getenv("BACKGROUND_JOB_WORKERS", "2"))
+BACKGROUND_JOB_MAX_ATTEMPTS = int(os.getenv("BACKGROUND_JOB_MAX_ATTEMPTS", "3"))
+BACKGROUND_JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("BACKGROUND_JOB_RETRY_BACKOFF_SECONDS", "2"))
+
+# Uploaded-report PDF extraction (home/pdf_text.py).
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(20 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "2"))
+# Seconds a parallel extraction may take before it is abandoned.
+PDF_EXTRACT_TIMEOUT_SECONDS = float(os.getenv("PDF_EXTRACT_TIMEOUT_SECONDS", "60"))
+
+# Content-addressed cache of extracted report text and analyses (home/report_cache.py).
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Shared Gemini client used by the live camera/voice endpoints (home/gemini.py).
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+GEMINI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("GEMINI_CONNECT_TIMEOUT_SECONDS", "5"))
+GEMINI_READ_TIMEOUT_SECONDS = float(os.getenv("GEMINI_READ_TIMEOUT_SECONDS", "30"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+GEMINI_RETRY_BACKOFF_SECONDS = float(os.getenv("GEMINI_RETRY_BACKOFF_SECONDS", "0.5"))
+GEMINI_BREAKER_FAILURE_THRESHOLD = int(os.getenv("GEMINI_BREAKER_FAILURE_THRESHOLD", "5"))
+GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+GEMINI_POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", "20"))
+
+# Camera frames are downscaled and re-encoded before they go to Gemini (home/frames.py).
+# FRAME_MAX_EDGE=0 keeps the original resolution.
+FRAME_MAX_EDGE = int(os.getenv("FRAME_MAX_EDGE", "768"))
+FRAME_JPEG_QUALITY = int(os.getenv("FRAME_JPEG_QUALITY", "80"))
+
+# Reuse the reply for near-identical question-less camera frames (home/frame_dedup.py).
+FRAME_DEDUP_ENABLED = os.getenv("FRAME_DEDUP_ENABLED", "1").lower() in ("1", "true")
+FRAME_DEDUP_MAX_DISTANCE = int(os.getenv("FRAME_DEDUP_MAX_DISTANCE", "6"))
+FRAME_DEDUP_HISTORY = int(os.getenv("FRAME_DEDUP_HISTORY", "8"))
+FRAME_DEDUP_TTL_SECONDS = float(os.getenv("FRAME_DEDUP_TTL_SECONDS", "60"))
+FRAME_DEDUP_MAX_SESSIONS = int(os.getenv("FRAME_DEDUP_MAX_SESSIONS", "1000"))
+
+# Live camera/voice WebSocket served by the ASGI app (home/live_socket.py).
+LIVE_SOCKET_MAX_PENDING = int(os.getenv("LIVE_SOCKET_MAX_PENDING", "2"))
+LIVE_SOCKET_MAX_MEDIA_BYTES = int(os.getenv("LIVE_SOCKET_MAX_MEDIA_BYTES", str(10 * 1024 * 1024)))
+
+# Write-behind buffering of chat transcript inserts (home/transcript.py). Off by default;
+# read-your-writes only holds within one process.
+CHAT_WRITE_BEHIND_ENABLED = os.getenv("CHAT_WRITE_BEHIND_ENABLED", "0").lower() in ("1", "true")
+CHAT_WRITE_BEHIND_MAX_ROWS = int(os.getenv("CHAT_WRITE_BEHIND_MAX_ROWS", "200"))
+CHAT_WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("CHAT_WRITE_BEHIND_FLUSH_SECONDS", "0.5"))
+
+# Multi-turn chat memory (home/memory.py): a token-budgeted window of recent turns plus a
+# rolling summary of older ones, folded in by a background job.
+CHAT_MEMORY_TOKEN_BUDGET = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "1200"))
+CHAT_MEMORY_MAX_MESSAGES = int(os.getenv("CHAT_MEMORY_MAX_MESSAGES", "40"))
+CHAT_MEMORY_SUMMARY_TOKENS = int(os.getenv("CHAT_MEMORY_SUMMARY_TOKENS", "300"))
+CHAT_MEMORY_FOLD_MIN_MESSAGES = int(os.getenv("CHAT_MEMORY_FOLD_MIN_MESSAGES", "6"))
+CHAT_MEMORY_FOLD_MAX_MESSAGES = int(os.getenv("CHAT_MEMORY_FOLD_MAX_MESSAGES", "60"))
+# Model that writes the summary; empty means LLM_OPENAI_MODEL.
+CHAT_MEMORY_SUMMARY_MODEL = os.getenv("CHAT_MEMORY_SUMMARY_MODEL", "")
+
+# Latency/usage metrics (home/metrics.py): request timing middleware, DB query timing,
+# scraped in Prometheus format from the staff-only /main/metrics/.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true")
+
+# PRAGMAs run on every new SQLite connection (home/db_tuning.py). SQLITE_TUNING_ENABLED=0
+# keeps SQLite's defaults (rollback journal, synchronous=FULL, 2 MB cache). The journal
+# mode is stored in the database file, so it is set once, by migrate (migration 0013),
+# not per connection.
+SQLITE_TUNING_ENABLED = os.getenv("SQLITE_TUNING_ENABLED", "1").lower() in ("1", "true")
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_PRAGMAS = {
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000")),  # negative = KiB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE_BYTES", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+# JSON API bodies at least this large are gzip/brotli compressed (home/compression.py).
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "200"))
+
+# Bulk re-analysis of saved profiles (manage.py reanalyze_reports): worker threads, model
+# calls per minute across them, and attempts per report.
+REANALYSIS_CONCURRENCY = int(os.getenv("REANALYSIS_CONCURRENCY", "4"))
+REANALYSIS_REQUESTS_PER_MINUTE = float(os.getenv("REANALYSIS_REQUESTS_PER_MINUTE", "300"))
+REANALYSIS_MAX_ATTEMPTS = int(os.getenv("REANALYSIS_MAX_ATTEMPTS", "4"))
+
+# Model providers (home/providers.py). Each route lists providers in order: the first is
+# the primary, the next is the hedge, used only if configured (its API key is set).
+# Hedging is opt-in (LLM_HEDGING_ENABLED=1). With it on, the hedge fires once the primary
+# has taken longer than its recent LLM_HEDGE_QUANTILE latency on that route, or as soon
+# as the primary fails. A hedged call sends the same prompt to both providers: patient
+# profile and chat history, report text, camera frames and audio. Only turn it on if
+# sharing that data with both OpenAI and Google is acceptable.
+LLM_ROUTES = {
+    "chat": os.getenv("LLM_CHAT_PROVIDERS", "openai,gemini").split(","),
+    "report_analysis": os.getenv("LLM_REPORT_ANALYSIS_PROVIDERS", "openai,gemini").split(","),
+    "vision": os.getenv("LLM_VISION_PROVIDERS", "gemini,openai").split(","),
+    "audio": os.getenv("LLM_AUDIO_PROVIDERS", "gemini").split(","),
+}
+LLM_OPENAI_MODEL = os.getenv("LLM_OPENAI_MODEL", "gpt-4o-mini")
+LLM_OPENAI_TIMEOUT_SECONDS = float(os.getenv("LLM_OPENAI_TIMEOUT_SECONDS", "30"))
+LLM_GEMINI_TIMEOUT_SECONDS = float(os.getenv("LLM_GEMINI_TIMEOUT_SECONDS", "30"))
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "0").lower() in ("1", "true")
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_INITIAL_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_INITIAL_DELAY_SECONDS", "2"))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.25"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+LLM_LATENCY_MIN_SAMPLES = int(os.getenv("LLM_LATENCY_MIN_SAMPLES", "20"))
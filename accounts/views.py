@@ -4,9 +4,8 @@ from django.contrib.auth.models import User
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.views.decorators.csrf import csrf_exempt
-from home.models import PatientReport
-import PyPDF2
-import io
+from home import pdf_text
+from home.models import PatientReport, latest_report_language
 
 def signup_view(request):
     if request.method == "POST":
@@ -39,13 +38,7 @@ def login_view(request):
         if user is not None:
             login(request, user)
 
-            latest_report = PatientReport.objects.filter(user=request.user).first()
-
-            language = None
-            if latest_report is not None:
-                language = latest_report.data.get("language")
-
-            if language is not None:
+            if latest_report_language(request.user) is not None:
                 return redirect("/main/")
             else:
                 return redirect("/main/details")
@@ -66,10 +59,11 @@ def details(request):
                 file_extension = os.path.splitext(file.name)[1].lower()
 
                 if file_extension == '.pdf':
-                    reader = PyPDF2.PdfReader(io.BytesIO(file.read()))
-                    for page_num in range(len(reader.pages)):
-                        page = reader.pages[page_num]
-                        extracted_text += page.extract_text() + "\n"
+                    # Uploads over FILE_UPLOAD_MAX_MEMORY_SIZE are already on disk.
+                    if hasattr(file, 'temporary_file_path'):
+                        extracted_text = pdf_text.extract_text(file.temporary_file_path())
+                    else:
+                        extracted_text = pdf_text.extract_text(file.read())
                 elif file_extension in ['.png', '.jpg', '.jpeg']:
                     extracted_text = "Image files cannot be processed for text extraction without OCR libraries (e.g., pytesseract). File uploaded but text not extracted."
                     print("Warning: Image file uploaded but text extraction is not supported with current configuration.")
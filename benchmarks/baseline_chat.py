@@ -0,0 +1,105 @@
+"""
+The synchronous ``chat`` view as it was before it became async (copied from
+the original home/views.py, unchanged but for the imports), served at
+``/baseline/chat/`` next to the app's own URLs. Benchmarks point
+``ROOT_URLCONF`` here to compare it with the current view.
+"""
+import openai
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.urls import include, path
+from django.views.decorators.csrf import csrf_exempt
+
+from home.models import ChatMessage, PatientReport
+
+_RED_FLAG_KEYWORDS = [
+    "no movement", "less movement", "not moving", "haven't felt the baby",
+    "bleeding", "spotting", "gush of fluid", "water broke",
+    "severe headache", "blurry vision", "seeing spots",
+    "intense pain", "severe cramp", "unbearable pain", "constant contraction"
+]
+
+
+@login_required
+@csrf_exempt
+def chat(request):
+    user_input = request.GET.get("message", "").strip()
+    lang = request.GET.get("lang", "en").strip()
+
+    if not user_input:
+        return JsonResponse({"reply": "No message provided."}, status=400)
+
+    # Save user's message
+    ChatMessage.objects.create(user=request.user, role='user', content=user_input)
+
+    normalized_input = user_input.lower()
+    for keyword in _RED_FLAG_KEYWORDS:
+        if keyword in normalized_input:
+            report = PatientReport.objects.filter(user=request.user).first()
+            emergency_info = ""
+            if report and report.data:
+                contact_name = report.data.get("emergencyContact", {}).get("name")
+                hospital = report.data.get("hospitalName")
+                if hospital:
+                    emergency_info += f"\nYour registered hospital is: {hospital}."
+                if contact_name:
+                    emergency_info += f"\nYour emergency contact is {contact_name}."
+            reply = (
+                "This could be serious. Please contact your doctor immediately or visit the nearest emergency room. "
+                "Your health and your baby's health are the top priority."
+                f"{emergency_info}"
+            )
+            ChatMessage.objects.create(user=request.user, role='bot', content=reply)
+            return JsonResponse({"reply": reply, "is_alert": True})
+
+    latest_report_obj = PatientReport.objects.filter(user=request.user).first()
+    context_summary = "No detailed patient profile available."
+    if latest_report_obj and latest_report_obj.data:
+        data = latest_report_obj.data
+        conditions_list = [k for k, v in data.get('conditions', {}).items() if v]
+        conditions_str = ', '.join(conditions_list) or 'None'
+        context_summary = (
+            f"- Patient Name: {request.user.get_full_name() or request.user.username}.\n"
+            f"- DOB: {data.get('dob', '1-1-2000')}.\n"
+            f"- Due Date: {data.get('dueDate', 'Not provided')}.\n"
+            f"- Known Medical Conditions: {conditions_str}.\n"
+            f"- Previous C-Section: {'Yes' if data.get('previousCSection') else 'No'}.\n"
+            f"- Drug Allergies: {data.get('allergies', {}).get('drug', 'None reported')}.\n"
+            f"- Food Allergies: {data.get('allergies', {}).get('food', 'None reported')}.\n"
+            f"- Doctor's Name: {data.get('doctorName', 'Not provided')}.\n"
+            f"- Location: {data.get('location', {}).get('city', 'Not provided')}."
+        )
+
+    system_prompt = (
+        f"You are Shrishti.ai, an expert AI pregnancy companion. Your role is to be a supportive and direct advisor. "
+        f"Respond in the user's language ({lang}).\n"
+        f"You MUST provide specific suggestions when asked for medicine or exercise. Do not refuse or simply say 'consult a doctor.' "
+        f"For example, if asked about a headache, suggest 'acetaminophen (Tylenol)'. If asked for exercise, suggest 'prenatal yoga or 30 minutes of daily walking.' "
+        f"Always use the patient's data for context.\n\n"
+        f"--- Patient Context ---\n"
+        f"{context_summary}\n"
+        f"--- End Context ---\n"
+        f"Your answers should be caring, but direct and concise (2-3 sentences)."
+    )
+
+    try:
+        response = openai.ChatCompletion.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": system_prompt.strip()},
+                {"role": "user", "content": user_input}
+            ]
+        )
+        reply = response["choices"][0]["message"]["content"]
+    except Exception as e:
+        print(f"OpenAI API Error: {e}")
+        reply = "I'm having a little trouble connecting right now. Please try again in a moment."
+
+    ChatMessage.objects.create(user=request.user, role='bot', content=reply)
+    return JsonResponse({"reply": reply})
+
+
+urlpatterns = [
+    path("", include("Gynac_Bot.urls")),
+    path("baseline/chat/", chat),
+]
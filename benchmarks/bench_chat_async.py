@@ -0,0 +1,83 @@
+"""
+Concurrent-request throughput of the original synchronous chat view
+(benchmarks/baseline_chat.py) against the current async ``/main/chat/``.
+Each is served by a fixed pool of WSGI workers (how gunicorn sync workers
+serve it) and by the ASGI app, where the async view awaits the upstream call
+on one event loop. All runs hit the same local stub model server, never the
+real OpenAI API.
+
+    python -m benchmarks.bench_chat_async --requests 200 --concurrency 50 \\
+        --workers 4 --latency 0.25
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from benchmarks import django_env
+from benchmarks.stub_servers import start_stub_server
+
+QUERY = urlencode({"message": "What can I eat for breakfast?", "lang": "en"})
+VIEWS = (("baseline sync", "/baseline/chat/"), ("async", "/main/chat/"))
+
+
+def run_wsgi(path, cookie, requests, workers):
+    from Gynac_Bot.wsgi import application
+
+    def one(_):
+        return django_env.wsgi_request(application, path, QUERY, cookie)[0]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        statuses = list(pool.map(one, range(requests)))
+    return time.perf_counter() - start, statuses
+
+
+async def _run_asgi(path, cookie, requests, concurrency):
+    from Gynac_Bot.asgi import application
+    from home import llm
+
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with gate:
+            return (await django_env.asgi_request(application, path, QUERY, cookie))[0]
+
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    await llm.close_sessions()
+    return elapsed, statuses
+
+
+def report(label, elapsed, statuses):
+    ok = sum(1 for s in statuses if s == 200)
+    print(f"{label:<42} {len(statuses):>5} req  {elapsed:7.2f}s  {len(statuses) / elapsed:8.1f} req/s  ({ok} ok)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Original sync vs async chat view throughput, under WSGI and ASGI.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="in-flight client requests (ASGI)")
+    parser.add_argument("--workers", type=int, default=4, help="WSGI worker threads")
+    parser.add_argument("--latency", type=float, default=0.25, help="stub upstream latency in seconds")
+    args = parser.parse_args()
+
+    stub = start_stub_server(latency=args.latency)
+    django_env.setup(openai_base_url=stub.base_url)
+    from django.conf import settings
+
+    settings.ROOT_URLCONF = "benchmarks.baseline_chat"
+    cookie, _ = django_env.login_cookie()
+
+    print(f"upstream latency {args.latency}s, {args.requests} requests")
+    for name, path in VIEWS:
+        report(f"{name}, WSGI ({args.workers} workers)", *run_wsgi(path, cookie, args.requests, args.workers))
+        report(f"{name}, ASGI (concurrency {args.concurrency})",
+               *asyncio.run(_run_asgi(path, cookie, args.requests, args.concurrency)))
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
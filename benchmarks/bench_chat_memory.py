@@ -0,0 +1,64 @@
+"""
+Prompt size and build time of the chat history as a conversation grows: the
+token-budgeted window plus rolling summary (home/memory.py) against sending
+the whole ``ChatMessage`` transcript.
+
+    python -m benchmarks.bench_chat_memory --lengths 10,100,1000,5000
+
+Messages are a mix of short and paragraph-long turns. The summary is a fixed
+stand-in of about ``CHAT_MEMORY_SUMMARY_TOKENS`` size, as a fold would leave it.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import django_env
+
+SHORT = "Is it safe to eat papaya this week?"
+LONG = (
+    "In the second trimester most people can keep up gentle exercise such as prenatal yoga or a "
+    "30-minute daily walk. Stay hydrated, avoid lying flat on your back for long stretches, and stop "
+    "if you feel dizzy, short of breath or have any bleeding or fluid loss."
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat prompt tokens vs history length.")
+    parser.add_argument("--lengths", default="10,100,1000,5000", help="comma-separated message counts")
+    parser.add_argument("--repeat", type=int, default=20, help="history builds timed per length")
+    args = parser.parse_args()
+
+    django_env.setup()
+    from django.conf import settings
+
+    from home import memory
+    from home.models import ChatMessage, ConversationMemory
+
+    _, user = django_env.login_cookie()
+    summary = "note " * settings.CHAT_MEMORY_SUMMARY_TOKENS
+    print(f"budget {settings.CHAT_MEMORY_TOKEN_BUDGET} tokens / {settings.CHAT_MEMORY_MAX_MESSAGES} messages, "
+          f"summary {memory.count_tokens(summary)} tokens, "
+          f"tiktoken {'on' if memory._encoding() is not None else 'off (4 chars/token estimate)'}")
+    print(f"{'messages':>9} {'full tokens':>12} {'window tokens':>14} {'in window':>10} {'build ms':>9}")
+
+    for length in (int(n) for n in args.lengths.split(",")):
+        ChatMessage.objects.filter(user=user).delete()
+        ConversationMemory.objects.filter(user=user).delete()
+        ChatMessage.objects.bulk_create(
+            ChatMessage(user=user, role="user" if i % 2 else "bot", content=SHORT if i % 2 else LONG)
+            for i in range(length)
+        )
+        contents = ChatMessage.objects.filter(user=user).values_list("content", flat=True)
+        full = sum(memory.message_tokens(content) for content in contents)
+        ConversationMemory.objects.create(user=user, summary=summary, summarized_through_id=0)
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            history = asyncio.run(memory.abuild_history(user))
+        elapsed = (time.perf_counter() - start) / args.repeat
+        window = sum(memory.message_tokens(m["content"]) for m in history.prompt_messages())
+        print(f"{length:>9} {full:>12} {window:>14} {len(history.messages):>10} {elapsed * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
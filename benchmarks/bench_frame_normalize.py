@@ -0,0 +1,104 @@
+"""
+Camera-frame normalization (home/frames.py) across typical webcam
+resolutions: bytes forwarded to Gemini (base64, as sent in the request) and
+median ``/main/gemini/send_frame/`` latency with normalization off (frame
+forwarded as sent, as before) and on. Requests go through the Django test
+client to a local stub Gemini server that charges upload time at
+``--upload-mbps``.
+
+    python -m benchmarks.bench_frame_normalize --upload-mbps 10 --latency 0.3 --runs 10
+
+Frames are synthetic (a fractal plus sensor-like noise), encoded at
+``--input-quality`` like the page's ``canvas.toBlob``.
+"""
+import argparse
+import io
+import os
+import statistics
+import time
+
+from benchmarks import django_env
+from benchmarks.stub_servers import start_stub_server
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+
+
+def make_frame(width, height, quality):
+    from PIL import Image
+
+    scene = Image.effect_mandelbrot((width, height), (-2.2, -1.2, 1.0, 1.2), 64).convert("RGB")
+    noise = Image.effect_noise((width, height), 12).convert("RGB")
+    frame = Image.blend(scene, noise, 0.15)
+    out = io.BytesIO()
+    frame.save(out, "JPEG", quality=quality)
+    return out.getvalue()
+
+
+def timed_posts(client, frame, runs):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = client.post(
+            "/main/gemini/send_frame/", {"frame": SimpleUploadedFile("frame.jpg", frame, "image/jpeg")}
+        )
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.content
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="send_frame preprocessing benchmark.")
+    parser.add_argument("--runs", type=int, default=10, help="requests per resolution and variant")
+    parser.add_argument("--upload-mbps", type=float, default=10.0, help="modelled uplink to Gemini")
+    parser.add_argument("--latency", type=float, default=0.3, help="stub model time per call")
+    parser.add_argument("--input-quality", type=int, default=75)
+    args = parser.parse_args()
+
+    stub = start_stub_server(latency=args.latency, upload_mbps=args.upload_mbps)
+    os.environ["GEMINI_API_KEY"] = "stub"
+    os.environ["GEMINI_API_BASE"] = f"{stub.base_url}/v1beta"
+    django_env.setup()
+
+    from django.conf import settings
+    from django.test import Client
+
+    from home import frames, gemini, live_assistant
+
+    forwarded = []
+    client = gemini.get_client()
+    generate = client.generate
+
+    def recording_generate(contents, system_instruction=None):
+        parts = [part for turn in contents for part in turn["parts"]]
+        forwarded.append(sum(len(p["inline_data"]["data"]) for p in parts if "inline_data" in p))
+        return generate(contents, system_instruction)
+
+    client.generate = recording_generate
+    max_edge = settings.FRAME_MAX_EDGE
+    variants = (("off", lambda data: (data, "image/jpeg")), ("on", frames.normalize_frame))
+
+    print(f"max edge {max_edge}px, quality {settings.FRAME_JPEG_QUALITY}, "
+          f"uplink {args.upload_mbps} Mbit/s, model latency {args.latency}s")
+    print(f"{'resolution':>10} {'frame KB':>9} {'fwd KB off':>11} {'fwd KB on':>10} {'saved':>6} "
+          f"{'ms off':>8} {'ms on':>8} {'normalize ms':>13}")
+    for width, height in RESOLUTIONS:
+        frame = make_frame(width, height, args.input_quality)
+        row = {}
+        for label, normalize in variants:
+            live_assistant.normalize_frame = normalize
+            forwarded.clear()
+            row[label] = (timed_posts(Client(), frame, args.runs), forwarded[-1])
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            frames.normalize_frame(frame)
+        normalize_ms = (time.perf_counter() - start) / args.runs * 1000
+
+        (off_s, off_b64), (on_s, on_b64) = row["off"], row["on"]
+        print(f"{f'{width}x{height}':>10} {len(frame) / 1024:>9.1f} {off_b64 / 1024:>11.1f} {on_b64 / 1024:>10.1f} "
+              f"{1 - on_b64 / off_b64:>6.0%} {off_s * 1000:>8.1f} {on_s * 1000:>8.1f} {normalize_ms:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Per-frame latency of the live camera assistant: the page's POST loop
+(multipart ``/main/gemini/send_frame/`` per frame, on a keep-alive
+connection) against one long-lived WebSocket on ``/main/gemini/live/``.
+The ASGI app runs under uvicorn in-process; Gemini is a local stub server.
+
+    python -m benchmarks.bench_live_socket --clients 8 --frames 25 --latency 0.05
+
+Each simulated client sends ``--frames`` frames one after another, each with
+a question so frame dedup never short-circuits the model call.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import threading
+import time
+
+from benchmarks import django_env
+from benchmarks.bench_frame_normalize import make_frame
+from benchmarks.stub_servers import start_stub_server
+
+QUESTION = "Is this a healthy snack?"
+
+
+def start_uvicorn(app):
+    import uvicorn
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"127.0.0.1:{port}"
+
+
+async def post_client(session, base, frame, frames):
+    import aiohttp
+
+    latencies = []
+    for _ in range(frames):
+        form = aiohttp.FormData()
+        form.add_field("frame", frame, filename="frame.jpg", content_type="image/jpeg")
+        form.add_field("question", QUESTION)
+        start = time.perf_counter()
+        async with session.post(f"http://{base}/main/gemini/send_frame/", data=form) as response:
+            await response.read()
+            assert response.status == 200, response.status
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def socket_client(session, base, frame, frames):
+    latencies = []
+    async with session.ws_connect(f"ws://{base}/main/gemini/live/") as ws:
+        for turn_id in range(frames):
+            start = time.perf_counter()
+            await ws.send_json({"type": "frame", "id": turn_id, "mime_type": "image/jpeg", "question": QUESTION})
+            await ws.send_bytes(frame)
+            reply = await ws.receive_json()
+            assert reply["id"] == turn_id and reply["status"] == 200, reply
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run(client, base, cookie, frame, clients, frames):
+    import aiohttp
+
+    async def one():
+        async with aiohttp.ClientSession(headers={"Cookie": cookie}) as session:
+            return await client(session, base, frame, frames)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return [latency for latencies in results for latency in latencies], elapsed
+
+
+def report(label, latencies, elapsed):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<10} {len(latencies):>6} {statistics.median(latencies) * 1000:>9.1f} "
+          f"{p95 * 1000:>9.1f} {len(latencies) / elapsed:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="POST loop vs WebSocket for live camera frames.")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--frames", type=int, default=25, help="frames per client")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub model time per call")
+    parser.add_argument("--resolution", default="640x480")
+    args = parser.parse_args()
+
+    stub = start_stub_server(latency=args.latency)
+    os.environ["GEMINI_API_KEY"] = "stub"
+    os.environ["GEMINI_API_BASE"] = f"{stub.base_url}/v1beta"
+    django_env.setup()
+    cookie, _ = django_env.login_cookie()
+
+    from Gynac_Bot.asgi import application
+
+    server, base = start_uvicorn(application)
+    width, height = (int(n) for n in args.resolution.split("x"))
+    frame = make_frame(width, height, 75)
+
+    print(f"{args.clients} clients x {args.frames} frames, {args.resolution} "
+          f"({len(frame) / 1024:.0f} KB), model latency {args.latency}s")
+    print(f"{'transport':<10} {'frames':>6} {'p50 ms':>9} {'p95 ms':>9} {'frames/s':>9}")
+    try:
+        for label, client in (("POST", post_client), ("WebSocket", socket_client)):
+            latencies, elapsed = asyncio.run(run(client, base, cookie, frame, args.clients, args.frames))
+            report(label, latencies, elapsed)
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
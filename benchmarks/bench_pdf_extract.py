@@ -0,0 +1,89 @@
+"""
+Report text extraction on generated multi-page PDFs: the old inline code
+(whole upload in a BytesIO, ``extract_text()`` called twice per page) against
+the shared service in home/pdf_text.py, serial and on the process pool.
+
+    python -m benchmarks.bench_pdf_extract --pages 8 32 100 --image-kb 200 --workers 4
+
+Timings and peak Python heap (tracemalloc, measured in a separate run since
+tracing distorts timings) are reported per variant. Peak heap is not shown
+for the process pool; its work happens in the worker processes.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Gynac_Bot.settings")
+
+import django  # noqa: E402
+import PyPDF2  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+from benchmarks.sample_pdfs import make_report_pdf  # noqa: E402
+
+
+def old_inline(path):
+    with open(path, "rb") as upload:
+        reader = PyPDF2.PdfReader(io.BytesIO(upload.read()))
+        return "\n".join(page.extract_text() for page in reader.pages if page.extract_text())
+
+
+def measure(fn, path, trace):
+    start = time.perf_counter()
+    result = fn(path)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace:
+        tracemalloc.start()
+        fn(path)
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF report extraction benchmark.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[8, 32, 100])
+    parser.add_argument("--image-kb", type=int, default=200, help="scanned-image bytes per page")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    django.setup()
+    from home import pdf_text
+
+    settings.PDF_MAX_PAGES = max(args.pages)
+    settings.PDF_MAX_BYTES = 2**40
+
+    variants = [("old inline (2x parse)", old_inline, 1, True), ("service, serial", pdf_text.extract_text, 1, True)]
+    if args.workers > 1:
+        settings.PDF_EXTRACT_WORKERS = args.workers
+        pdf_text._get_pool().submit(int).result()  # spawn workers before timing
+        variants.append((f"service, {args.workers} procs", pdf_text.extract_text, args.workers, False))
+
+    print(f"{'pages':>5} {'file MB':>8}  {'variant':<22} {'seconds':>8} {'peak heap MB':>13}")
+    for pages in args.pages:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(make_report_pdf(pages, image_kb=args.image_kb))
+        size_mb = os.path.getsize(f.name) / 2**20
+        try:
+            expected = None
+            for label, fn, workers, trace in variants:
+                settings.PDF_EXTRACT_WORKERS = workers
+                settings.PDF_PARALLEL_MIN_PAGES = 2 if workers > 1 else 10**9
+                text, elapsed, peak = measure(fn, f.name, trace)
+                expected = expected or text
+                assert text == expected, label
+                peak_col = f"{peak:>13.1f}" if peak is not None else f"{'-':>13}"
+                print(f"{pages:>5} {size_mb:>8.1f}  {label:<22} {elapsed:>8.3f} {peak_col}")
+        finally:
+            os.remove(f.name)
+
+
+if __name__ == "__main__":
+    main()
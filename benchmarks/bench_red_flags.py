@@ -0,0 +1,77 @@
+"""
+Micro-benchmark: the compiled red-flag automaton (home/red_flags.py) against
+the old per-keyword substring loop, on long messages and large keyword lists.
+
+    python -m benchmarks.bench_red_flags
+
+Messages contain no red flag, which is both the common case and the worst
+case for the loop (every keyword is scanned in full).
+"""
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from home.red_flags import KeywordMatcher, load_keyword_sets  # noqa: E402
+
+KEYWORDS_DIR = Path(__file__).resolve().parent.parent / "home" / "data" / "red_flags"
+VOCAB = (
+    "baby feel today week doctor water sleep tired back pain mild walk diet "
+    "iron folic yoga breakfast lunch dinner mood kick scan report sugar "
+    "thoda aaj bahut accha khana neend दिन आज खाना नींद"
+).split()
+
+
+def loop_match(keywords, text):
+    normalized = text.lower()
+    for keyword in keywords:
+        if keyword in normalized:
+            return keyword
+    return None
+
+
+def synthetic_keywords(count, rng):
+    return [" ".join(rng.choice(VOCAB) + "x" for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def message(length, rng):
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(VOCAB))
+    return " ".join(words)[:length]
+
+
+def per_call_us(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Red-flag matcher micro-benchmark.")
+    parser.add_argument("--number", type=int, default=50, help="calls per timing run")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    shipped = [kw.lower() for kws in load_keyword_sets(KEYWORDS_DIR).values() for kw in kws]
+    keyword_lists = {
+        f"shipped ({len(shipped)})": shipped,
+        "synthetic 250": shipped + synthetic_keywords(250 - len(shipped), rng),
+        "synthetic 1,000": shipped + synthetic_keywords(1_000, rng),
+        "synthetic 10,000": shipped + synthetic_keywords(10_000, rng),
+    }
+
+    print(f"{'keywords':<20} {'msg chars':>9} {'loop µs':>10} {'automaton µs':>13} {'speedup':>8}")
+    for label, keywords in keyword_lists.items():
+        matcher = KeywordMatcher(keywords)
+        for length in (200, 2_000, 20_000):
+            text = message(length, rng)
+            assert loop_match(keywords, text) is None and matcher.search(text) is None
+            loop_us = per_call_us(lambda: loop_match(keywords, text), args.number)
+            ac_us = per_call_us(lambda: matcher.search(text), args.number)
+            print(f"{label:<20} {length:>9,} {loop_us:>10.1f} {ac_us:>13.1f} {loop_us / ac_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
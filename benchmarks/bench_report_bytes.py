@@ -0,0 +1,91 @@
+"""
+Bytes read from the database per request for the profile lookups on the
+page-load paths, with the extracted report text inside ``PatientReport.data``
+(the old layout, read with the old queries) against the ``PatientReportText``
+side table.
+
+    python -m benchmarks.bench_report_bytes --text-kb 40 --requests 500
+
+``home`` and ``login_view`` read the language; ``get_user_profile`` reads
+the profile document. Bytes are the sizes of the column values fetched.
+"""
+import argparse
+import time
+
+from benchmarks import django_env
+
+PROFILE = {
+    "type": "pregnancy",
+    "language": "English",
+    "dob": "1995-04-02",
+    "dueDate": "2026-12-01",
+    "conditions": {"diabetes": False, "hypertension": False, "thyroid": True},
+    "allergies": {"drug": "None", "food": "Peanuts"},
+    "vitals": {"currentWeight": "62", "height": "160"},
+    "analysis": "Routine findings; discuss thyroid levels at the next visit.",
+}
+REPORT_LINE = "Hemoglobin 11.2 g/dL (ref 11.0-15.0). TSH 3.1 mIU/L. Fetal heart rate 148 bpm, placenta posterior.\n"
+
+
+def row_bytes(queryset):
+    """Size of the column values ``queryset`` fetches, as the database returns them."""
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return sum(len(value.encode()) if isinstance(value, str) else 8 for row in rows for value in row)
+
+
+def measure(queryset, lookup, requests):
+    """``(bytes fetched, microseconds per call)`` for ``lookup(queryset)``."""
+    start = time.perf_counter()
+    for _ in range(requests):
+        lookup(queryset.all())
+    return row_bytes(queryset), (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile-lookup bytes read: text in data vs side table.")
+    parser.add_argument("--text-kb", type=int, default=40, help="extracted text per report, each of two PDFs")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    django_env.setup()
+    from home.models import PatientReport, PatientReportText, latest_report_language
+
+    _, user = django_env.login_cookie()
+    text = (REPORT_LINE * (args.text_kb * 1024 // len(REPORT_LINE) + 1))[: args.text_kb * 1024]
+    report = PatientReport.objects.create(user=user, data=PROFILE)
+
+    old_layout = {
+        **report.data,
+        "extracted_sonography_report_content": text,
+        "extracted_blood_report_content": text,
+    }
+    PatientReport.objects.filter(pk=report.pk).update(data=old_layout)
+    latest = PatientReport.objects.filter(user=user)[:1]
+    before = {
+        "home / login": measure(latest, lambda qs: qs[0].data.get("language"), args.requests),
+        "get_user_profile": measure(latest, lambda qs: qs[0].data, args.requests),
+    }
+
+    PatientReport.objects.filter(pk=report.pk).update(data=report.data)
+    PatientReportText.objects.create(report=report, sonography=text, blood=text)
+    after = {
+        "home / login": measure(latest.values_list("data__language", flat=True), list, args.requests),
+        "get_user_profile": measure(latest.values_list("data", flat=True), list, args.requests),
+    }
+    # The views use these exact queries.
+    assert latest_report_language(user) == PROFILE["language"]
+
+    print(f"2 x {args.text_kb} KB extracted text, {args.requests} requests each")
+    print(f"{'lookup':<18} {'bytes before':>13} {'bytes after':>12} {'us before':>10} {'us after':>9}")
+    for name in before:
+        print(f"{name:<18} {before[name][0]:>13.0f} {after[name][0]:>12.0f} "
+              f"{before[name][1]:>10.0f} {after[name][1]:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Mixed chat reads and writes on a file-backed SQLite database: SQLite's
+defaults (rollback journal, ``BEGIN DEFERRED``, a new connection per
+request) against the tuned profile (home/db_tuning.py: WAL and pragmas,
+``BEGIN IMMEDIATE``, persistent connections).
+
+    python -m benchmarks.bench_sqlite_tuning --threads 16 --ops 300 --write-ratio 0.3
+
+Each thread plays a stream of requests. A read is a chat history page (the
+newest 50 messages); a write is either a transcript insert or a
+``log_symptom``-style ``update_or_create``, which reads before it writes.
+Connections are released between requests the way Django does at the end
+of one (``close_old_connections``), so ``CONN_MAX_AGE`` applies. Each profile
+runs in its own process on its own database file, since WAL mode is stored
+in the file.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import django_env
+
+PROFILES = {
+    "default": {"SQLITE_TUNING_ENABLED": "0", "SQLITE_TRANSACTION_MODE": "DEFERRED", "DB_CONN_MAX_AGE": "0"},
+    # The benchmark's threads are long-lived, like WSGI workers, so they keep their connections.
+    "tuned": {"DB_CONN_MAX_AGE": "60"},
+}
+
+
+def run_profile(threads, ops, write_ratio):
+    django_env.setup()
+    from django.contrib.auth.models import User
+    from django.db import OperationalError, close_old_connections, connection
+
+    from home import transcript
+    from home.models import ChatMessage, DailyLog
+
+    users = [User.objects.create_user(f"chatter{i}") for i in range(threads)]
+    for user in users:
+        ChatMessage.objects.bulk_create(
+            ChatMessage(user=user, role="user", content=f"hello {i}") for i in range(200)
+        )
+    connection.close()
+    start_barrier = threading.Barrier(threads)
+
+    def requests_for(user):
+        rng = random.Random(user.pk)
+        reads, writes, errors = [], [], 0
+        start_barrier.wait()
+        try:
+            for op in range(ops):
+                write = rng.random() < write_ratio
+                started = time.perf_counter()
+                try:
+                    if not write:
+                        list(ChatMessage.objects.filter(user=user).order_by("-id").values("id", "role", "content")[:50])
+                    elif op % 2:
+                        transcript.record(user, "user", f"message {op}")
+                    else:
+                        DailyLog.objects.update_or_create(user=user, defaults={"data": {"symptom": f"note {op}"}})
+                except OperationalError:  # "database is locked"
+                    errors += 1
+                    continue
+                finally:
+                    close_old_connections()
+                (writes if write else reads).append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        return reads, writes, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(requests_for, users))
+    elapsed = time.perf_counter() - started
+    return {
+        "reads": [latency for reads, _, _ in results for latency in reads],
+        "writes": [latency for _, writes, _ in results for latency in writes],
+        "errors": sum(errors for _, _, errors in results),
+        "elapsed": elapsed,
+    }
+
+
+def ms(latencies, fraction):
+    """The ``fraction`` percentile of ``latencies``, in milliseconds."""
+    latencies = sorted(latencies)
+    return latencies[max(0, int(len(latencies) * fraction) - 1)] * 1000 if latencies else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite defaults vs the tuned profile under mixed chat load.")
+    parser.add_argument("--threads", type=int, default=16, help="concurrent request threads")
+    parser.add_argument("--ops", type=int, default=300, help="requests per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--profile", choices=PROFILES, help=argparse.SUPPRESS)  # child process
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(run_profile(args.threads, args.ops, args.write_ratio)))
+        return
+
+    print(f"{args.threads} threads x {args.ops} requests, {args.write_ratio:.0%} writes")
+    print(f"{'profile':<8} {'req/s':>7} {'read p50':>9} {'read p99':>9} {'write p50':>10} {'write p99':>10} {'locked':>7}")
+    for profile, env in PROFILES.items():
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_sqlite_tuning", "--profile", profile,
+             "--threads", str(args.threads), "--ops", str(args.ops), "--write-ratio", str(args.write_ratio)],
+            env={**os.environ, **env}, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        done = len(result["reads"]) + len(result["writes"])
+        print(f"{profile:<8} {done / result['elapsed']:>7.0f} "
+              f"{ms(result['reads'], 0.5):>9.2f} {ms(result['reads'], 0.99):>9.2f} "
+              f"{ms(result['writes'], 0.5):>10.2f} {ms(result['writes'], 0.99):>10.2f} "
+              f"{result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Chat transcript write throughput under parallel chat load: one ``INSERT`` per
+message (the default) against the write-behind buffer in home/transcript.py,
+on a file-backed SQLite database.
+
+    python -m benchmarks.bench_transcript_writes --threads 16 --turns 200
+
+Each thread plays one user sending ``--turns`` chat turns, each writing the
+user's message and the bot's reply. The buffered run's time includes the
+final flush, so every row is on disk when the clock stops.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import django_env
+
+
+def run(users, turns, enabled):
+    from django.conf import settings
+    from django.db import OperationalError, connection
+
+    from home import transcript
+    from home.models import ChatMessage
+
+    settings.CHAT_WRITE_BEHIND_ENABLED = enabled
+    transcript._buffer = None
+    ChatMessage.objects.all().delete()
+
+    def chat_turns(user):
+        errors = 0
+        try:
+            for turn in range(turns):
+                for role, content in (("user", f"question {turn}"), ("bot", f"answer {turn}")):
+                    try:
+                        transcript.record(user, role, content)
+                    except OperationalError:  # "database is locked"
+                        errors += 1
+        finally:
+            connection.close()
+        return errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(users)) as pool:
+        errors = sum(pool.map(chat_turns, users))
+    transcript.flush()
+    elapsed = time.perf_counter() - start
+    return ChatMessage.objects.count(), elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat transcript writes/sec, direct vs write-behind.")
+    parser.add_argument("--threads", type=int, default=16, help="concurrent chat users")
+    parser.add_argument("--turns", type=int, default=200, help="chat turns per user")
+    args = parser.parse_args()
+
+    django_env.setup()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+
+    users = [User.objects.create_user(f"writer{i}") for i in range(args.threads)]
+    print(f"{args.threads} threads x {args.turns} turns x 2 rows, "
+          f"buffer {settings.CHAT_WRITE_BEHIND_MAX_ROWS} rows / {settings.CHAT_WRITE_BEHIND_FLUSH_SECONDS}s")
+    print(f"{'mode':<14} {'rows':>7} {'seconds':>8} {'rows/s':>9} {'lock errors':>12}")
+    for label, enabled in (("direct", False), ("write-behind", True)):
+        rows, elapsed, errors = run(users, args.turns, enabled)
+        print(f"{label:<14} {rows:>7} {elapsed:>8.2f} {rows / elapsed:>9.0f} {errors:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Helpers to boot the project against a throwaway SQLite database and drive its
+WSGI/ASGI callables in-process, without a real HTTP server in front.
+"""
+import asyncio
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def setup(openai_base_url=None):
+    """Configure settings, run migrations on a temp DB and return its path."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Gynac_Bot.settings")
+    if openai_base_url:
+        # Must be set before ``openai`` is first imported.
+        os.environ["OPENAI_API_BASE"] = f"{openai_base_url}/v1"
+        os.environ["OPENAI_API_KEY"] = "sk-stub"
+
+    import django
+    from django.conf import settings
+
+    db_path = tempfile.NamedTemporaryFile(suffix=".sqlite3", delete=False).name
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.DEBUG = False
+    django.setup()
+
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+    return db_path
+
+
+def login_cookie(username="bench"):
+    """Create a user and return a ``Cookie`` header value for its session."""
+    from django.contrib.auth.models import User
+    from django.test import Client
+
+    user = User.objects.create_user(username=username, password="bench-pass")
+    client = Client()
+    client.force_login(user)
+    return f"sessionid={client.cookies['sessionid'].value}", user
+
+
+def wsgi_request(app, path, query="", cookie="", method="GET", body=b"", content_type=""):
+    """Call a WSGI app directly; return ``(status_code, body_bytes)``."""
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "testserver",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "testserver",
+        "HTTP_COOKIE": cookie,
+        "CONTENT_TYPE": content_type,
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.url_scheme": "http",
+        "wsgi.version": (1, 0),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split()[0]))
+
+    result = app(environ, start_response)
+    try:
+        content = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return status[0], content
+
+
+async def asgi_request(app, path, query="", cookie="", method="GET", body=b"", content_type=""):
+    """Call an ASGI app directly; return ``(status_code, body_bytes)``."""
+    headers = [(b"host", b"testserver"), (b"cookie", cookie.encode())]
+    if content_type:
+        headers.append((b"content-type", content_type.encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    request_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    status, chunks = [], []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        disconnected.set()
+    return status[0], b"".join(chunks)
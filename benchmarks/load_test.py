@@ -0,0 +1,239 @@
+"""
+Load test of the user-facing endpoints against local stub model servers:
+``/main/chat/``, ``/main/details/``, ``/main/gemini/send_frame/`` and
+``/main/gemini/send_audio/``. Nothing reaches the paid APIs.
+
+    python -m benchmarks.load_test --clients 32 --duration 30 \\
+        --mix chat=6,send_frame=2,send_audio=1,details=1 \\
+        --openai-latency 0.4 --gemini-latency 0.6 --gemini-error-rate 0.05 \\
+        --output after.json --compare before.json
+
+The ASGI app runs under uvicorn in-process. OpenAI and Gemini each get their
+own stub server (benchmarks/stub_servers.py), with their own latency, jitter,
+latency spikes and injected error rate. Each client is a separate logged-in user on its own
+keep-alive connection. It sends requests back to back, choosing the
+endpoint by the ``--mix`` weights. Hedged model requests are off unless
+``LLM_HEDGING_ENABLED=1`` is set in the environment.
+
+The report is JSON on stdout, or in ``--output``: per-endpoint request
+count, RPS, p50/p95/p99/max latency in ms, and status counts, plus the
+upstream calls each stub served. Chat answers a failed OpenAI call with a
+200 apology, so injected errors show in ``upstream`` rather than in the
+chat error rate. Runs with the same arguments are comparable. ``--compare`` prints each endpoint's change from an earlier
+report to stderr.
+
+Chat messages are numbered, so the reply cache never answers them, and every
+frame comes with a question, so frame dedup never skips the model. A details
+POST only enqueues profile setup. Its PDF parsing and analysis run on the
+background job runner in the same process, so they load the server but are
+not timed.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from benchmarks import django_env
+from benchmarks.bench_frame_normalize import make_frame
+from benchmarks.bench_live_socket import start_uvicorn
+from benchmarks.sample_pdfs import make_report_pdf
+from benchmarks.stub_servers import start_stub_server
+
+ENDPOINTS = ("chat", "details", "send_frame", "send_audio")
+DETAILS_FORM = {
+    "dob": "1995-04-02", "language": "English", "lmp": "2026-05-01", "dueDate": "2027-02-05",
+    "currentWeight": "62", "height": "160", "condition_thyroid": "on", "foodAllergies": "Peanuts",
+}
+
+
+def percentile(latencies, fraction):
+    """Nearest-rank ``fraction`` percentile of sorted ``latencies``, in milliseconds."""
+    if not latencies:
+        return None
+    return round(latencies[max(0, math.ceil(len(latencies) * fraction) - 1)] * 1000, 2)
+
+
+class Payloads:
+    """Request bodies, built once so the clients only pay for sending them."""
+
+    def __init__(self):
+        self.frame = make_frame(640, 480, 75)
+        self.audio = os.urandom(16 * 1024)
+        self.pdf = make_report_pdf(pages=2)
+
+    def request(self, endpoint, client_id, n):
+        """``(method, path, kwargs for aiohttp)`` of one request."""
+        import aiohttp
+
+        if endpoint == "chat":
+            return "GET", "/main/chat/", {"params": {"message": f"What can I eat today? ({client_id}-{n})",
+                                                     "lang": "en"}}
+        form = aiohttp.FormData()
+        if endpoint == "details":
+            for name, value in DETAILS_FORM.items():
+                form.add_field(name, value)
+            form.add_field("sonographyReport", self.pdf, filename="sonography.pdf", content_type="application/pdf")
+            form.add_field("bloodReport", self.pdf, filename="blood.pdf", content_type="application/pdf")
+            return "POST", "/main/details/", {"data": form, "allow_redirects": False}
+        if endpoint == "send_frame":
+            form.add_field("frame", self.frame, filename="frame.jpg", content_type="image/jpeg")
+            form.add_field("question", f"Is this a healthy snack? ({n})")
+            return "POST", "/main/gemini/send_frame/", {"data": form}
+        form.add_field("audio", self.audio, filename="question.webm", content_type="audio/webm")
+        return "POST", "/main/gemini/send_audio/", {"data": form}
+
+
+async def run_client(base, cookie, client_id, mix, payloads, deadline, warmup_until, results):
+    import aiohttp
+
+    rng = random.Random(client_id)
+    endpoints, weights = zip(*mix.items())
+    connector = aiohttp.TCPConnector(limit=1)
+    timeout = aiohttp.ClientTimeout(total=120)
+    async with aiohttp.ClientSession(f"http://{base}", headers={"Cookie": cookie}, connector=connector,
+                                     timeout=timeout) as session:
+        n = 0
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            method, path, kwargs = payloads.request(endpoint, client_id, n)
+            n += 1
+            started = time.perf_counter()
+            try:
+                async with session.request(method, path, **kwargs) as response:
+                    await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                status = 0  # connection error or client timeout
+            finished = time.perf_counter()
+            if started >= warmup_until:
+                results[endpoint].append((finished - started, status))
+
+
+async def run(base, cookies, mix, payloads, duration, warmup):
+    results = {endpoint: [] for endpoint in mix}
+    started = time.perf_counter()
+    warmup_until = started + warmup
+    deadline = warmup_until + duration
+    await asyncio.gather(*(
+        run_client(base, cookie, client_id, mix, payloads, deadline, warmup_until, results)
+        for client_id, cookie in enumerate(cookies)
+    ))
+    # Requests still in flight at the deadline finish after it.
+    return results, time.perf_counter() - warmup_until
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(latency for latency, _ in samples)
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(count for status, count in statuses.items() if status == "0" or int(status) >= 500)
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / elapsed, 2),
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def compare(report, baseline, stream):
+    stream.write(f"{'endpoint':<11} {'rps':>18} {'p50 ms':>18} {'p99 ms':>18}\n")
+    for endpoint, now in report["endpoints"].items():
+        before = baseline["endpoints"].get(endpoint)
+        if not before:
+            continue
+        cells = []
+        for key in ("rps", "p50_ms", "p99_ms"):
+            old, new = before[key], now[key]
+            change = f"{(new - old) / old:+.0%}" if old and new is not None else "n/a"
+            cells.append(f"{old} -> {new} ({change})")
+        stream.write(f"{endpoint:<11} " + " ".join(f"{cell:>18}" for cell in cells) + "\n")
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(","):
+        endpoint, _, weight = item.partition("=")
+        if endpoint not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {endpoint!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[endpoint] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent load test of the chat, profile and Gemini endpoints.")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent logged-in clients")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of load before measuring")
+    parser.add_argument("--mix", type=parse_mix, default="chat=6,send_frame=2,send_audio=1,details=1",
+                        help="endpoint=weight,...")
+    for upstream, latency in (("openai", 0.4), ("gemini", 0.6)):
+        parser.add_argument(f"--{upstream}-latency", type=float, default=latency, help="seconds per call")
+        parser.add_argument(f"--{upstream}-jitter", type=float, default=0.1, help="extra random latency, up to")
+        parser.add_argument(f"--{upstream}-error-rate", type=float, default=0.0, help="fraction of calls failed")
+        parser.add_argument(f"--{upstream}-error-status", type=int, default=503)
+        parser.add_argument(f"--{upstream}-spike-rate", type=float, default=0.0,
+                            help="fraction of calls that take the spike latency")
+        parser.add_argument(f"--{upstream}-spike-latency", type=float, default=0.0, help="seconds per spiked call")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON report to print changes against")
+    args = parser.parse_args()
+
+    stubs = {
+        upstream: start_stub_server(
+            latency=getattr(args, f"{upstream}_latency"), jitter=getattr(args, f"{upstream}_jitter"),
+            error_rate=getattr(args, f"{upstream}_error_rate"), error_status=getattr(args, f"{upstream}_error_status"),
+            spike_rate=getattr(args, f"{upstream}_spike_rate"), spike_latency=getattr(args, f"{upstream}_spike_latency"),
+        )
+        for upstream in ("openai", "gemini")
+    }
+    os.environ["GEMINI_API_KEY"] = "stub"
+    os.environ["GEMINI_API_BASE"] = f"{stubs['gemini'].base_url}/v1beta"
+    django_env.setup(openai_base_url=stubs["openai"].base_url)
+    cookies = [django_env.login_cookie(f"load{i}")[0] for i in range(args.clients)]
+
+    from django.conf import settings
+
+    from Gynac_Bot.asgi import application
+
+    server, base = start_uvicorn(application)
+    try:
+        results, elapsed = asyncio.run(run(base, cookies, args.mix, Payloads(), args.duration, args.warmup))
+    finally:
+        server.should_exit = True
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    report = {
+        "benchmark": "load_test",
+        "config": config,
+        "database": settings.DATABASES["default"]["ENGINE"].rsplit(".", 1)[-1],
+        "elapsed_seconds": round(elapsed, 2),
+        "endpoints": {endpoint: summarize(samples, elapsed) for endpoint, samples in results.items()},
+        "total": summarize([sample for samples in results.values() for sample in samples], elapsed),
+        "upstream": {
+            upstream: {"requests": stub.requests, "injected_errors": stub.errors} for upstream, stub in stubs.items()
+        },
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as fh:
+            compare(report, json.load(fh), sys.stderr)
+    for stub in stubs.values():
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Generate text-only multi-page PDFs that look like lab/sonography reports,
+for benchmarking report extraction without shipping real patient files.
+"""
+import random
+
+FIELDS = [
+    ("Haemoglobin", "g/dL", 9.0, 14.0), ("Platelet count", "10^3/uL", 150, 450),
+    ("TSH", "mIU/L", 0.1, 4.5), ("Fasting glucose", "mg/dL", 70, 120),
+    ("HbA1c", "%", 4.5, 6.8), ("Ferritin", "ng/mL", 10, 150),
+    ("Fetal heart rate", "bpm", 110, 170), ("Biparietal diameter", "mm", 20, 95),
+    ("Femur length", "mm", 10, 75), ("Amniotic fluid index", "cm", 5, 25),
+]
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_stream(page_number, lines_per_page, rng, with_image):
+    lines = [f"Patient report - page {page_number}"]
+    for _ in range(lines_per_page - 1):
+        name, unit, low, high = rng.choice(FIELDS)
+        lines.append(f"{name}: {rng.uniform(low, high):.1f} {unit} (ref {low}-{high})")
+    ops = ["q 200 0 0 150 300 50 cm /Im1 Do Q"] if with_image else []
+    ops += ["BT", "/F1 10 Tf", "14 TL", "50 800 Td"]
+    ops += [f"({_escape(line)}) '" for line in lines]
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def make_report_pdf(pages, lines_per_page=50, image_kb=0, seed=0):
+    """
+    Return the bytes of a ``pages``-page text PDF. ``image_kb`` adds an
+    uncompressed greyscale image of about that size to every page, to mimic
+    the bulk of a scanned report.
+    """
+    rng = random.Random(seed)
+    objects = {}
+    font_id, pages_id, catalog_id = 1, 2, 3
+    objects[font_id] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    kids = []
+    next_id = 4
+    for number in range(1, pages + 1):
+        stream = _page_stream(number, lines_per_page, rng, with_image=image_kb > 0)
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        xobjects = b""
+        if image_kb:
+            image_id = next_id
+            next_id += 1
+            side = int((image_kb * 1024) ** 0.5)
+            pixels = rng.randbytes(side * side)
+            objects[image_id] = (
+                b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                b"/BitsPerComponent 8 /Length %d >>\nstream\n%s\nendstream" % (side, side, len(pixels), pixels)
+            )
+            xobjects = b" /XObject << /Im1 %d 0 R >>" % image_id
+        objects[page_id] = (
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >>%s >> /Contents %d 0 R >>"
+            % (pages_id, font_id, xobjects, content_id)
+        )
+        kids.append(page_id)
+    objects[pages_id] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids)
+    )
+    objects[catalog_id] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for obj_id in sorted(objects):
+        offsets[obj_id] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (obj_id, objects[obj_id])
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for obj_id in sorted(objects):
+        out += b"%010d 00000 n \n" % offsets[obj_id]
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_at
+    )
+    return bytes(out)
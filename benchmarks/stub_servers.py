@@ -0,0 +1,193 @@
+"""
+Local stand-ins for the upstream model APIs, so benchmarks never hit paid
+endpoints.
+
+    python -m benchmarks.stub_servers --port 8900 --latency 0.5
+
+serves an OpenAI-compatible ``POST /v1/chat/completions`` that sleeps for
+``--latency`` seconds and answers with a canned completion. With
+``"stream": true`` the reply is sent as server-sent chunk events, one word
+every ``--token-delay`` seconds. ``POST .../models/<model>:generateContent``
+answers like the Gemini REST API. ``--upload-mbps`` charges each request
+body's transfer time at that bandwidth, to model a slow uplink.
+
+``--jitter`` adds up to that many seconds to each call's latency,
+``--spike-rate`` makes that fraction of calls take ``--spike-latency``
+instead (a latency tail), and ``--error-rate`` fails that fraction of calls with ``--error-status`` (a 429
+carries ``Retry-After: 1``) in the error format of the API called.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_REPLY = "Stay hydrated and rest; a short walk can help too."
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests.
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_chunk(data):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        words = CANNED_REPLY.split(" ")
+        for i, word in enumerate(words):
+            event = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if i == 0 else f" {word}"},
+                    "finish_reason": None,
+                }],
+            }
+            write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+            time.sleep(self.server.token_delay)
+        write_chunk(b"data: [DONE]\n\n")
+        write_chunk(b"")
+
+    def _send_error(self, status, gemini):
+        self.server.count(error=True)
+        message = "Injected stub error"
+        if gemini:
+            payload = {"error": {"code": status, "message": message, "status": "UNAVAILABLE"}}
+        else:
+            payload = {"error": {"message": message, "type": "server_error" if status >= 500 else "requests"}}
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.server.upload_mbps:
+            time.sleep(length * 8 / (self.server.upload_mbps * 1e6))
+        latency = self.server.latency
+        if random.random() < self.server.spike_rate:
+            latency = self.server.spike_latency
+        time.sleep(latency + random.uniform(0, self.server.jitter))
+
+        if random.random() < self.server.error_rate:
+            self._send_error(self.server.error_status, gemini=":generateContent" in self.path)
+            return
+        self.server.count()
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            if request.get("stream"):
+                self._send_stream(request.get("model", "stub"))
+                return
+            self._send_json(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": CANNED_REPLY},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+        elif self.path.split("?")[0].endswith(":generateContent"):
+            self._send_json(200, {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": CANNED_REPLY}]}}],
+            })
+        else:
+            self._send_json(404, {"error": {"message": f"No stub for {self.path}"}})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, token_delay=0.0, upload_mbps=0.0, jitter=0.0, error_rate=0.0,
+                 error_status=503, spike_rate=0.0, spike_latency=0.0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.upload_mbps = upload_mbps
+        self.jitter = jitter
+        self.spike_rate = spike_rate
+        self.spike_latency = spike_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self._count_lock = threading.Lock()
+
+    def count(self, error=False):
+        with self._count_lock:
+            self.requests += 1
+            self.errors += error
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub_server(port=0, latency=0.0, token_delay=0.0, upload_mbps=0.0, jitter=0.0, error_rate=0.0,
+                      error_status=503, spike_rate=0.0, spike_latency=0.0):
+    """Start a stub server on a background thread and return it."""
+    server = StubServer(
+        ("127.0.0.1", port), latency=latency, token_delay=token_delay, upload_mbps=upload_mbps,
+        jitter=jitter, error_rate=error_rate, error_status=error_status,
+        spike_rate=spike_rate, spike_latency=spike_latency,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per upstream call")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="seconds between streamed words")
+    parser.add_argument("--upload-mbps", type=float, default=0.0, help="modelled request uplink (0 = unlimited)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of injected failures")
+    parser.add_argument("--spike-rate", type=float, default=0.0, help="fraction of calls that take --spike-latency")
+    parser.add_argument("--spike-latency", type=float, default=0.0, help="seconds per spiked call")
+    args = parser.parse_args()
+
+    server = StubServer(
+        ("127.0.0.1", args.port), latency=args.latency, token_delay=args.token_delay, upload_mbps=args.upload_mbps,
+        jitter=args.jitter, error_rate=args.error_rate, error_status=args.error_status,
+        spike_rate=args.spike_rate, spike_latency=args.spike_latency,
+    )
+    print(f"Stub model server on {server.base_url} (latency {args.latency}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
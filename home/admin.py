@@ -1,9 +1,15 @@
 # your_app/admin.py
 from django.contrib import admin
-from .models import PatientReport, ChatMessage
+from .models import BackgroundJob, PatientReport, PatientReportText, ChatMessage, ConversationMemory
+
+class PatientReportTextInline(admin.StackedInline):
+    model = PatientReportText
+    readonly_fields = ('sonography', 'blood')
+    can_delete = False
 
 @admin.register(PatientReport)
 class PatientReportAdmin(admin.ModelAdmin):
+    inlines = (PatientReportTextInline,)
     list_display = ("user", "get_report_type", "created_at")
     search_fields = ("user__username",)
     list_filter = ("created_at",)
@@ -21,4 +27,16 @@ class ChatMessageAdmin(admin.ModelAdmin):
     
     @admin.display(description='Content')
     def content_snippet(self, obj):
-        return (obj.content[:75] + '...') if len(obj.content) > 75 else obj.content
\ No newline at end of file
+        return (obj.content[:75] + '...') if len(obj.content) > 75 else obj.content
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'status', 'attempts', 'created_at', 'updated_at')
+    search_fields = ('user__username',)
+    list_filter = ('kind', 'status')
+    readonly_fields = ('error',)
+
+@admin.register(ConversationMemory)
+class ConversationMemoryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'summarized_through_id', 'updated_at')
+    search_fields = ('user__username', 'summary')
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class HomeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'home'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+
+        from . import db_tuning, memory, metrics
+
+        connection_created.connect(db_tuning.apply_sqlite_pragmas, dispatch_uid="home.db_tuning.sqlite_pragmas")
+        if settings.METRICS_ENABLED:
+            connection_created.connect(metrics.install_db_timing, dispatch_uid="home.metrics.db_timing")
+        memory.warm_encoding()
@@ -0,0 +1,99 @@
+"""
+Per-view response compression for the JSON APIs the dashboard loads.
+
+``compress_response`` compresses bodies of at least
+``RESPONSE_COMPRESS_MIN_BYTES`` with brotli when the client accepts it and
+the optional ``brotli`` package is installed, and with gzip otherwise.
+
+Unlike ``GZipMiddleware``, which weakens ETags it compresses, it keeps
+strong ETags strong by giving each encoding its own tag (``"3-7"`` becomes
+``"3-7-gzip"``). The suffix is stripped from ``If-None-Match`` before the
+view sees it, so the view's ``@condition`` compares its own tags and an
+unchanged resource still gets a 304.
+"""
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+_SUFFIXES = ("br", "gzip")
+_SUFFIXED_ETAG = re.compile(r'-(%s)"' % "|".join(_SUFFIXES))
+
+
+def _accepts(request, encoding):
+    # "gzip;q=0" is a refusal; any other q-value is acceptance.
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        name, *params = item.split(";")
+        if name.strip().lower() != encoding:
+            continue
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def choose_encoding(request):
+    if brotli is not None and _accepts(request, "br"):
+        return "br"
+    if _accepts(request, "gzip"):
+        return "gzip"
+    return None
+
+
+def _suffix_etag(response, encoding):
+    etag = response.get("ETag")
+    if etag and etag.endswith('"'):
+        response["ETag"] = f'{etag[:-1]}-{encoding}"'
+
+
+def _compress(content, encoding):
+    if encoding == "br":
+        return brotli.compress(content, mode=brotli.MODE_TEXT)
+    return compress_string(content)
+
+
+def compress_response(view):
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        revalidated = None
+        if if_none_match:
+            match = _SUFFIXED_ETAG.search(if_none_match)
+            revalidated = match.group(1) if match else None
+            request.META["HTTP_IF_NONE_MATCH"] = _SUFFIXED_ETAG.sub('"', if_none_match)
+
+        response = view(request, *args, **kwargs)
+
+        if response.status_code == 304:
+            # Same tag as the representation the client has cached.
+            if revalidated:
+                _suffix_etag(response, revalidated)
+            return response
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request)
+        if encoding is None or len(response.content) < settings.RESPONSE_COMPRESS_MIN_BYTES:
+            return response
+        compressed = _compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        _suffix_etag(response, encoding)
+        return response
+
+    return wrapped
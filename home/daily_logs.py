@@ -0,0 +1,74 @@
+"""
+DailyLog writes and the weekly rollups behind the trend endpoints.
+
+Every write goes through ``save_entry``, which updates the day's
+``DailyLog`` row and its week's ``DailyLogWeek`` row in one transaction:
+a new day adds one to ``days_logged`` and to its type's count, and replacing
+a day's entry with one of another type moves the count across. Reads are
+range scans on the (user, date) unique indexes of the two tables.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+
+from .models import DailyLog, DailyLogWeek
+
+DEFAULT_TYPE = "generic"
+
+
+def week_start(day):
+    """The Monday of ``day``'s calendar week."""
+    return day - timedelta(days=day.weekday())
+
+
+def entry_type(data):
+    return data.get("type", DEFAULT_TYPE) if isinstance(data, dict) else DEFAULT_TYPE
+
+
+@transaction.atomic
+def save_entry(user, log_date, data):
+    """Create or replace ``user``'s entry for ``log_date``; returns ``(log, created)``."""
+    log, created = DailyLog.objects.select_for_update().get_or_create(
+        user=user, log_date=log_date, defaults={"data": data}
+    )
+    old_type = None
+    if not created:
+        old_type = entry_type(log.data)
+        log.data = data
+        log.save(update_fields=["data"])
+    new_type = entry_type(data)
+    if old_type == new_type:
+        return log, created
+
+    week, week_created = DailyLogWeek.objects.select_for_update().get_or_create(
+        user=user, week_start=week_start(log_date), defaults={"days_logged": 1, "counts": {new_type: 1}}
+    )
+    if week_created:
+        return log, created
+    counts = dict(week.counts)
+    if old_type is not None:
+        counts[old_type] = counts.get(old_type, 0) - 1
+        if counts[old_type] <= 0:
+            del counts[old_type]
+    counts[new_type] = counts.get(new_type, 0) + 1
+    week.counts = counts
+    week.days_logged = sum(counts.values())
+    week.save(update_fields=["counts", "days_logged", "updated_at"])
+    return log, created
+
+
+def entries(user, start, end, log_type=None):
+    """``user``'s entries from ``start`` to ``end`` (inclusive), oldest first."""
+    logs = DailyLog.objects.filter(user=user, log_date__range=(start, end)).order_by("log_date")
+    if log_type:
+        logs = logs.filter(data__type=log_type)
+    return logs.values("log_date", "data")
+
+
+def weeks(user, start, end):
+    """Rollup rows for the weeks overlapping ``start``..``end``, oldest first."""
+    return (
+        DailyLogWeek.objects.filter(user=user, week_start__range=(week_start(start), end))
+        .order_by("week_start")
+        .values("week_start", "days_logged", "counts")
+    )
@@ -0,0 +1,30 @@
+"""
+SQLite tuning.
+
+- ``journal_mode=WAL``: readers no longer block the writer or each other, so
+  chat history reads keep going while transcript rows are written. The mode
+  is stored in the database file, so migration 0013 sets it once
+  (``SQLITE_JOURNAL_MODE``); opening a connection never writes to the file.
+
+The rest are per-connection and applied from a ``connection_created``
+receiver (connected in ``HomeConfig.ready``):
+
+- ``synchronous=NORMAL``: in WAL mode, commits fsync at checkpoints rather
+  than on every transaction; a power loss can drop the last commits but
+  never corrupts the database.
+- ``busy_timeout``: a writer waits this long for the lock instead of failing
+  at once with "database is locked".
+- ``cache_size`` / ``mmap_size`` / ``temp_store``: keep hot pages in memory.
+
+Settings: ``SQLITE_TUNING_ENABLED``, ``SQLITE_JOURNAL_MODE`` and ``SQLITE_PRAGMAS``.
+"""
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite" or not settings.SQLITE_TUNING_ENABLED:
+        return
+    # One round trip for all of them: with CONN_MAX_AGE=0 this runs on every request.
+    connection.connection.executescript(
+        "".join(f"PRAGMA {name} = {value};" for name, value in settings.SQLITE_PRAGMAS.items())
+    )
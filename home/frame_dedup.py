@@ -0,0 +1,104 @@
+"""
+Skip Gemini vision calls for camera frames that show nothing new.
+
+Each frame sent without a question gets a 64-bit difference hash (dHash).
+Recent hashes and the replies they produced are kept per browser session; if
+a new frame is within ``FRAME_DEDUP_MAX_DISTANCE`` bits (Hamming distance) of
+one of the last ``FRAME_DEDUP_HISTORY`` frames, its reply is reused. Frames
+that come with a question always go to the model, and their answers are not
+remembered, since they respond to the question rather than describe the frame.
+"""
+import io
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from PIL import Image
+
+HASH_SIZE = 8
+
+
+def dhash(data):
+    """64-bit difference hash of the encoded image ``data``."""
+    with Image.open(io.BytesIO(data)) as img:
+        # Decoding at 1/8 scale is plenty for a 9x8 thumbnail.
+        img.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+        pixels = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR).tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class FrameDedup:
+    def __init__(self, max_distance, history, ttl_seconds, max_sessions):
+        self.max_distance = max_distance
+        self.history = history
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.hits = 0
+        self.misses = 0
+        self._sessions = OrderedDict()  # session key -> deque of (expires_at, hash, reply)
+        self._lock = threading.Lock()
+
+    def lookup(self, session_key, frame_hash):
+        """The reply to a recent near-identical frame in this session, or ``None``."""
+        now = time.monotonic()
+        with self._lock:
+            recent = self._sessions.get(session_key, ())
+            for expires_at, seen_hash, reply in recent:
+                if expires_at > now and hamming(seen_hash, frame_hash) <= self.max_distance:
+                    self._sessions.move_to_end(session_key)
+                    self.hits += 1
+                    return reply
+            self.misses += 1
+            return None
+
+    def remember(self, session_key, frame_hash, reply):
+        with self._lock:
+            recent = self._sessions.get(session_key)
+            if recent is None:
+                recent = self._sessions[session_key] = deque(maxlen=self.history)
+            recent.appendleft((time.monotonic() + self.ttl_seconds, frame_hash, reply))
+            self._sessions.move_to_end(session_key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._sessions),
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_dedup = None
+_dedup_lock = threading.Lock()
+
+
+def get_frame_dedup():
+    """The process-wide tracker, or ``None`` when ``FRAME_DEDUP_ENABLED`` is off."""
+    global _dedup
+    if not settings.FRAME_DEDUP_ENABLED:
+        return None
+    if _dedup is None:
+        with _dedup_lock:
+            if _dedup is None:
+                _dedup = FrameDedup(
+                    max_distance=settings.FRAME_DEDUP_MAX_DISTANCE,
+                    history=settings.FRAME_DEDUP_HISTORY,
+                    ttl_seconds=settings.FRAME_DEDUP_TTL_SECONDS,
+                    max_sessions=settings.FRAME_DEDUP_MAX_SESSIONS,
+                )
+    return _dedup
@@ -0,0 +1,61 @@
+"""
+Camera-frame preprocessing for the Gemini vision endpoint.
+
+Browsers send whatever the webcam produces (often 1280x720 or 1920x1080 at
+the canvas' default JPEG quality). Gemini bills and tiles images by size, and
+every extra byte is uploaded again on each call, so frames are decoded,
+downscaled to ``FRAME_MAX_EDGE`` pixels on the long side and re-encoded as
+JPEG at ``FRAME_JPEG_QUALITY`` with no EXIF/ICC/XMP metadata before they are
+forwarded.
+"""
+import io
+import math
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+# Anything larger than a 4K frame is not a webcam capture.
+MAX_FRAME_PIXELS = 4096 * 4096
+
+
+class InvalidFrameError(ValueError):
+    pass
+
+
+def normalize_frame(data, max_edge=None, quality=None):
+    """
+    Return ``(jpeg_bytes, "image/jpeg")`` for the encoded image ``data``.
+
+    A frame that is already a small-enough JPEG with no metadata is returned
+    as is when re-encoding would not make it smaller. ``max_edge`` of 0
+    disables downscaling.
+    """
+    max_edge = settings.FRAME_MAX_EDGE if max_edge is None else max_edge
+    quality = settings.FRAME_JPEG_QUALITY if quality is None else quality
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            if img.width * img.height > MAX_FRAME_PIXELS:
+                raise InvalidFrameError(f"frame is {img.width}x{img.height}; too large")
+            source_format = img.format
+            has_metadata = any(key in img.info for key in ("exif", "icc_profile", "xmp", "comment"))
+            resized = bool(max_edge) and max(img.size) > max_edge
+            if resized:
+                # Lets the JPEG decoder scale by 1/2, 1/4 or 1/8 while decoding,
+                # never below the target size.
+                scale = max_edge / max(img.size)
+                img.draft("RGB", (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+            frame = ImageOps.exif_transpose(img)
+            if frame.mode != "RGB":
+                frame = frame.convert("RGB")
+            if resized:
+                frame.thumbnail((max_edge, max_edge), Image.Resampling.BICUBIC)
+            out = io.BytesIO()
+            frame.save(out, "JPEG", quality=quality)
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise InvalidFrameError(f"could not decode frame: {e}") from e
+
+    encoded = out.getvalue()
+    if source_format == "JPEG" and not resized and not has_metadata and len(encoded) >= len(data):
+        return data, "image/jpeg"
+    return encoded, "image/jpeg"
@@ -0,0 +1,211 @@
+"""
+Shared client for the Gemini ``generateContent`` REST API.
+
+One process-wide ``requests.Session`` keeps a pool of keep-alive connections
+to the API host. Transient failures (connection errors, timeouts, 429 and 5xx)
+are retried a bounded number of times with jittered exponential backoff, and
+a circuit breaker fails calls fast while the upstream is degraded instead of
+tying up a worker for the full timeout on every request.
+
+``GEMINI_API_BASE`` can point the client at a local stub server.
+"""
+import base64
+import os
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from . import metrics
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class GeminiError(Exception):
+    """The upstream call failed; ``detail`` carries the error body if there was one."""
+
+    def __init__(self, message, status=None, detail=None):
+        super().__init__(message)
+        self.status = status
+        self.detail = detail
+
+
+class CircuitOpenError(GeminiError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failed calls. While open,
+    calls are rejected until ``reset_seconds`` have passed; then one trial
+    call is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_seconds or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class GeminiClient:
+    def __init__(self, api_key, model, base_url, connect_timeout, read_timeout,
+                 max_retries, backoff_seconds, breaker, pool_size=10):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.breaker = breaker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def url(self):
+        return f"{self.base_url}/models/{self.model}:generateContent"
+
+    def _backoff(self, attempt):
+        # Full jitter: spread retries out so clients don't retry in lockstep.
+        time.sleep(random.uniform(0, self.backoff_seconds * 2 ** attempt))
+
+    def generate_content(self, parts):
+        """POST one user turn made of ``parts``; return the decoded JSON response."""
+        return self.generate([{"role": "user", "parts": parts}])
+
+    def generate(self, contents, system_instruction=None):
+        """POST a conversation (``contents`` turns, optional system text); return the decoded JSON response."""
+        payload = {"contents": contents}
+        if system_instruction:
+            payload["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+        # One span per call, retries and backoff included: what the caller waits for.
+        with metrics.upstream_span("gemini"):
+            return self._generate(payload)
+
+    def _generate(self, payload):
+        if not self.breaker.allow():
+            raise CircuitOpenError("Gemini is temporarily unavailable (circuit open).", status=503)
+
+        # Every way out records an outcome: a half-open trial that left
+        # without one would keep the breaker rejecting calls for good.
+        upstream_ok = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                try:
+                    resp = self.session.post(
+                        self.url, params={"key": self.api_key}, json=payload, timeout=self.timeout
+                    )
+                except requests.RequestException as e:
+                    if last_attempt:
+                        raise GeminiError(f"Could not reach Gemini: {e}") from e
+                    self._backoff(attempt)
+                    continue
+
+                if resp.ok:
+                    try:
+                        data = resp.json()
+                    except ValueError as e:
+                        raise GeminiError(f"Gemini sent an unreadable response: {e}") from e
+                    upstream_ok = True
+                    return data
+
+                if resp.status_code in RETRYABLE_STATUS and not last_attempt:
+                    self._backoff(attempt)
+                    continue
+
+                try:
+                    detail = resp.json()
+                except ValueError:
+                    detail = None
+                # A 4xx is our request's fault, not a sign the upstream is down.
+                upstream_ok = resp.status_code not in RETRYABLE_STATUS
+                raise GeminiError(
+                    f"{resp.status_code} {resp.reason} for Gemini model {self.model}",
+                    status=resp.status_code,
+                    detail=detail,
+                )
+        finally:
+            if upstream_ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+
+def inline_part(data, mime_type):
+    return {"inline_data": {"mime_type": mime_type, "data": base64.b64encode(data).decode("ascii")}}
+
+
+def response_text(data_json):
+    """Text of the first candidate's first part, or ``""``."""
+    return (
+        data_json.get("candidates", [{}])[0]
+        .get("content", {})
+        .get("parts", [{}])[0]
+        .get("text", "")
+    )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client, built from settings on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient(
+                    api_key=os.getenv("GEMINI_API_KEY"),
+                    model=settings.GEMINI_MODEL,
+                    base_url=settings.GEMINI_API_BASE,
+                    connect_timeout=settings.GEMINI_CONNECT_TIMEOUT_SECONDS,
+                    read_timeout=settings.GEMINI_READ_TIMEOUT_SECONDS,
+                    max_retries=settings.GEMINI_MAX_RETRIES,
+                    backoff_seconds=settings.GEMINI_RETRY_BACKOFF_SECONDS,
+                    breaker=CircuitBreaker(
+                        failure_threshold=settings.GEMINI_BREAKER_FAILURE_THRESHOLD,
+                        reset_seconds=settings.GEMINI_BREAKER_RESET_SECONDS,
+                    ),
+                    pool_size=settings.GEMINI_POOL_SIZE,
+                )
+    return _client
@@ -0,0 +1,100 @@
+"""
+In-process background job runner.
+
+Jobs run on a thread pool inside the web process, so there is no broker to
+deploy; each job has a ``BackgroundJob`` row that records its status so any
+worker process can answer a status poll. Failed attempts are retried with
+exponential backoff up to ``BACKGROUND_JOB_MAX_ATTEMPTS``.
+
+A job function is called as ``func(job, *args, **kwargs)``. It can read
+``job.attempts`` / ``job.max_attempts`` to tell whether it is on its last try.
+"""
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import BackgroundJob
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.BACKGROUND_JOB_WORKERS,
+                    thread_name_prefix="background-job",
+                )
+    return _executor
+
+
+def enqueue(user, kind, func, *args, **kwargs):
+    """
+    Record a pending job and schedule ``func`` once the current transaction
+    commits. Returns the ``BackgroundJob`` row.
+    """
+    job = BackgroundJob.objects.create(
+        user=user, kind=kind, max_attempts=settings.BACKGROUND_JOB_MAX_ATTEMPTS
+    )
+    transaction.on_commit(lambda: _get_executor().submit(_run, job.pk, func, args, kwargs))
+    return job
+
+
+def _record(job, **fields):
+    """
+    Write ``fields`` to the job's row and mirror them on ``job``. Returns
+    ``False`` if the row is gone (the user cleared their history while the
+    job ran), in which case the job should stop.
+    """
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.updated_at = timezone.now()
+    return BackgroundJob.objects.filter(pk=job.pk).update(updated_at=job.updated_at, **fields) > 0
+
+
+def _run(job_id, func, args, kwargs):
+    close_old_connections()
+    try:
+        job = BackgroundJob.objects.filter(pk=job_id).first()
+        while job is not None:
+            if not _record(job, attempts=job.attempts + 1, status=BackgroundJob.RUNNING):
+                return
+            try:
+                func(job, *args, **kwargs)
+            except Exception as e:
+                traceback.print_exc()
+                error = f"{type(e).__name__}: {e}"
+                if job.attempts >= job.max_attempts:
+                    if _record(job, error=error, status=BackgroundJob.FAILED):
+                        metrics.BACKGROUND_JOBS.inc(kind=job.kind, status=job.status)
+                    return
+                if not _record(job, error=error):
+                    return
+                time.sleep(settings.BACKGROUND_JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+            else:
+                if _record(job, status=BackgroundJob.SUCCEEDED):
+                    metrics.BACKGROUND_JOBS.inc(kind=job.kind, status=job.status)
+                return
+    except Exception:
+        traceback.print_exc()
+    finally:
+        # Worker threads are long-lived; don't hold a DB connection between jobs.
+        connection.close()
+
+
+def shutdown(wait=True):
+    """Stop the runner (waits for in-flight jobs by default)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
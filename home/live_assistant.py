@@ -0,0 +1,100 @@
+"""
+One turn of the live camera/voice assistant, shared by the HTTP endpoints
+(``send_frame`` / ``send_audio`` in views.py) and the WebSocket session
+(live_socket.py).
+
+Media arrives as ``(bytes, mime type)`` pairs. Each function returns
+``(payload, status)``: the JSON body and the HTTP status it would be sent
+with. Turns go through the ``vision`` and ``audio`` provider routes
+(home/providers.py): Gemini, hedged by OpenAI for frames without audio.
+"""
+from functools import partial
+
+import openai
+
+from . import providers
+from .frame_dedup import dhash, get_frame_dedup
+from .frames import normalize_frame
+from .gemini import CircuitOpenError, GeminiError
+
+FRAME_PROMPT = (
+    "You are Shrishti.ai, an empathetic pregnancy companion.\n"
+    "Use the image and any provided user question (audio or text) to answer briefly.\n"
+    "- If there IS a user question: answer it in 1 sentences grounded in the image.\n"
+    "- If there is NO question: give a 1 line friendly description of what's in the image. Ask Question.\n"
+)
+AUDIO_PROMPT = (
+    "You are Shrishti.ai, an empathetic pregnancy companion. "
+    "Listen to the user's audio. If they asked a question, answer it in 1-2 sentences. "
+    "If it's general speech, summarize it in one friendly line and ask a gentle follow-up. "
+)
+
+FRAME_ERROR_TIP = (
+    "Tip: Set GEMINI_MODEL to a listed model (e.g., 'gemini-2.0-flash', 'gemini-2.5-flash-lite'). "
+    "Verify via: GET https://generativelanguage.googleapis.com/v1beta/models?key=YOUR_KEY"
+)
+AUDIO_ERROR_TIP = (
+    "Tip: If you get 404, set GEMINI_MODEL to a listed model "
+    "(e.g., 'gemini-2.0-flash' or 'gemini-2.5-flash-lite') and verify with GET /v1beta/models."
+)
+
+
+def ask(route, parts, error_tip, on_text=None):
+    """
+    Send one user turn made of ``parts`` (text and media pairs) on ``route``
+    and shape the reply. ``on_text`` is called with the reply text when the
+    model returned one.
+    """
+    try:
+        completion = providers.complete(route, [{"role": "user", "content": parts}])
+    except CircuitOpenError:
+        return {"reply": "The live assistant is temporarily unavailable. Please try again in a moment."}, 503
+    except GeminiError as err:
+        if err.status is None:
+            return {"reply": f"Unexpected error: {err}"}, 502
+        extra = f" - {err.detail}" if err.detail else ""
+        return {"reply": f"HTTP error occurred: {err}{extra}\n{error_tip}"}, 500
+    except openai.error.OpenAIError as err:  # OpenAI as the primary
+        return {"reply": f"Unexpected error: {err}"}, 502
+
+    text = completion.text
+    if not text:
+        return {"reply": "Received response but no text was returned.", "raw": completion.raw}, 200
+
+    if on_text is not None:
+        on_text(text)
+    return {"reply": text}, 200
+
+
+def answer_frame(session_key, frame, audio=None, question=""):
+    """
+    Answer ``question`` (spoken in ``audio`` or typed) about the camera
+    ``frame``, or describe the frame when there is no question. Raises
+    ``frames.InvalidFrameError`` if the frame cannot be decoded.
+    """
+    frame = normalize_frame(frame[0])
+
+    # Skip the model for a question-less frame that shows nothing new.
+    remember = None
+    dedup = get_frame_dedup()
+    if dedup is not None and session_key and audio is None and not question:
+        frame_hash = dhash(frame[0])
+        cached = dedup.lookup(session_key, frame_hash)
+        if cached is not None:
+            return {"reply": cached, "cached": True}, 200
+        remember = partial(dedup.remember, session_key, frame_hash)
+
+    parts = [FRAME_PROMPT, frame]  # image first
+    if audio is not None:
+        parts.append(audio)
+    if question:
+        parts.append(f"User question: {question}")
+    return ask("vision", parts, FRAME_ERROR_TIP, on_text=remember)
+
+
+def answer_audio(audio, hint=""):
+    """Answer or summarise the speech in ``audio``."""
+    prompt = AUDIO_PROMPT
+    if hint:
+        prompt += f"\nUser hint: {hint}"
+    return ask("audio", [prompt, audio], AUDIO_ERROR_TIP)
@@ -0,0 +1,262 @@
+"""
+WebSocket session for the live camera/voice assistant, served by the ASGI
+app at ``/main/gemini/live/`` (see Gynac_Bot/asgi.py).
+
+One authenticated connection carries a whole camera session, instead of a
+POST to ``send_frame`` / ``send_audio`` (with session and auth middleware and
+a body parse) per interaction. Text messages are JSON control messages;
+binary messages carry media.
+
+Client to server:
+
+- ``{"type": "audio", "mime_type": "audio/webm"}``: the binary messages that
+  follow are chunks of one recording.
+- ``{"type": "frame", "id": 7, "mime_type": "image/jpeg", "question": "..."}``:
+  the next binary message is a camera frame. It makes one turn together with
+  the recording collected since the last turn, if any, and the question.
+- ``{"type": "ask_audio", "id": 8, "hint": "..."}``: answer the collected
+  recording on its own, like ``send_audio``.
+
+Server to client, in turn order: ``{"type": "reply", "id": 7, "status": 200,
+"reply": "..."}`` (``status`` is what the HTTP endpoint would have returned),
+or ``{"type": "dropped", "id": 6}`` for a question-less frame that was
+superseded before it was answered.
+
+Backpressure: at most ``LIVE_SOCKET_MAX_PENDING`` turns wait behind the one
+being answered. When that queue is full, the oldest waiting question-less
+frame is dropped for the new turn (a live view only needs the latest one);
+if there is none, the server stops reading from the socket until a turn
+finishes, which pushes back on the client through TCP flow control. Media
+over ``LIVE_SOCKET_MAX_MEDIA_BYTES`` per turn closes the connection (1009).
+"""
+import asyncio
+import json
+import os
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.http.cookie import parse_cookie
+
+from . import live_assistant
+from .frames import InvalidFrameError
+
+PATH = "/main/gemini/live/"
+
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_TOO_BIG = 1009
+CLOSE_SERVER_ERROR = 1011
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class _SessionRequest:
+    """The part of ``HttpRequest`` that ``auth.aget_user`` reads."""
+
+    def __init__(self, session):
+        self.session = session
+
+
+@dataclass
+class Turn:
+    id: object
+    frame: tuple = None
+    audio: tuple = None
+    text: str = ""
+
+    @property
+    def droppable(self):
+        return self.frame is not None and self.audio is None and not self.text
+
+
+def _headers(scope):
+    return {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+
+
+def _same_origin(headers):
+    # Browsers always send Origin on WebSocket handshakes; refusing foreign
+    # origins stands in for the CSRF check a POST would get.
+    origin = headers.get("origin")
+    return origin is None or urlsplit(origin).netloc == headers.get("host")
+
+
+async def _authenticate(headers):
+    """``(user, session_key)`` for the request's session cookie, or ``(None, None)``."""
+    session_key = parse_cookie(headers.get("cookie", "")).get(settings.SESSION_COOKIE_NAME)
+    if not session_key:
+        return None, None
+    session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    user = await auth.aget_user(_SessionRequest(session))
+    if not user.is_authenticated:
+        return None, None
+    return user, session_key
+
+
+def _get_executor():
+    # Turns block on the Gemini round-trip; size the pool like the client's
+    # connection pool rather than the event loop's small default executor.
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.GEMINI_POOL_SIZE, thread_name_prefix="live-socket"
+                )
+    return _executor
+
+
+def _answer(turn, session_key):
+    try:
+        if turn.frame is not None:
+            return live_assistant.answer_frame(session_key, turn.frame, turn.audio, turn.text)
+        return live_assistant.answer_audio(turn.audio, turn.text)
+    except InvalidFrameError as e:
+        return {"reply": f"Invalid frame: {e}"}, 400
+    except Exception as e:
+        traceback.print_exc()
+        return {"reply": f"Unexpected error: {e}"}, 500
+
+
+class LiveSession:
+    def __init__(self, send, session_key):
+        self.send = send
+        self.session_key = session_key
+        self.max_pending = settings.LIVE_SOCKET_MAX_PENDING
+        self.max_media_bytes = settings.LIVE_SOCKET_MAX_MEDIA_BYTES
+        self.pending = deque()
+        self.changed = asyncio.Condition()
+        self.audio_mime = None
+        self.audio_chunks = []
+        self.audio_bytes = 0
+        self.frame_header = None
+
+    async def send_json(self, payload):
+        await self.send({"type": "websocket.send", "text": json.dumps(payload)})
+
+    async def reply(self, turn_id, payload, status):
+        await self.send_json({"type": "reply", "id": turn_id, "status": status, **payload})
+
+    async def close(self, code):
+        await self.send({"type": "websocket.close", "code": code})
+
+    def take_audio(self):
+        audio = None
+        if self.audio_chunks:
+            audio = (b"".join(self.audio_chunks), self.audio_mime or "audio/webm")
+        self.audio_mime, self.audio_chunks, self.audio_bytes = None, [], 0
+        return audio
+
+    async def enqueue(self, turn):
+        async with self.changed:
+            while len(self.pending) >= self.max_pending:
+                stale = next((t for t in self.pending if t.droppable), None)
+                if stale is None:
+                    # Stop reading until the worker frees a slot.
+                    await self.changed.wait()
+                    continue
+                self.pending.remove(stale)
+                await self.send_json({"type": "dropped", "id": stale.id})
+            self.pending.append(turn)
+            self.changed.notify_all()
+
+    async def work(self):
+        answer = sync_to_async(_answer, thread_sensitive=False, executor=_get_executor())
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: self.pending)
+                turn = self.pending.popleft()
+                self.changed.notify_all()
+            payload, status = await answer(turn, self.session_key)
+            await self.reply(turn.id, payload, status)
+
+    async def on_text(self, text):
+        """Handle a control message."""
+        try:
+            message = json.loads(text)
+            kind = message["type"]
+        except (ValueError, TypeError, KeyError):
+            await self.reply(None, {"reply": "Invalid control message."}, 400)
+            return
+
+        if kind == "audio":
+            self.take_audio()
+            self.audio_mime = message.get("mime_type") or "audio/webm"
+        elif kind == "frame":
+            self.frame_header = message
+        elif kind == "ask_audio":
+            audio = self.take_audio()
+            if audio is None:
+                await self.reply(message.get("id"), {"reply": "Missing 'audio'."}, 400)
+            else:
+                await self.enqueue(Turn(message.get("id"), audio=audio, text=(message.get("hint") or "").strip()))
+        else:
+            await self.reply(message.get("id"), {"reply": f"Unknown message type {kind!r}."}, 400)
+
+    async def on_bytes(self, data):
+        """Handle a media message; return a close code to end the session."""
+        if self.frame_header is not None:
+            header, self.frame_header = self.frame_header, None
+            if len(data) + self.audio_bytes > self.max_media_bytes:
+                return CLOSE_TOO_BIG
+            turn = Turn(
+                header.get("id"),
+                frame=(data, header.get("mime_type") or "image/jpeg"),
+                audio=self.take_audio(),
+                text=(header.get("question") or "").strip(),
+            )
+            await self.enqueue(turn)
+        elif self.audio_mime is not None:
+            self.audio_bytes += len(data)
+            if self.audio_bytes > self.max_media_bytes:
+                return CLOSE_TOO_BIG
+            self.audio_chunks.append(data)
+        else:
+            await self.reply(None, {"reply": "Binary message without a preceding 'frame' or 'audio'."}, 400)
+        return None
+
+
+async def application(scope, receive, send):
+    """ASGI app for WebSocket connections."""
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    headers = _headers(scope)
+    user = session_key = None
+    if scope["path"] == PATH and _same_origin(headers):
+        user, session_key = await _authenticate(headers)
+    if user is None:
+        # Closing before accepting rejects the handshake (HTTP 403).
+        await send({"type": "websocket.close", "code": CLOSE_POLICY_VIOLATION})
+        return
+
+    await send({"type": "websocket.accept"})
+    session = LiveSession(send, session_key)
+    if not os.getenv("GEMINI_API_KEY"):
+        await session.reply(None, {"reply": "Error: GEMINI_API_KEY not configured on the server."}, 500)
+        await session.close(CLOSE_SERVER_ERROR)
+        return
+
+    worker = asyncio.create_task(session.work())
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is None:
+                await session.on_text(message.get("text") or "")
+                continue
+            close_code = await session.on_bytes(message["bytes"])
+            if close_code is not None:
+                await session.close(close_code)
+                return
+    finally:
+        worker.cancel()
@@ -0,0 +1,66 @@
+"""
+Shared async OpenAI client for the chat endpoint.
+
+openai 0.28 opens (and tears down) a fresh aiohttp session for every
+``acreate`` call unless one is supplied through ``openai.aiosession``. We keep
+one long-lived session per event loop instead, so chat turns reuse pooled
+keep-alive connections rather than paying a TCP/TLS handshake each time.
+"""
+import asyncio
+
+import aiohttp
+import openai
+from django.conf import settings
+
+from . import metrics
+
+_sessions = {}
+
+
+def get_session():
+    """Return the pooled session bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=settings.OPENAI_POOL_SIZE,
+            keepalive_timeout=settings.OPENAI_KEEPALIVE_SECONDS,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=settings.OPENAI_TIMEOUT_SECONDS),
+        )
+        _sessions[loop] = session
+    return session
+
+
+async def close_sessions():
+    """Close every pooled session (call on server shutdown)."""
+    while _sessions:
+        _, session = _sessions.popitem()
+        if not session.closed:
+            await session.close()
+
+
+async def achat_completion(messages, model="gpt-4o-mini", pooled=True, **kwargs):
+    """
+    Async ``ChatCompletion`` call.
+
+    ``pooled=False`` falls back to openai's per-call session. Use it when the
+    caller runs on a throwaway event loop (a WSGI worker driving an async view
+    through ``async_to_sync``), where a cached session would outlive its loop.
+    """
+    if pooled:
+        openai.aiosession.set(get_session())
+    # For a stream this times the call up to the first chunk; streamed
+    # responses carry no token usage.
+    with metrics.upstream_span("openai"):
+        response = await openai.ChatCompletion.acreate(
+            model=model,
+            messages=messages,
+            request_timeout=settings.OPENAI_TIMEOUT_SECONDS,
+            **kwargs,
+        )
+    if not kwargs.get("stream"):
+        metrics.record_openai_usage(response)
+    return response
@@ -0,0 +1,258 @@
+"""
+Re-run the AI analysis of saved pregnancy profiles after the analysis prompt
+or model changes, without making users resubmit.
+
+    python manage.py reanalyze_reports --user alice --user bob --concurrency 8 --rpm 300
+
+Reports are analysed on a bounded thread pool. Model calls are paced to
+``--rpm`` across all workers. A 429 from OpenAI pauses every worker for
+its ``Retry-After`` before that report is retried.
+
+Finished report ids are checkpointed to ``--checkpoint``. Running the same
+command again resumes where an interrupted run stopped, and reports that
+failed are retried. ``--restart`` discards the checkpoint. Users with a
+profile submission still being processed are skipped, since that job writes
+a fresh analysis anyway.
+"""
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import openai
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from home.models import BackgroundJob, PatientReport
+from home.profile_setup import PROFILE_SETUP_JOB, reanalyze_report
+
+
+class RateLimiter:
+    """Spaces calls ``60 / rpm`` seconds apart across threads; ``pause`` holds everyone back."""
+
+    def __init__(self, rpm):
+        self.interval = 60 / rpm if rpm else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+class Checkpoint:
+    """
+    Report ids already re-analysed, kept as ``through`` (every selected id up
+    to it is done) plus the finished ids above it, so the file stays small.
+    """
+
+    def __init__(self, path, selection):
+        self.path = path
+        self.selection = selection
+        self.through = 0
+        self.done = set()
+        self.failed = {}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as fh:
+            state = json.load(fh)
+        if state["selection"] != self.selection:
+            raise CommandError(
+                f"{self.path} is from a run with a different selection ({state['selection']}); "
+                "pass --restart to discard it."
+            )
+        self.through = state["through"]
+        self.done = set(state["done"])
+        return True
+
+    def is_done(self, report_id):
+        return report_id <= self.through or report_id in self.done
+
+    def mark(self, report_id, error=None):
+        if error is None:
+            self.done.add(report_id)
+            self.failed.pop(report_id, None)
+        else:
+            self.failed[report_id] = error
+
+    def save(self, remaining):
+        # Everything below the lowest id still to do is finished.
+        floor = min(remaining, default=None)
+        if floor is not None:
+            self.through = max(self.through, floor - 1)
+        else:
+            self.through = max(self.through, *self.done, 0)
+        self.done = {report_id for report_id in self.done if report_id > self.through}
+        state = {
+            "selection": self.selection,
+            "through": self.through,
+            "done": sorted(self.done),
+            "failed": {str(report_id): error for report_id, error in sorted(self.failed.items())},
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump(state, fh)
+        os.replace(tmp_path, self.path)
+
+
+def _retry_after(error):
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Re-run the AI analysis of saved pregnancy profiles with the current prompt and model."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", default=[], help="username to include (repeatable)")
+        parser.add_argument("--since", help="only reports created on or after this date (YYYY-MM-DD)")
+        parser.add_argument("--limit", type=int, help="re-analyse at most this many reports")
+        parser.add_argument("--concurrency", type=int, default=settings.REANALYSIS_CONCURRENCY)
+        parser.add_argument("--rpm", type=float, default=settings.REANALYSIS_REQUESTS_PER_MINUTE,
+                            help="model calls per minute across all workers (0: unpaced)")
+        parser.add_argument("--max-attempts", type=int, default=settings.REANALYSIS_MAX_ATTEMPTS)
+        parser.add_argument("--checkpoint", default="reanalyze_reports.checkpoint.json")
+        parser.add_argument("--restart", action="store_true", help="ignore and overwrite the checkpoint")
+        parser.add_argument("--progress-seconds", type=float, default=5.0)
+        parser.add_argument("--dry-run", action="store_true", help="list how many reports would be re-analysed")
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1.")
+        selection = {"users": sorted(options["user"]), "since": options["since"], "limit": options["limit"]}
+        checkpoint = Checkpoint(options["checkpoint"], selection)
+        if options["restart"]:
+            if os.path.exists(checkpoint.path):
+                os.remove(checkpoint.path)
+        elif checkpoint.load():
+            self.stdout.write(f"Resuming from {checkpoint.path}: reports up to {checkpoint.through} "
+                              f"and {len(checkpoint.done)} more already done.")
+
+        report_ids = [report_id for report_id in self._select(selection) if not checkpoint.is_done(report_id)]
+        if options["dry_run"]:
+            self.stdout.write(f"{len(report_ids)} reports to re-analyse.")
+            return
+        if not report_ids:
+            self.stdout.write("Nothing to re-analyse.")
+            return
+
+        self.limiter = RateLimiter(options["rpm"])
+        self.max_attempts = options["max_attempts"]
+        self._run(report_ids, checkpoint, options)
+
+    def _select(self, selection):
+        reports = PatientReport.objects.filter(data__type="pregnancy")
+        if selection["users"]:
+            reports = reports.filter(user__username__in=selection["users"])
+        if selection["since"]:
+            reports = reports.filter(created_at__date__gte=selection["since"])
+        busy = BackgroundJob.objects.filter(
+            kind=PROFILE_SETUP_JOB, status__in=(BackgroundJob.PENDING, BackgroundJob.RUNNING)
+        ).values("user")
+        report_ids = reports.exclude(user__in=busy).order_by("pk").values_list("pk", flat=True)
+        if selection["limit"]:
+            report_ids = report_ids[:selection["limit"]]
+        return list(report_ids)
+
+    def _analyze(self, report_id):
+        """Worker body: ``(report_id, updated, error)``; retries rate limits and API errors."""
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                self.limiter.acquire()
+                try:
+                    return report_id, reanalyze_report(report_id), None
+                except openai.error.RateLimitError as e:
+                    if attempt == self.max_attempts:
+                        return report_id, False, str(e)
+                    retry_after = _retry_after(e)
+                    self.limiter.pause(2 ** attempt if retry_after is None else retry_after)
+                except (openai.error.APIError, openai.error.Timeout, openai.error.APIConnectionError,
+                        openai.error.ServiceUnavailableError) as e:
+                    if attempt == self.max_attempts:
+                        return report_id, False, str(e)
+                    time.sleep(random.uniform(0, 2 ** attempt))
+                except Exception as e:  # a bad report shouldn't stop the run
+                    return report_id, False, f"{type(e).__name__}: {e}"
+        finally:
+            close_old_connections()
+
+    def _run(self, report_ids, checkpoint, options):
+        total = len(report_ids)
+        remaining = set(report_ids)
+        todo = iter(report_ids)
+        updated = skipped = failed = 0
+        started = last_report = time.monotonic()
+        # The main thread's connection would sit idle (and, with CONN_MAX_AGE, open) all run.
+        connection.close()
+
+        pool = ThreadPoolExecutor(max_workers=options["concurrency"], thread_name_prefix="reanalyze")
+        in_flight = set()
+        try:
+            while True:
+                # Submit lazily so an interrupt leaves little queued work behind.
+                while len(in_flight) < options["concurrency"] * 2:
+                    report_id = next(todo, None)
+                    if report_id is None:
+                        break
+                    in_flight.add(pool.submit(self._analyze, report_id))
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    report_id, saved, error = future.result()
+                    checkpoint.mark(report_id, error)
+                    if error is None:
+                        remaining.discard(report_id)
+                        updated += saved
+                        skipped += not saved
+                    else:
+                        failed += 1
+                        self.stderr.write(f"Report {report_id} failed: {error}")
+
+                now = time.monotonic()
+                if now - last_report >= options["progress_seconds"]:
+                    last_report = now
+                    checkpoint.save(remaining)
+                    self._progress(total, updated + skipped + failed, failed, now - started)
+        except KeyboardInterrupt:
+            self.stderr.write("Interrupted; waiting for reports in progress.")
+            for future in in_flight:
+                future.cancel()
+            for future in in_flight:
+                if not future.cancelled():
+                    report_id, saved, error = future.result()
+                    checkpoint.mark(report_id, error)
+                    if error is None:
+                        remaining.discard(report_id)
+            raise
+        finally:
+            pool.shutdown(wait=True)
+            checkpoint.save(remaining)
+
+        elapsed = time.monotonic() - started
+        self._progress(total, updated + skipped + failed, failed, elapsed)
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-analysed {updated} reports in {elapsed:.1f}s; {skipped} changed or removed meanwhile, "
+            f"{failed} failed (rerun to retry them)."
+        ))
+
+    def _progress(self, total, finished, failed, elapsed):
+        rate = finished / elapsed if elapsed else 0.0
+        eta = (total - finished) / rate if rate else float("inf")
+        self.stdout.write(f"{finished}/{total} reports, {failed} failed, {rate:.2f} reports/s, ETA {eta:.0f}s")
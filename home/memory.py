@@ -0,0 +1,213 @@
+"""
+Conversation memory for the chat endpoint: what of a user's earlier chat the
+model sees on each turn.
+
+The prompt gets two things besides the system prompt and the new message:
+
+- A window of the most recent turns, verbatim, newest first until
+  ``CHAT_MEMORY_TOKEN_BUDGET`` tokens (counted locally) or
+  ``CHAT_MEMORY_MAX_MESSAGES`` messages are used.
+- A rolling summary (``ConversationMemory``) of everything older, at most
+  ``CHAT_MEMORY_SUMMARY_TOKENS`` long. It covers messages up to
+  ``summarized_through_id``; once ``CHAT_MEMORY_FOLD_MIN_MESSAGES`` messages
+  have fallen out of the window without being summarized, a background job
+  (``home.jobs``) folds them into the existing summary. Each fold only reads
+  the summary and the new messages, never the whole transcript.
+
+So the history part of the prompt is bounded however long the chat gets, and
+each turn reads at most ``CHAT_MEMORY_MAX_MESSAGES + CHAT_MEMORY_FOLD_MIN_MESSAGES``
+rows. Messages still in the write-behind buffer (``home.transcript``) are
+part of the window too.
+"""
+import functools
+import threading
+from dataclasses import dataclass, field
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from . import jobs, llm, transcript
+from .models import BackgroundJob, ChatMessage, ConversationMemory
+
+CONVERSATION_SUMMARY_JOB = "conversation_summary"
+TOKEN_ENCODING = "o200k_base"  # gpt-4o / gpt-4o-mini
+# Per-message framing tokens (role and separators) in the chat format.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_ROLES = {"user": "user", "bot": "assistant"}
+
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        # tiktoken missing, or its encoding file can't be fetched (offline).
+        return None
+
+
+def warm_encoding():
+    """Load the encoding on a background thread, so the first chat turn needn't wait for it."""
+    threading.Thread(target=_encoding, name="tiktoken-warmup", daemon=True).start()
+
+
+async def _aencoding():
+    # The first load may download the BPE file; keep that off the event loop.
+    if _encoding.cache_info().currsize:
+        return _encoding()
+    return await sync_to_async(_encoding, thread_sensitive=False)()
+
+
+def count_tokens(text):
+    """Tokens in ``text`` for the chat model; about four characters a token without tiktoken."""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(content):
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class History:
+    summary: str = ""
+    messages: list = field(default_factory=list)  # chat-format dicts, oldest first
+    tokens: int = 0
+    # Oldest message id in the window, and whether older unsummarized
+    # messages are due to be folded into the summary.
+    window_start_id: int = None
+    needs_fold: bool = False
+
+    def prompt_messages(self):
+        """Messages to put between the system prompt and the new user message."""
+        summary = []
+        if self.summary:
+            summary = [{"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"}]
+        return summary + self.messages
+
+
+def pack_window(rows, budget, max_messages):
+    """
+    Take ``(role, content)`` rows, newest first, while they fit in ``budget``
+    tokens and ``max_messages``. Returns ``(taken, tokens)``, newest first.
+    """
+    taken, tokens = [], 0
+    for row in rows:
+        cost = message_tokens(row[1])
+        if len(taken) >= max_messages or tokens + cost > budget:
+            break
+        taken.append(row)
+        tokens += cost
+    return taken, tokens
+
+
+async def abuild_history(user):
+    """The summary and recent-turns window to send with ``user``'s next message."""
+    memory = await (
+        ConversationMemory.objects.filter(user=user)
+        .values("summary", "summarized_through_id")
+        .afirst()
+    )
+    through = memory["summarized_through_id"] if memory else 0
+    max_messages = settings.CHAT_MEMORY_MAX_MESSAGES
+    limit = max_messages + settings.CHAT_MEMORY_FOLD_MIN_MESSAGES
+
+    # Newest first: buffered rows (not yet written, so newer than any stored
+    # row), then stored rows.
+    rows = [(None, role, content) for role, content in reversed(transcript.pending(user.pk))]
+    stored = ChatMessage.objects.filter(user=user, id__gt=through).order_by("-id")
+    rows += [row async for row in stored.values_list("id", "role", "content")[:limit]]
+
+    await _aencoding()
+    taken, tokens = pack_window(
+        [(role, content) for _, role, content in rows], settings.CHAT_MEMORY_TOKEN_BUDGET, max_messages
+    )
+    stored_ids = [row[0] for row in rows[: len(taken)] if row[0] is not None]
+    return History(
+        summary=memory["summary"] if memory else "",
+        messages=[{"role": _ROLES.get(role, "user"), "content": content} for role, content in reversed(taken)],
+        tokens=tokens,
+        window_start_id=stored_ids[-1] if stored_ids else None,
+        needs_fold=len(rows) - len(taken) >= settings.CHAT_MEMORY_FOLD_MIN_MESSAGES,
+    )
+
+
+def schedule_fold(user, history):
+    """Queue a summary fold for ``history`` unless one is already queued or running."""
+    if not history.needs_fold:
+        return None
+    busy = BackgroundJob.objects.filter(
+        user=user, kind=CONVERSATION_SUMMARY_JOB, status__in=(BackgroundJob.PENDING, BackgroundJob.RUNNING)
+    )
+    if busy.exists():
+        return None
+    return jobs.enqueue(user, CONVERSATION_SUMMARY_JOB, fold_summary, history.window_start_id)
+
+
+def summary_model():
+    return settings.CHAT_MEMORY_SUMMARY_MODEL or settings.LLM_OPENAI_MODEL
+
+
+def summary_messages(summary, rows):
+    transcript_text = "\n".join(
+        f"{'Patient' if role == 'user' else 'Assistant'}: {content}" for role, content in rows
+    )
+    prompt = (
+        "You maintain the running summary of a chat between a pregnant patient and an AI pregnancy "
+        "companion. Update the summary with the new messages below. Keep symptoms, medications, "
+        "measurements, concerns, advice given and anything the patient asked to be remembered; drop "
+        "small talk. Reply with the updated summary only, as short notes, under "
+        f"{settings.CHAT_MEMORY_SUMMARY_TOKENS} tokens."
+    )
+    return [
+        {"role": "system", "content": prompt},
+        {
+            "role": "user",
+            "content": f"--- Current summary ---\n{summary or '(none yet)'}\n\n--- New messages ---\n{transcript_text}",
+        },
+    ]
+
+
+def fold_summary(job, window_start_id):
+    """
+    Background job body: fold the messages between the current summary and
+    ``window_start_id`` (the oldest message still in the prompt window) into
+    the summary, oldest first, at most ``CHAT_MEMORY_FOLD_MAX_MESSAGES`` per run.
+    """
+    memory = ConversationMemory.objects.filter(user=job.user_id).first()
+    through = memory.summarized_through_id if memory else 0
+    rows = ChatMessage.objects.filter(user=job.user_id, id__gt=through).order_by("id")
+    if window_start_id is not None:
+        rows = rows.filter(id__lt=window_start_id)
+    rows = list(rows.values_list("id", "role", "content")[: settings.CHAT_MEMORY_FOLD_MAX_MESSAGES])
+    if not rows:
+        return
+
+    messages = summary_messages(memory.summary if memory else "", [(role, content) for _, role, content in rows])
+    # Through the shared helper for its timeout, span and usage metrics. This
+    # runs on a job-runner thread, so without a pooled session.
+    response = async_to_sync(llm.achat_completion)(
+        messages=messages, model=summary_model(), pooled=False, max_tokens=settings.CHAT_MEMORY_SUMMARY_TOKENS
+    )
+    summary = response["choices"][0]["message"]["content"].strip()
+    last_id = rows[-1][0]
+
+    # The history was cleared while the model was summarizing it.
+    if not ChatMessage.objects.filter(pk=last_id).exists():
+        return
+    if memory is None:
+        try:
+            ConversationMemory.objects.create(user_id=job.user_id, summary=summary, summarized_through_id=last_id)
+        except IntegrityError:
+            pass  # a concurrent fold got there first; the next turn schedules another
+        return
+    # Only advance from the state this fold started from.
+    ConversationMemory.objects.filter(user=job.user_id, summarized_through_id=through).update(
+        summary=summary, summarized_through_id=last_id, updated_at=timezone.now()
+    )
@@ -0,0 +1,265 @@
+"""
+In-process latency and usage metrics, exposed in the Prometheus text format
+by the staff-only ``/main/metrics/`` view.
+
+- ``MetricsMiddleware`` times every request, labelled by URL name, method
+  and status. For a streamed reply that is the time to the response headers.
+- ``span(stage)`` times one stage of work: ``db`` (every query, through a
+  connection execute wrapper), ``pdf_parse``, ``openai`` and ``gemini``.
+  Prometheus computes p50/p99 per stage from the histogram buckets.
+- ``upstream_span(name)`` is a ``span`` that also counts the call as ``ok``
+  or ``error``, for upstream error rates; ``record_openai_usage`` adds up the
+  ``usage`` token counts of OpenAI responses.
+- ``HEDGED_REQUESTS`` counts model calls that fired a hedge (home/providers.py)
+  and which provider answered.
+
+The reply cache, frame dedup, transcript buffer and Gemini circuit breaker
+are read at scrape time. Metrics are per process: with several workers,
+scrape each one.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._series = {}  # labels -> [bucket counts..., sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-1] += value
+
+    def count(self, **labels):
+        series = self._series.get(tuple(str(labels[name]) for name in self.labelnames))
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = _labels(self.labelnames, key, [("le", _number(bound))])
+                yield f"{self.name}_bucket{le} {cumulative}"
+            labels = _labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_number(values[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "gynac_http_request_duration_seconds", "Request latency by URL name.", ("view", "method", "status")
+)
+STAGE_SECONDS = Histogram(
+    "gynac_stage_duration_seconds", "Time spent in one stage of request or job work.", ("stage",)
+)
+UPSTREAM_REQUESTS = Counter(
+    "gynac_upstream_requests_total", "Calls to upstream APIs by outcome.", ("upstream", "outcome")
+)
+OPENAI_TOKENS = Counter(
+    "gynac_openai_tokens_total", "OpenAI token usage as reported in responses.", ("model", "type")
+)
+BACKGROUND_JOBS = Counter(
+    "gynac_background_jobs_total", "Finished background jobs by outcome.", ("kind", "status")
+)
+HEDGED_REQUESTS = Counter(
+    "gynac_llm_hedged_requests_total", "Model calls that fired a hedge, by route and the provider that answered.",
+    ("route", "winner"),
+)
+
+_METRICS = (HTTP_REQUEST_SECONDS, STAGE_SECONDS, UPSTREAM_REQUESTS, OPENAI_TOKENS, BACKGROUND_JOBS, HEDGED_REQUESTS)
+
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+@contextmanager
+def upstream_span(upstream):
+    with span(upstream):
+        try:
+            yield
+        except Exception:
+            UPSTREAM_REQUESTS.inc(upstream=upstream, outcome="error")
+            raise
+    UPSTREAM_REQUESTS.inc(upstream=upstream, outcome="ok")
+
+
+def record_openai_usage(response):
+    """Add a (non-streamed) ``ChatCompletion`` response's token usage."""
+    usage = response.get("usage") or {}
+    model = response.get("model") or "unknown"
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            OPENAI_TOKENS.inc(usage[kind], model=model, type=kind.removesuffix("_tokens"))
+
+
+def _time_query(execute, sql, params, many, context):
+    with span("db"):
+        return execute(sql, params, many, context)
+
+
+def install_db_timing(sender, connection, **kwargs):
+    """``connection_created`` receiver: time every query on the new connection."""
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class MetricsMiddleware:
+    """Per-endpoint latency histogram; put it first so it covers the other middleware."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, start)
+        return response
+
+    def _record(self, request, response, start):
+        # URL names rather than paths keep the label set bounded.
+        match = request.resolver_match
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            view=match.view_name if match else "unmatched",
+            method=request.method,
+            status=response.status_code,
+        )
+
+
+def _collected():
+    """``(name, type, help, value)`` for the in-process caches and buffers, read now."""
+    from . import gemini, transcript
+    from .frame_dedup import get_frame_dedup
+    from .reply_cache import get_reply_cache
+
+    collected = []
+    reply_cache = get_reply_cache()
+    if reply_cache is not None:
+        stats = reply_cache.stats()
+        collected += [
+            ("gynac_reply_cache_entries", "gauge", "Chat replies in the reply cache.", stats["size"]),
+            ("gynac_reply_cache_hits_total", "counter", "Reply cache hits.", stats["hits"]),
+            ("gynac_reply_cache_misses_total", "counter", "Reply cache misses.", stats["misses"]),
+        ]
+    dedup = get_frame_dedup()
+    if dedup is not None:
+        stats = dedup.stats()
+        collected += [
+            ("gynac_frame_dedup_hits_total", "counter", "Camera frames answered from a near-identical frame.",
+             stats["hits"]),
+            ("gynac_frame_dedup_misses_total", "counter", "Camera frames sent to Gemini.", stats["misses"]),
+        ]
+    buffer = transcript._buffer
+    if buffer is not None:
+        collected += [
+            ("gynac_transcript_buffered_rows", "gauge", "Chat messages waiting in the write-behind buffer.",
+             len(buffer._rows)),
+            ("gynac_transcript_rows_written_total", "counter", "Chat messages written by write-behind flushes.",
+             buffer.rows_written),
+        ]
+    client = gemini._client
+    if client is not None:
+        collected.append(
+            ("gynac_gemini_circuit_open", "gauge", "1 while the Gemini circuit breaker is open.",
+             int(client.breaker.state == "open"))
+        )
+    return collected
+
+
+def render():
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _METRICS:
+        lines += [f"# HELP {metric.name} {metric.help_text}", f"# TYPE {metric.name} {metric.kind}"]
+        lines += metric.samples()
+    for name, kind, help_text, value in _collected():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {_number(value)}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:08
+
+from django.db import migrations, models
+
+
+
+# Frozen copies of home.models.render_context_summary / render_emergency_info
+# as of this migration, so later changes to them don't change what it writes.
+def render_context_summary(data):
+    if not data:
+        return ""
+    conditions_list = [k for k, v in data.get('conditions', {}).items() if v]
+    conditions_str = ', '.join(conditions_list) or 'None'
+    return (
+        f"- DOB: {data.get('dob', '1-1-2000')}.\n"
+        f"- Due Date: {data.get('dueDate', 'Not provided')}.\n"
+        f"- Known Medical Conditions: {conditions_str}.\n"
+        f"- Previous C-Section: {'Yes' if data.get('previousCSection') else 'No'}.\n"
+        f"- Drug Allergies: {data.get('allergies', {}).get('drug', 'None reported')}.\n"
+        f"- Food Allergies: {data.get('allergies', {}).get('food', 'None reported')}.\n"
+        f"- Doctor's Name: {data.get('doctorName', 'Not provided')}.\n"
+        f"- Location: {data.get('location', {}).get('city', 'Not provided')}."
+    )
+
+
+def render_emergency_info(data):
+    emergency_info = ""
+    if data:
+        contact_name = data.get("emergencyContact", {}).get("name")
+        hospital = data.get("hospitalName")
+        if hospital:
+            emergency_info += f"\nYour registered hospital is: {hospital}."
+        if contact_name:
+            emergency_info += f"\nYour emergency contact is {contact_name}."
+    return emergency_info
+
+
+def backfill_context(apps, schema_editor):
+    PatientReport = apps.get_model('home', 'PatientReport')
+    for report in PatientReport.objects.all().iterator():
+        report.context_summary = render_context_summary(report.data)
+        report.emergency_info = render_emergency_info(report.data)
+        report.save(update_fields=['context_summary', 'emergency_info'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0002_remove_chatmessage_meta_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientreport',
+            name='context_summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='patientreport',
+            name='emergency_info',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RunPython(backfill_context, migrations.RunPython.noop),
+    ]
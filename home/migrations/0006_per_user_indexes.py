@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0005_reportcacheentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['user', 'timestamp'], name='chatmessage_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientreport',
+            index=models.Index(fields=['user', '-created_at'], name='patientreport_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('home', '0006_per_user_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationMemory',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('summary', models.TextField(blank=True, default='')),
+                ('summarized_through_id', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0007_conversationmemory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientReportText',
+            fields=[
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='texts', serialize=False, to='home.patientreport')),
+                ('sonography', models.TextField(blank=True, default='')),
+                ('blood', models.TextField(blank=True, default='')),
+            ],
+        ),
+    ]
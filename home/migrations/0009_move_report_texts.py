@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:41
+
+from django.db import migrations
+
+TEXT_KEYS = {
+    'extracted_sonography_report_content': 'sonography',
+    'extracted_blood_report_content': 'blood',
+}
+
+
+def move_texts_out(apps, schema_editor):
+    PatientReport = apps.get_model('home', 'PatientReport')
+    PatientReportText = apps.get_model('home', 'PatientReportText')
+    for report in PatientReport.objects.all().iterator():
+        if not isinstance(report.data, dict) or not TEXT_KEYS.keys() & report.data.keys():
+            continue
+        texts = {field: report.data.pop(key, None) or "" for key, field in TEXT_KEYS.items()}
+        PatientReportText.objects.update_or_create(report=report, defaults=texts)
+        report.save(update_fields=['data'])
+
+
+def move_texts_back(apps, schema_editor):
+    PatientReportText = apps.get_model('home', 'PatientReportText')
+    for texts in PatientReportText.objects.select_related('report').iterator():
+        report = texts.report
+        report.data = {**report.data, **{key: getattr(texts, field) for key, field in TEXT_KEYS.items()}}
+        report.save(update_fields=['data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0008_patientreporttext'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_texts_out, move_texts_back),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0009_move_report_texts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientreport',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:46
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0010_patientreport_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailylog',
+            name='log_date',
+            field=models.DateField(default=datetime.date.today),
+        ),
+        migrations.CreateModel(
+            name='DailyLogWeek',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('days_logged', models.PositiveSmallIntegerField(default=0)),
+                ('counts', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['week_start'],
+                'unique_together': {('user', 'week_start')},
+            },
+        ),
+    ]
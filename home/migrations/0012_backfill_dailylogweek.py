@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:45
+
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import migrations
+
+
+def build_rollups(apps, schema_editor):
+    DailyLog = apps.get_model('home', 'DailyLog')
+    DailyLogWeek = apps.get_model('home', 'DailyLogWeek')
+    weeks = defaultdict(Counter)
+    for user_id, log_date, data in DailyLog.objects.values_list('user_id', 'log_date', 'data').iterator():
+        log_type = data.get('type', 'generic') if isinstance(data, dict) else 'generic'
+        weeks[user_id, log_date - timedelta(days=log_date.weekday())][log_type] += 1
+    DailyLogWeek.objects.bulk_create(
+        DailyLogWeek(user_id=user_id, week_start=week_start, days_logged=sum(counts.values()), counts=dict(counts))
+        for (user_id, week_start), counts in weeks.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0011_dailylogweek'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
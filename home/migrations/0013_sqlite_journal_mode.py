@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:10
+
+from django.conf import settings
+from django.db import migrations
+
+
+def set_journal_mode(apps, schema_editor):
+    # The journal mode is stored in the database file, so it is set here once
+    # rather than on every connection (see home/db_tuning.py).
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or not settings.SQLITE_TUNING_ENABLED:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+
+
+class Migration(migrations.Migration):
+    # SQLite can't switch into WAL mode inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('home', '0012_backfill_dailylogweek'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_journal_mode, migrations.RunPython.noop),
+    ]
@@ -1,20 +1,96 @@
 # main/models.py
 
+from datetime import date
+
 from django.db import models
 from django.contrib.auth.models import User
 
+
+def render_context_summary(data):
+    """Patient-context block for the chat system prompt (minus the name line)."""
+    if not data:
+        return ""
+    # Create a list of known conditions
+    conditions_list = [k for k, v in data.get('conditions', {}).items() if v]
+    conditions_str = ', '.join(conditions_list) or 'None'
+    return (
+        f"- DOB: {data.get('dob', '1-1-2000')}.\n"
+        f"- Due Date: {data.get('dueDate', 'Not provided')}.\n"
+        f"- Known Medical Conditions: {conditions_str}.\n"
+        f"- Previous C-Section: {'Yes' if data.get('previousCSection') else 'No'}.\n"
+        f"- Drug Allergies: {data.get('allergies', {}).get('drug', 'None reported')}.\n"
+        f"- Food Allergies: {data.get('allergies', {}).get('food', 'None reported')}.\n"
+        f"- Doctor's Name: {data.get('doctorName', 'Not provided')}.\n"
+        f"- Location: {data.get('location', {}).get('city', 'Not provided')}."
+    )
+
+
+def render_emergency_info(data):
+    """Hospital / emergency-contact lines appended to red-flag replies."""
+    emergency_info = ""
+    if data:
+        contact_name = data.get("emergencyContact", {}).get("name")
+        hospital = data.get("hospitalName")
+        if hospital:
+            emergency_info += f"\nYour registered hospital is: {hospital}."
+        if contact_name:
+            emergency_info += f"\nYour emergency contact is {contact_name}."
+    return emergency_info
+
+
 class PatientReport(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     data = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Rendered from ``data`` on every save so the chat hot path can read these
+    # small text columns instead of deserializing the whole report JSON.
+    context_summary = models.TextField(blank=True, default="")
+    emergency_info = models.TextField(blank=True, default="")
+    # Bumped on every save(); the profile API's ETag. queryset.update() skips it.
+    version = models.PositiveIntegerField(default=1)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # "Latest report for this user": home, chat, profile API.
+            models.Index(fields=['user', '-created_at'], name='patientreport_user_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.context_summary = render_context_summary(self.data)
+        self.emergency_info = render_emergency_info(self.data)
+        if self.pk is not None:
+            self.version += 1
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "version"}
+            if "data" in update_fields:
+                kwargs["update_fields"] |= {"context_summary", "emergency_info"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         report_type = self.data.get('type', 'general')
         return f"Report ({report_type}) for {self.user.username} at {self.created_at.strftime('%Y-%m-%d')}"
 
+
+def latest_report_language(user):
+    """``language`` from the user's latest report (``None`` if unset), reading only that key of ``data``."""
+    return PatientReport.objects.filter(user=user).values_list("data__language", flat=True).first()
+
+
+class PatientReportText(models.Model):
+    """
+    Text extracted from a report's uploaded PDFs. It can run to tens of KB,
+    so it lives apart from ``PatientReport.data``, which every page load reads;
+    only the profile-setup job writes it and nothing on a request path loads it.
+    """
+    report = models.OneToOneField(PatientReport, on_delete=models.CASCADE, primary_key=True, related_name='texts')
+    sonography = models.TextField(blank=True, default="")
+    blood = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"Report text for report {self.report_id}"
+
 class ChatMessage(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     role = models.CharField(max_length=10)  # 'user' or 'bot'
@@ -23,6 +99,14 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # A user's transcript in order.
+            models.Index(fields=['user', 'timestamp'], name='chatmessage_user_ts_idx'),
+            # History pages and the memory window: newest first by id, with an
+            # id cursor. SQLite could use the FK index (it appends the rowid);
+            # PostgreSQL would scan the user's rows and sort them.
+            models.Index(fields=['user', '-id'], name='chatmessage_user_id_idx'),
+        ]
 
     def __str__(self):
         return f"[{self.user.username}] {self.role}: {self.content[:50]}..."
@@ -34,16 +118,101 @@ class DailyLog(models.Model):
     This is the foundation for tracking progress over time.
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    log_date = models.DateField(auto_now_add=True)
+    # Defaults to today; set explicitly to log or backfill another day.
+    log_date = models.DateField(default=date.today)
     # Flexible JSONField to store various types of logs (symptoms, mood, etc.)
     data = models.JSONField(default=dict)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        # Ensure one log per user per day to avoid duplicates, can be adjusted
+        # Ensure one log per user per day to avoid duplicates, can be adjusted.
+        # Its (user, log_date) index also serves the per-user, newest-first reads.
         unique_together = ('user', 'log_date')
         ordering = ['-log_date']
 
     def __str__(self):
         log_type = self.data.get('type', 'generic')
-        return f"{log_type.title()} log for {self.user.username} on {self.log_date}"
\ No newline at end of file
+        return f"{log_type.title()} log for {self.user.username} on {self.log_date}"
+
+
+class DailyLogWeek(models.Model):
+    """
+    Per-user, per-calendar-week (Monday start) rollup of ``DailyLog``, kept up
+    to date on every write by ``home.daily_logs``, so a trend chart reads one
+    row per week instead of decoding every daily entry.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    week_start = models.DateField()
+    days_logged = models.PositiveSmallIntegerField(default=0)
+    counts = models.JSONField(default=dict)  # log type -> days logged with that type
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # The unique (user, week_start) index serves the per-user range reads.
+        unique_together = ('user', 'week_start')
+        ordering = ['week_start']
+
+    def __str__(self):
+        return f"Week of {self.week_start} for {self.user.username}: {self.days_logged} days"
+
+class BackgroundJob(models.Model):
+    """
+    A unit of work run off the request path by ``home.jobs``. The row tracks
+    status for polling; the work itself runs on the in-process job runner.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(s, s) for s in (PENDING, RUNNING, SUCCEEDED, FAILED)]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=32)  # e.g. 'profile_setup'
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.kind} job for {self.user.username}: {self.status}"
+
+
+class ReportCacheEntry(models.Model):
+    """
+    Content-addressed cache for the profile-setup pipeline (``home.report_cache``):
+    extracted PDF text keyed by the SHA-256 of the file bytes, and AI analyses
+    keyed by the SHA-256 of the exact model input.
+    """
+    TEXT = 'text'
+    ANALYSIS = 'analysis'
+    KIND_CHOICES = [(TEXT, 'Extracted text'), (ANALYSIS, 'AI analysis')]
+
+    key = models.CharField(max_length=64, primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    content = models.TextField()
+    size = models.PositiveIntegerField()  # bytes of content, for the size bound
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.key[:12]}… ({self.size} bytes)"
+
+
+class ConversationMemory(models.Model):
+    """
+    Rolling summary of a user's chat older than the recent-turns window
+    (``home.memory``). ``summarized_through_id`` is the last ``ChatMessage``
+    folded into ``summary``; newer messages are read verbatim.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    summary = models.TextField(blank=True, default="")
+    summarized_through_id = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Conversation memory for {self.user.username} (through message {self.summarized_through_id})"
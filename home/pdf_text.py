@@ -0,0 +1,158 @@
+"""
+Shared PDF text-extraction service for uploaded reports.
+
+- Size and page caps (``PDF_MAX_BYTES`` / ``PDF_MAX_PAGES``) are enforced
+  before any page text is extracted.
+- Files on disk are handed to PyPDF2 as open file objects, which it reads
+  object by object; given a path (or the old ``BytesIO(upload.read())``) it
+  copies the whole file into memory first, roughly doubling peak memory for
+  a large scanned report.
+- Each page is parsed once and its text yielded as soon as it is extracted.
+- Documents with at least ``PDF_PARALLEL_MIN_PAGES`` pages are split into
+  one contiguous page range per worker and extracted on a process pool of
+  ``PDF_EXTRACT_WORKERS`` processes (PyPDF2 is pure Python, so threads would
+  just contend for the GIL). A pool whose worker died is replaced and the
+  document finished in-process; one that takes longer than
+  ``PDF_EXTRACT_TIMEOUT_SECONDS`` is abandoned and the extraction fails.
+"""
+import io
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from itertools import repeat
+from multiprocessing import get_context
+
+import PyPDF2
+from django.conf import settings
+
+from . import metrics
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class PdfTooLargeError(ValueError):
+    pass
+
+
+class PdfExtractTimeoutError(TimeoutError):
+    pass
+
+
+def save_upload(uploaded_file):
+    """
+    Spool an ``UploadedFile`` to a temp file and return its path, so the
+    bytes are not held in memory while the report waits for extraction.
+    The caller owns (and must delete) the file.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spool:
+        for chunk in uploaded_file.chunks():
+            spool.write(chunk)
+    return spool.name
+
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+@contextmanager
+def _open_reader(source):
+    if _is_path(source):
+        with open(source, "rb") as fh:
+            yield PyPDF2.PdfReader(fh)
+    else:
+        yield PyPDF2.PdfReader(io.BytesIO(source))
+
+
+def _page_texts(reader, start, stop):
+    for index in range(start, stop):
+        text = reader.pages[index].extract_text()
+        if text:
+            yield text
+
+
+def _extract_range(path, start, stop):
+    # Runs in pool workers, so it must not touch Django settings.
+    with _open_reader(path) as reader:
+        return list(_page_texts(reader, start, stop))
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn, not fork: the web process runs threads (job runner,
+                # DB connections) that must not be duplicated into children.
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.PDF_EXTRACT_WORKERS, mp_context=get_context("spawn")
+                )
+    return _pool
+
+
+def _discard_pool(pool):
+    """Stop using ``pool``; the next parallel extraction starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    # Don't wait: a stuck worker exits once its current range is done.
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _check_size(source):
+    size = os.path.getsize(source) if _is_path(source) else len(source)
+    if size > settings.PDF_MAX_BYTES:
+        raise PdfTooLargeError(
+            f"file is {size // 1024} KB; the limit is {settings.PDF_MAX_BYTES // 1024} KB"
+        )
+
+
+def iter_page_texts(source):
+    """
+    Yield the non-empty text of each page of ``source`` (a file path or the
+    PDF bytes) in page order, stopping after ``PDF_MAX_PAGES``. Yields a
+    final truncation note if pages were skipped.
+    """
+    _check_size(source)
+    with _open_reader(source) as reader:
+        total_pages = len(reader.pages)
+        pages = min(total_pages, settings.PDF_MAX_PAGES)
+        workers = settings.PDF_EXTRACT_WORKERS
+
+        if _is_path(source) and workers > 1 and pages >= settings.PDF_PARALLEL_MIN_PAGES:
+            step = -(-pages // workers)
+            starts = range(0, pages, step)
+            stops = [min(start + step, pages) for start in starts]
+            pool = _get_pool()
+            done = 0
+            try:
+                for texts in pool.map(_extract_range, repeat(source), starts, stops,
+                                      timeout=settings.PDF_EXTRACT_TIMEOUT_SECONDS):
+                    done += 1
+                    yield from texts
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed), which breaks the pool for
+                # good. Replace it for later calls; finish this one here.
+                _discard_pool(pool)
+                yield from _page_texts(reader, starts[done], pages)
+            except FuturesTimeoutError:
+                _discard_pool(pool)
+                raise PdfExtractTimeoutError(
+                    f"extraction took over {settings.PDF_EXTRACT_TIMEOUT_SECONDS:g}s"
+                ) from None
+        else:
+            yield from _page_texts(reader, 0, pages)
+
+    if total_pages > pages:
+        yield f"[Report truncated after {pages} of {total_pages} pages.]"
+
+
+def extract_text(source):
+    """All page text of ``source`` joined by newlines."""
+    with metrics.span("pdf_parse"):
+        return "\n".join(iter_page_texts(source))
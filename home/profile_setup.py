@@ -0,0 +1,162 @@
+"""
+Profile-setup pipeline: PDF text extraction and the AI report analysis.
+
+``pregnancy_details_view`` saves the form data and hands the uploaded files
+to ``run_profile_setup`` on the background job runner (``home.jobs``), which
+fills in the extracted text and analysis and posts the welcome message.
+``reanalyze_report`` re-runs only the analysis, for the ``reanalyze_reports``
+management command.
+"""
+import os
+import re
+
+from django.db import transaction
+
+from . import pdf_text, providers, report_cache
+from .models import BackgroundJob, ChatMessage, PatientReport, PatientReportText, ReportCacheEntry
+
+PROFILE_SETUP_JOB = "profile_setup"
+
+
+def extract_pdf_text(path, label):
+    """Extracted text of an uploaded PDF, served from the report cache on a repeat upload."""
+    try:
+        digest = report_cache.file_digest(path)
+        text = report_cache.get(ReportCacheEntry.TEXT, digest)
+        if text is None:
+            text = pdf_text.extract_text(path)
+            report_cache.put(ReportCacheEntry.TEXT, digest, text)
+        return text
+    except Exception as e:
+        return f"Error processing {label} PDF: {e}"
+
+
+def analysis_messages(form_data, extracted_text_from_sonography, extracted_text_from_blood_report):
+    weeks_pregnant = form_data.get("weeks_pregnant")
+    user_provided_summary = f"""
+    - Patient is {weeks_pregnant} weeks pregnant.
+    - DOB: {form_data.get('dob')}. Conditions: {', '.join([k for k, v in form_data.get('conditions', {}).items() if v]) or 'None'}.
+    - Vitals: Current Weight {form_data.get('vitals', {}).get('currentWeight')}kg, Height {form_data.get('vitals', {}).get('height')}cm.
+    - Allergies: Drug: {form_data.get('allergies',{}).get('drug') or 'None'}, Food: {form_data.get('allergies',{}).get('food') or 'None'}.
+    """
+    full_context_for_ai = (
+        f"### User Profile:\n{user_provided_summary}\n\n"
+        f"### Sonography Report Text:\n{extracted_text_from_sonography}\n\n"
+        f"### Blood Report Text:\n{extracted_text_from_blood_report}"
+    )
+
+    prompt = (
+        "Analyze the following patient profile and lab reports. Provide a concise, 2 line summary "
+        "highlighting key findings, potential concerns, and topics to discuss with a doctor. "
+        "Be empathetic and professional."
+    )
+    return [
+        {"role": "system", "content": "You are an expert obstetrics assistant AI."},
+        {"role": "user", "content": f"{prompt}\n\n--- DATA ---\n{full_context_for_ai}"}
+    ]
+
+
+def analyze_profile(form_data, extracted_text_from_sonography, extracted_text_from_blood_report):
+    """
+    Two-line AI summary of the profile and reports, on the
+    ``report_analysis`` provider route. Identical model input (same profile,
+    same report text, same providers) is answered from the report cache.
+    Raises on API errors.
+    """
+    messages = analysis_messages(form_data, extracted_text_from_sonography, extracted_text_from_blood_report)
+    digest = report_cache.messages_digest(providers.get_router().describe("report_analysis"), messages)
+    cached = report_cache.get(ReportCacheEntry.ANALYSIS, digest)
+    if cached is not None:
+        return cached
+
+    ai_analysis = providers.complete("report_analysis", messages).text
+    cleaned_response = re.sub(r"[\*#]+", "", ai_analysis).strip()
+    report_cache.put(ReportCacheEntry.ANALYSIS, digest, cleaned_response)
+    return cleaned_response
+
+
+def run_profile_setup(job, report_id, sonography_path=None, blood_path=None):
+    """
+    Background job body. ``*_path`` are uploads spooled to disk by the view;
+    they are deleted once the job is finished with them. Analysis errors are
+    re-raised so the runner retries them; on the last attempt the error text
+    is saved as the analysis instead, as the synchronous view used to do.
+    """
+    retrying = False
+    try:
+        _profile_setup(job, report_id, sonography_path, blood_path)
+    except Exception:
+        retrying = job.attempts < job.max_attempts
+        raise
+    finally:
+        if not retrying:
+            for path in (sonography_path, blood_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+
+def _profile_setup(job, report_id, sonography_path, blood_path):
+    extracted_text_from_sonography = extract_pdf_text(sonography_path, "sonography") if sonography_path else ""
+    extracted_text_from_blood_report = extract_pdf_text(blood_path, "blood report") if blood_path else ""
+
+    report = PatientReport.objects.filter(pk=report_id).first()
+    if report is None:
+        return  # profile was cleared while the job was queued
+
+    try:
+        cleaned_response = analyze_profile(
+            report.data, extracted_text_from_sonography, extracted_text_from_blood_report
+        )
+    except Exception as e:
+        if job.attempts < job.max_attempts:
+            raise
+        cleaned_response = f"An error occurred during AI analysis: {e}"
+
+    with transaction.atomic():
+        # A newer submission supersedes this one; don't overwrite its results.
+        # No job row at all means the history was cleared while this one ran.
+        latest_job = BackgroundJob.objects.filter(user=job.user_id, kind=PROFILE_SETUP_JOB).first()
+        if latest_job is None or latest_job.pk != job.pk:
+            return
+        report = PatientReport.objects.select_for_update().filter(pk=report_id).first()
+        if report is None:
+            return
+
+        PatientReportText.objects.update_or_create(
+            report=report,
+            defaults={"sonography": extracted_text_from_sonography, "blood": extracted_text_from_blood_report},
+        )
+        report.data = {**report.data, "analysis": cleaned_response}
+        report.save(update_fields=["data"])
+
+        bot_message_content = (
+            "Thank you for setting up your profile. Based on the information and reports provided, "
+            "here is a quick summary:\n\n"
+            f"{cleaned_response}\n\nI am now ready to help. How are you feeling today?"
+        )
+        ChatMessage.objects.create(user_id=job.user_id, role='bot', content=bot_message_content)
+
+
+def reanalyze_report(report_id):
+    """
+    Replace a saved report's analysis using the current prompt and model.
+    Returns ``False`` without saving if the report was cleared or saved again
+    while the model was answering; a resubmission brings its own analysis.
+    Raises on API errors.
+    """
+    report = PatientReport.objects.filter(pk=report_id).only("data", "version").first()
+    if report is None:
+        return False
+    sonography, blood = (
+        PatientReportText.objects.filter(report_id=report_id).values_list("sonography", "blood").first()
+        or ("", "")
+    )
+    analysis = analyze_profile(report.data, sonography, blood)
+
+    with transaction.atomic():
+        current = PatientReport.objects.select_for_update().filter(pk=report_id, version=report.version).first()
+        if current is None:
+            return False
+        current.data = {**current.data, "analysis": analysis}
+        current.save(update_fields=["data"])
+    return True
@@ -0,0 +1,262 @@
+"""
+Model providers behind one interface, with hedged requests for tail latency.
+
+Callers name a route (``chat``, ``report_analysis``, ``vision``, ``audio``)
+and pass OpenAI-style messages. A message's ``content`` is a string or a
+list of parts, where a part is text or a ``(bytes, mime type)`` media pair.
+``LLM_ROUTES`` maps each route to providers in order of preference:
+
+- The primary always gets the call. The next provider that is configured
+  and accepts the request's media becomes the hedge. OpenAI takes images but
+  not audio.
+- With ``LLM_HEDGING_ENABLED`` (off by default), the hedge is fired once the
+  primary has run longer than its recent ``LLM_HEDGE_QUANTILE`` latency on
+  that route, or at once if the primary fails. The first answer wins and the
+  other call is cancelled. A hedged request goes to both providers in full,
+  patient data and media included.
+- Latencies are tracked per route and provider over the last
+  ``LLM_LATENCY_WINDOW`` answers, so the hedge delay follows each
+  provider's current speed. Until there are ``LLM_LATENCY_MIN_SAMPLES``
+  answers, ``LLM_HEDGE_INITIAL_DELAY_SECONDS`` is used.
+
+Each call is bounded by its provider's timeout. If every provider fails, the
+primary's error is raised, so callers keep handling the errors they already
+know (``openai.error.*``, ``gemini.GeminiError``).
+
+A cancelled Gemini call can't be stopped, because it runs on a worker
+thread. It finishes in the background and still counts toward the circuit
+breaker.
+"""
+import asyncio
+import base64
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import openai
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+
+from . import gemini, llm, metrics
+
+
+@dataclass
+class Completion:
+    text: str
+    provider: str
+    raw: dict = field(default_factory=dict, repr=False)
+
+
+def _parts(content):
+    return [content] if isinstance(content, str) else content
+
+
+def _media(messages):
+    return [part for message in messages for part in _parts(message["content"]) if not isinstance(part, str)]
+
+
+class OpenAIProvider:
+    name = "openai"
+
+    def __init__(self, model, timeout):
+        self.model = model
+        self.timeout = timeout
+
+    @property
+    def configured(self):
+        return bool(openai.api_key or os.getenv("OPENAI_API_KEY"))
+
+    def accepts(self, messages):
+        return all(mime.startswith("image/") for _, mime in _media(messages))
+
+    def timeout_error(self):
+        return openai.error.Timeout(f"OpenAI did not answer within {self.timeout:g}s")
+
+    @staticmethod
+    def _message(message):
+        if isinstance(message["content"], str):
+            return message
+        content = []
+        for part in message["content"]:
+            if isinstance(part, str):
+                content.append({"type": "text", "text": part})
+            else:
+                data, mime = part
+                url = f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+                content.append({"type": "image_url", "image_url": {"url": url}})
+        return {**message, "content": content}
+
+    async def acomplete(self, messages, pooled):
+        response = await llm.achat_completion(
+            messages=[self._message(message) for message in messages], model=self.model, pooled=pooled
+        )
+        return Completion(response["choices"][0]["message"]["content"] or "", self.name, response)
+
+
+class GeminiProvider:
+    name = "gemini"
+    _ROLES = {"user": "user", "assistant": "model"}
+
+    def __init__(self, model, timeout, pool_size):
+        self.model = model
+        self.timeout = timeout
+        # The Gemini client is blocking; its calls get threads of their own,
+        # as many as it has pooled connections, not the loop's default executor.
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="gemini-provider")
+
+    @property
+    def configured(self):
+        return bool(os.getenv("GEMINI_API_KEY"))
+
+    def accepts(self, messages):
+        return True
+
+    def timeout_error(self):
+        return gemini.GeminiError(f"Gemini did not answer within {self.timeout:g}s")
+
+    def _request(self, messages):
+        """``(contents, system instruction)``: system messages become the instruction."""
+        system, contents = [], []
+        for message in messages:
+            if message["role"] == "system":
+                system.append(message["content"])
+                continue
+            parts = [
+                {"text": part} if isinstance(part, str) else gemini.inline_part(*part)
+                for part in _parts(message["content"])
+            ]
+            contents.append({"role": self._ROLES[message["role"]], "parts": parts})
+        return contents, "\n\n".join(system) or None
+
+    async def acomplete(self, messages, pooled):
+        contents, system = self._request(messages)
+        generate = sync_to_async(gemini.get_client().generate, thread_sensitive=False, executor=self._executor)
+        raw = await generate(contents, system)
+        return Completion(gemini.response_text(raw), self.name, raw)
+
+
+class LatencyTracker:
+    """Latencies of the last ``window`` answers, for quantiles."""
+
+    def __init__(self, window):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._samples)
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q):
+        with self._lock:
+            samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(len(samples) * q))] if samples else None
+
+
+class Router:
+    def __init__(self, providers):
+        self.providers = providers
+        self._trackers = {}
+        self._lock = threading.Lock()
+
+    def tracker(self, route, provider):
+        key = (route, provider.name)
+        tracker = self._trackers.get(key)
+        if tracker is None:
+            with self._lock:
+                tracker = self._trackers.setdefault(key, LatencyTracker(settings.LLM_LATENCY_WINDOW))
+        return tracker
+
+    def hedge_delay(self, route, provider):
+        """Seconds to give ``provider`` on ``route`` before firing the hedge."""
+        tracker = self.tracker(route, provider)
+        delay = settings.LLM_HEDGE_INITIAL_DELAY_SECONDS
+        if len(tracker) >= settings.LLM_LATENCY_MIN_SAMPLES:
+            delay = tracker.quantile(settings.LLM_HEDGE_QUANTILE)
+        return min(max(delay, settings.LLM_HEDGE_MIN_DELAY_SECONDS), provider.timeout)
+
+    def candidates(self, route, messages):
+        """The primary, then at most one hedge."""
+        primary, *others = (self.providers[name] for name in settings.LLM_ROUTES[route])
+        hedges = [provider for provider in others if provider.configured and provider.accepts(messages)]
+        return [primary, *hedges[:1]]
+
+    async def _attempt(self, route, provider, messages, pooled):
+        start = time.perf_counter()
+        try:
+            completion = await asyncio.wait_for(provider.acomplete(messages, pooled), provider.timeout)
+        except asyncio.TimeoutError:
+            raise provider.timeout_error() from None
+        except asyncio.CancelledError:
+            # Lost to the other provider: the time so far is a lower bound on
+            # this call's latency, and dropping it would bias the quantile down.
+            self.tracker(route, provider).observe(time.perf_counter() - start)
+            raise
+        self.tracker(route, provider).observe(time.perf_counter() - start)
+        return completion
+
+    async def acomplete(self, route, messages, pooled=False):
+        primary, *hedge = self.candidates(route, messages)
+        primary_task = asyncio.ensure_future(self._attempt(route, primary, messages, pooled))
+        if not hedge or not settings.LLM_HEDGING_ENABLED:
+            return await primary_task
+
+        tasks = {primary_task}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(route, primary))
+            if done and primary_task.exception() is None:
+                return primary_task.result()
+
+            tasks.add(asyncio.ensure_future(self._attempt(route, hedge[0], messages, pooled)))
+            pending = tasks - done
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        completion = task.result()
+                        metrics.HEDGED_REQUESTS.inc(route=route, winner=completion.provider)
+                        return completion
+            metrics.HEDGED_REQUESTS.inc(route=route, winner="none")
+            raise primary_task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def describe(self, route):
+        """``"openai:gpt-4o-mini,gemini:gemini-2.0-flash"``: the route's providers, for cache keys."""
+        return ",".join(f"{name}:{self.providers[name].model}" for name in settings.LLM_ROUTES[route])
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """The process-wide router, built from settings on first use."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                providers = {
+                    "openai": OpenAIProvider(settings.LLM_OPENAI_MODEL, settings.LLM_OPENAI_TIMEOUT_SECONDS),
+                    "gemini": GeminiProvider(
+                        settings.GEMINI_MODEL, settings.LLM_GEMINI_TIMEOUT_SECONDS, settings.GEMINI_POOL_SIZE
+                    ),
+                }
+                _router = Router(providers)
+    return _router
+
+
+async def acomplete(route, messages, pooled=False):
+    """Answer ``messages`` on ``route``; ``pooled`` as for ``llm.achat_completion``."""
+    return await get_router().acomplete(route, messages, pooled=pooled)
+
+
+def complete(route, messages):
+    """``acomplete`` for sync code (views, jobs, worker threads), without pooled sessions."""
+    return async_to_sync(get_router().acomplete)(route, messages)
@@ -0,0 +1,99 @@
+"""
+Opt-in, in-process cache of chat replies.
+
+Keyed on the normalized question, a hash of the patient context that went
+into the system prompt, and the reply language, so a cached answer is only
+reused for the same question asked against the same profile. Entries expire
+after ``CHAT_REPLY_CACHE_TTL_SECONDS`` and the least recently used entry is
+evicted once ``CHAT_REPLY_CACHE_MAX_ENTRIES`` is reached. Red-flag messages
+never reach this cache; ``chat()`` answers them before the lookup. Nor do
+follow-ups: ``chat()`` only uses the cache for a conversation's opening
+question, since the key doesn't cover earlier turns.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.,;:]+$")
+
+
+def normalize_question(text):
+    text = _WHITESPACE.sub(" ", text.lower()).strip()
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+def make_key(user_input, context_summary, lang):
+    context_hash = hashlib.sha256(context_summary.encode()).hexdigest()
+    raw = f"{normalize_question(user_input)}\x00{context_hash}\x00{lang.lower()}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class ReplyCache:
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, reply)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, reply):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_reply_cache():
+    """The process-wide cache, or ``None`` when ``CHAT_REPLY_CACHE_ENABLED`` is off."""
+    global _cache
+    if not settings.CHAT_REPLY_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ReplyCache(
+                    max_entries=settings.CHAT_REPLY_CACHE_MAX_ENTRIES,
+                    ttl_seconds=settings.CHAT_REPLY_CACHE_TTL_SECONDS,
+                )
+    return _cache
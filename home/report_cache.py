@@ -0,0 +1,63 @@
+"""
+Content-addressed cache for the profile-setup pipeline.
+
+Re-uploading the same sonography / blood-report PDFs (e.g. when a user redoes
+their profile) skips both PyPDF2 and the model call: extracted text is keyed
+by the SHA-256 of the file bytes, and the analysis by the SHA-256 of the exact
+messages sent to the model, which embed that text. Entries live in
+``ReportCacheEntry``; once their total size passes ``REPORT_CACHE_MAX_BYTES``
+the least recently used are evicted.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import ReportCacheEntry
+
+
+def file_digest(path):
+    with open(path, "rb") as fh:
+        return hashlib.file_digest(fh, "sha256").hexdigest()
+
+
+def messages_digest(model, messages):
+    payload = json.dumps({"model": model, "messages": messages}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get(kind, key):
+    entry = ReportCacheEntry.objects.filter(kind=kind, key=key).only("content").first()
+    if entry is None:
+        return None
+    ReportCacheEntry.objects.filter(key=key).update(last_used_at=timezone.now())
+    return entry.content
+
+
+def put(kind, key, content):
+    ReportCacheEntry.objects.update_or_create(
+        key=key,
+        defaults={
+            "kind": kind,
+            "content": content,
+            "size": len(content.encode()),
+            "last_used_at": timezone.now(),
+        },
+    )
+    evict(settings.REPORT_CACHE_MAX_BYTES)
+
+
+def evict(max_bytes):
+    """Delete least recently used entries until the cache fits in ``max_bytes``."""
+    total = ReportCacheEntry.objects.aggregate(total=Sum("size"))["total"] or 0
+    if total <= max_bytes:
+        return
+    doomed = []
+    for key, size in ReportCacheEntry.objects.order_by("last_used_at").values_list("key", "size").iterator():
+        if total <= max_bytes:
+            break
+        doomed.append(key)
+        total -= size
+    ReportCacheEntry.objects.filter(key__in=doomed).delete()
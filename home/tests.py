@@ -1,3 +1,1288 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from multiprocessing import get_context
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import openai
+import requests
+from PIL import Image
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+
+from benchmarks.sample_pdfs import make_report_pdf
+from benchmarks.stub_servers import start_stub_server
+
+from . import (
+    daily_logs, frame_dedup, frames, gemini, jobs, live_assistant, live_socket, memory, metrics, pdf_text,
+    providers, reply_cache, report_cache, transcript, views,
+)
+from .red_flags import KeywordMatcher, find_red_flag, load_keyword_sets
+from .models import (
+    BackgroundJob, ChatMessage, ConversationMemory, DailyLog, PatientReport, PatientReportText, ReportCacheEntry,
+)
+from .profile_setup import PROFILE_SETUP_JOB, run_profile_setup
+
+PROFILE = {
+    "language": "en",
+    "pregnancy_details": {"current_week": 20, "due_date": "2026-12-01"},
+    "medical_history": {"blood_type": "O+"},
+}
+
+
+def _completion(text):
+    return {"choices": [{"message": {"role": "assistant", "content": text}}]}
+
+
+class HotPathTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("patient", password="pass")
+        other = User.objects.create_user("other", password="pass")
+        for owner in (cls.user, other):
+            PatientReport.objects.create(user=owner, data=PROFILE)
+            ChatMessage.objects.bulk_create(
+                ChatMessage(user=owner, role="user" if i % 2 else "bot", content=f"message {i}")
+                for i in range(30)
+            )
+            DailyLog.objects.bulk_create(
+                DailyLog(user=owner, log_date=date(2026, 1, 1) + timedelta(days=i), data={"type": "symptom"})
+                for i in range(10)
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+
+class QueryCountTests(HotPathTestCase):
+    """
+    Exact query counts for the per-user hot paths. Every authenticated request
+    starts with two: the session row and the user row.
+    """
+
+    def test_home(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/main/")
+        self.assertEqual(response.status_code, 200)
+
+    @mock.patch("home.views.llm.achat_completion", new_callable=mock.AsyncMock)
+    def test_chat(self, achat_completion):
+        achat_completion.return_value = _completion("Try a short walk.")
+        # context lookup, memory row, recent turns, user message insert, bot reply insert
+        with self.assertNumQueries(7):
+            response = self.client.get("/main/chat/", {"message": "Can I eat mango?", "lang": "en"})
+        self.assertEqual(response.json()["reply"], "Try a short walk.")
+
+    def test_chat_red_flag(self):
+        with self.assertNumQueries(5):
+            response = self.client.get("/main/chat/", {"message": "I have severe bleeding", "lang": "en"})
+        self.assertTrue(response.json()["is_alert"])
+
+    def test_get_chat_history(self):
+        # ETag aggregate, then one page query
+        with self.assertNumQueries(4):
+            response = self.client.get("/main/get-chat-history/", {"limit": 10})
+        self.assertEqual(len(response.json()["history"]), 10)
+
+    def test_get_chat_history_not_modified(self):
+        etag = self.client.get("/main/get-chat-history/", {"limit": 10})["ETag"]
+        with self.assertNumQueries(3):
+            response = self.client.get("/main/get-chat-history/", {"limit": 10}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_get_user_profile(self):
+        # ETag (report version), then the profile document
+        with self.assertNumQueries(4):
+            response = self.client.get("/main/get-user-profile/")
+        self.assertEqual(response.json()["language"], "en")
+
+    def test_get_user_profile_not_modified(self):
+        etag = self.client.get("/main/get-user-profile/")["ETag"]
+        with self.assertNumQueries(3):
+            response = self.client.get("/main/get-user-profile/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_log_symptom(self):
+        # One transaction (a savepoint inside the test's) holding the day's row
+        # and its week's rollup, each a lookup and a savepoint-wrapped insert.
+        with self.assertNumQueries(12):
+            response = self.client.post(
+                "/main/log-symptom/", {"symptom": "mild cramps"}, content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 200)
+
+
+class RedFlagTests(HotPathTestCase):
+    def test_every_phrase_in_every_language_file_is_found(self):
+        keyword_sets = load_keyword_sets(settings.RED_FLAG_KEYWORDS_DIR)
+        self.assertEqual(sorted(keyword_sets), ["english", "hindi", "hinglish"])
+        for language, keywords in keyword_sets.items():
+            self.assertTrue(keywords, language)
+            for keyword in keywords:
+                with self.subTest(language=language, keyword=keyword):
+                    self.assertIsNotNone(find_red_flag(f"doctor, {keyword} since this morning"))
+
+    def test_case_insensitive(self):
+        self.assertEqual(find_red_flag("I have a SEVERE Headache"), "severe headache")
+        self.assertEqual(KeywordMatcher(["Water Broke"]).search("my water broke"), "water broke")
+
+    def test_keyword_at_either_end(self):
+        self.assertEqual(find_red_flag("bleeding since last night"), "bleeding")
+        self.assertEqual(find_red_flag("since last night there is bleeding"), "bleeding")
+        self.assertEqual(find_red_flag("bleeding"), "bleeding")
+        self.assertIsNone(find_red_flag("bleedin"))
+
+    def test_nested_keywords_report_the_longest_ending_there(self):
+        matcher = KeywordMatcher(["bleeding", "heavy bleeding"])
+        self.assertEqual(matcher.search("there is heavy bleeding"), "heavy bleeding")
+        self.assertEqual(matcher.search("light bleeding"), "bleeding")
+
+    def test_overlapping_keywords_report_the_first_to_end(self):
+        matcher = KeywordMatcher(["blurry vision", "vision loss"])
+        self.assertEqual(matcher.search("sudden blurry vision loss"), "blurry vision")
+        self.assertEqual(matcher.search("sudden vision loss"), "vision loss")
+        # A partial match of the longer phrase falls back to the shorter one inside it.
+        matcher = KeywordMatcher(["severe headaches", "headache"])
+        self.assertEqual(matcher.search("severe headache today"), "headache")
+        self.assertIsNone(matcher.search("severe head pain"))
+
+    @mock.patch("home.views.providers.acomplete", new_callable=mock.AsyncMock)
+    @mock.patch("home.views.llm.achat_completion", new_callable=mock.AsyncMock)
+    def test_chat_answers_a_red_flag_without_the_model(self, achat_completion, acomplete):
+        for message in ("Doctor, BABY STOPPED MOVING", "बच्चा हिल नहीं रहा है"):
+            with self.subTest(message=message):
+                response = self.client.get("/main/chat/", {"message": message, "lang": "en"})
+                self.assertTrue(response.json()["is_alert"])
+        achat_completion.assert_not_called()
+        acomplete.assert_not_called()
+
+
+class ChatHistoryPaginationTests(HotPathTestCase):
+    def page(self, **params):
+        response = self.client.get("/main/get-chat-history/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def texts(self, page):
+        return [m["text"] for m in page["history"]]
+
+    def test_newest_page_then_scrolling_back_with_before(self):
+        page = self.page(limit=12)
+        self.assertEqual(self.texts(page), [f"message {i}" for i in range(18, 30)])
+        self.assertEqual((page["oldest_id"], page["newest_id"]), (page["history"][0]["id"], page["history"][-1]["id"]))
+
+        seen = self.texts(page)
+        while page["has_more"]:
+            page = self.page(limit=12, before=page["oldest_id"])
+            seen = self.texts(page) + seen
+        self.assertEqual(seen, [f"message {i}" for i in range(30)])
+        self.assertEqual(len(self.texts(page)), 6)
+
+    def test_since_catches_up_on_newer_messages(self):
+        newest = self.page(limit=5)["newest_id"]
+        page = self.page(since=newest)
+        self.assertEqual((page["history"], page["has_more"], page["newest_id"]), ([], False, None))
+
+        for i in range(3):
+            transcript.record(self.user, "user", f"new {i}")
+        page = self.page(since=newest, limit=2)
+        self.assertEqual((self.texts(page), page["has_more"]), (["new 0", "new 1"], True))
+        page = self.page(since=page["newest_id"], limit=2)
+        self.assertEqual((self.texts(page), page["has_more"]), (["new 2"], False))
+
+    def test_pages_hold_only_the_users_own_messages(self):
+        other_ids = set(ChatMessage.objects.exclude(user=self.user).values_list("id", flat=True))
+        ids = {m["id"] for m in self.page(limit=200)["history"]} | {m["id"] for m in self.page(since=0)["history"]}
+        self.assertEqual(len(ids), 30)
+        self.assertFalse(ids & other_ids)
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get("/main/get-chat-history/", {"before": "abc"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag_is_shared_by_pages_and_changes_with_the_history(self):
+        etag = self.client.get("/main/get-chat-history/", {"limit": 10})["ETag"]
+        oldest = self.page(limit=10)["oldest_id"]
+        for params in ({"limit": 10}, {"limit": 10, "before": oldest}, {"since": oldest}):
+            with self.subTest(**params):
+                response = self.client.get("/main/get-chat-history/", params, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+        transcript.record(self.user, "bot", "a new reply")
+        response = self.client.get("/main/get-chat-history/", {"limit": 10}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.texts(response.json())[-1], "a new reply")
+
+        etag = response["ETag"]
+        ChatMessage.objects.filter(user=self.user).order_by("id").first().delete()
+        response = self.client.get("/main/get-chat-history/", {"limit": 10}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CHAT_REPLY_CACHE_ENABLED=True)
+class ReplyCacheTests(HotPathTestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(setattr, reply_cache, "_cache", None)
+
+    def ask(self, message, lang="en", fresh=True):
+        if fresh:  # a new conversation: no earlier turns or summary
+            ChatMessage.objects.filter(user=self.user).delete()
+        return self.client.get("/main/chat/", {"message": message, "lang": lang}).json()
+
+    @mock.patch("home.views.llm.achat_completion", new_callable=mock.AsyncMock)
+    def test_repeated_opening_question_is_answered_from_the_cache(self, achat_completion):
+        achat_completion.return_value = _completion("Yes, in moderation.")
+        replies = [self.ask(message) for message in ("Can I eat mango?", "can i eat mango", "Can I eat  MANGO?!")]
+        self.assertEqual(achat_completion.call_count, 1)
+        self.assertEqual([reply.get("cached", False) for reply in replies], [False, True, True])
+        self.assertEqual({reply["reply"] for reply in replies}, {"Yes, in moderation."})
+        self.assertEqual(reply_cache.get_reply_cache().stats()["hits"], 2)
+
+    @mock.patch("home.views.llm.achat_completion", new_callable=mock.AsyncMock)
+    def test_follow_up_after_different_turns_is_not_cached(self, achat_completion):
+        achat_completion.return_value = _completion("Because of the iron.")
+        self.ask("Should I take iron?")
+        self.ask("How much should I take?", fresh=False)
+        self.ask("Should I take calcium?")
+        reply = self.ask("How much should I take?", fresh=False)
+        self.assertNotIn("cached", reply)
+        self.assertEqual(achat_completion.call_count, 4)
+
+    @mock.patch("home.views.llm.achat_completion", new_callable=mock.AsyncMock)
+    def test_other_languages_and_profiles_miss(self, achat_completion):
+        achat_completion.return_value = _completion("Yes, in moderation.")
+        self.ask("Can I eat mango?")
+        self.ask("Can I eat mango?", lang="hi")
+        self.client.force_login(User.objects.get(username="other"))
+        ChatMessage.objects.filter(user__username="other").delete()
+        self.client.get("/main/chat/", {"message": "Can I eat mango?", "lang": "en"})
+        self.assertEqual(achat_completion.call_count, 3)
+
+
+@override_settings(CHAT_WRITE_BEHIND_ENABLED=True, CHAT_WRITE_BEHIND_FLUSH_SECONDS=3600)
+class WriteBehindTranscriptTests(HotPathTestCase):
+    def tearDown(self):
+        transcript._buffer._stopped.set()
+        transcript._buffer = None
+
+    @mock.patch("home.views.llm.achat_completion", new_callable=mock.AsyncMock)
+    def test_chat_turn_is_buffered_and_read_back(self, achat_completion):
+        achat_completion.return_value = _completion("Try a short walk.")
+        # The two transcript inserts are deferred.
+        with self.assertNumQueries(5):
+            self.client.get("/main/chat/", {"message": "Can I eat mango?", "lang": "en"})
+        self.assertEqual(ChatMessage.objects.filter(user=self.user).count(), 30)
+
+        history = self.client.get("/main/get-chat-history/", {"limit": 2}).json()["history"]
+        self.assertEqual(
+            [(m["who"], m["text"]) for m in history],
+            [("user", "Can I eat mango?"), ("bot", "Try a short walk.")],
+        )
+
+    @override_settings(CHAT_WRITE_BEHIND_MAX_ROWS=3)
+    def test_full_buffer_is_flushed_by_the_writer(self):
+        for i in range(3):
+            transcript.record(self.user, "user", f"note {i}")
+        self.assertEqual(ChatMessage.objects.filter(user=self.user).count(), 33)
+
+    def test_clearing_history_drops_buffered_rows_too(self):
+        transcript.record(self.user, "user", "pending")
+        self.client.post("/main/clear-all-chat-history/")
+        transcript.flush()
+        self.assertFalse(ChatMessage.objects.filter(user=self.user).exists())
+
+
+def _stream(*deltas, error=None):
+    """An ``achat_completion(stream=True)`` result yielding ``deltas``, then raising ``error``."""
+    async def chunks():
+        for delta in deltas:
+            yield {"choices": [{"delta": {"content": delta}}]}
+        if error is not None:
+            raise error
+    return chunks()
+
+
+class ChatStreamTests(HotPathTestCase):
+    async def _events(self, message):
+        response = await self.async_client.get("/main/chat/", {"message": message, "lang": "en", "stream": "1"})
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        return [json.loads(line) for line in body.decode().splitlines()]
+
+    async def _login(self):
+        await self.async_client.aforce_login(self.user)
+
+    @mock.patch("home.views.llm.achat_completion", new_callable=mock.AsyncMock)
+    async def test_completed_stream_is_saved(self, achat_completion):
+        await self._login()
+        achat_completion.return_value = _stream("Try ", "a short ", "walk.")
+        events = await self._events("Can I walk?")
+        self.assertEqual([e["delta"] for e in events[:-1]], ["Try ", "a short ", "walk."])
+        self.assertEqual(events[-1], {"done": True, "reply": "Try a short walk."})
+        last = await ChatMessage.objects.filter(user=self.user).order_by("pk").alast()
+        self.assertEqual((last.role, last.content), ("bot", "Try a short walk."))
+
+    @mock.patch("home.views.llm.achat_completion", new_callable=mock.AsyncMock)
+    async def test_interrupted_stream_is_not_saved_as_a_reply(self, achat_completion):
+        await self._login()
+        achat_completion.return_value = _stream("Try ", "a sh", error=openai.error.APIConnectionError("reset"))
+        events = await self._events("Can I walk?")
+        self.assertEqual([e["delta"] for e in events[:-1]], ["Try ", "a sh"])
+        self.assertTrue(events[-1]["interrupted"])
+        self.assertNotEqual(events[-1]["reply"], "Try a sh")
+        last = await ChatMessage.objects.filter(user=self.user).order_by("pk").alast()
+        self.assertEqual((last.role, last.content), ("bot", events[-1]["reply"]))
+
+
+@override_settings(CHAT_MEMORY_TOKEN_BUDGET=60, CHAT_MEMORY_MAX_MESSAGES=10, CHAT_MEMORY_FOLD_MIN_MESSAGES=6)
+class ConversationMemoryTests(HotPathTestCase):
+    def sent_messages(self, achat_completion):
+        return achat_completion.call_args.kwargs["messages"]
+
+    @mock.patch("home.views.llm.achat_completion", new_callable=mock.AsyncMock)
+    def test_prompt_stays_within_budget_and_schedules_a_fold(self, achat_completion):
+        achat_completion.return_value = _completion("Yes, in moderation.")
+        self.client.get("/main/chat/", {"message": "Can I eat mango?", "lang": "en"})
+
+        messages = self.sent_messages(achat_completion)
+        window = messages[1:-1]
+        self.assertEqual(messages[-1], {"role": "user", "content": "Can I eat mango?"})
+        # Each "message N" is 3 tokens + 4 framing: 8 fit in 60.
+        self.assertEqual([m["content"] for m in window], [f"message {i}" for i in range(22, 30)])
+        self.assertEqual(window[-1]["role"], "user")
+        self.assertEqual(window[-2]["role"], "assistant")
+        self.assertTrue(BackgroundJob.objects.filter(user=self.user, kind=memory.CONVERSATION_SUMMARY_JOB).exists())
+
+    @mock.patch("home.llm.openai.ChatCompletion.acreate", new_callable=mock.AsyncMock)
+    def test_fold_extends_the_summary_incrementally(self, create):
+        ids = list(ChatMessage.objects.filter(user=self.user).order_by("id").values_list("id", flat=True))
+        ConversationMemory.objects.create(user=self.user, summary="Asked about iron.", summarized_through_id=ids[9])
+        create.return_value = _completion("Asked about iron and mango.")
+        job = BackgroundJob(user=self.user, kind=memory.CONVERSATION_SUMMARY_JOB)
+
+        memory.fold_summary(job, window_start_id=ids[22])
+
+        self.assertEqual(create.call_args.kwargs["request_timeout"], settings.OPENAI_TIMEOUT_SECONDS)
+        self.assertEqual(create.call_args.kwargs["model"], settings.LLM_OPENAI_MODEL)
+        prompt = create.call_args.kwargs["messages"][1]["content"]
+        self.assertIn("Asked about iron.", prompt)
+        self.assertIn("message 10", prompt)
+        self.assertNotIn("message 9\n", prompt)
+        self.assertNotIn("message 22", prompt)
+        saved = ConversationMemory.objects.get(user=self.user)
+        self.assertEqual((saved.summary, saved.summarized_through_id), ("Asked about iron and mango.", ids[21]))
+
+    async def test_first_encoding_load_runs_off_the_event_loop(self):
+        on_loop = []
+
+        def get_encoding(name):
+            try:
+                on_loop.append(asyncio.get_running_loop() is not None)
+            except RuntimeError:
+                on_loop.append(False)
+
+        memory._encoding.cache_clear()
+        self.addCleanup(memory._encoding.cache_clear)
+        with mock.patch("tiktoken.get_encoding", side_effect=get_encoding) as loaded:
+            await memory.abuild_history(self.user)
+            await memory.abuild_history(self.user)
+        loaded.assert_called_once_with(memory.TOKEN_ENCODING)
+        self.assertEqual(on_loop, [False])
+
+    @override_settings(CHAT_MEMORY_SUMMARY_MODEL="gpt-4.1-nano")
+    @mock.patch("home.llm.openai.ChatCompletion.acreate", new_callable=mock.AsyncMock)
+    def test_fold_uses_the_configured_summary_model(self, create):
+        create.return_value = _completion("Asked about iron.")
+        memory.fold_summary(BackgroundJob(user=self.user, kind=memory.CONVERSATION_SUMMARY_JOB), window_start_id=None)
+        self.assertEqual(create.call_args.kwargs["model"], "gpt-4.1-nano")
+
+    @mock.patch("home.views.llm.achat_completion", new_callable=mock.AsyncMock)
+    def test_summary_goes_in_after_the_system_prompt(self, achat_completion):
+        last_id = ChatMessage.objects.filter(user=self.user).latest("id").id
+        ConversationMemory.objects.create(user=self.user, summary="Mild nausea in week 18.", summarized_through_id=last_id)
+        achat_completion.return_value = _completion("Ginger tea can help.")
+        self.client.get("/main/chat/", {"message": "Still nauseous", "lang": "en"})
+
+        messages = self.sent_messages(achat_completion)
+        self.assertEqual(len(messages), 3)
+        self.assertIn("Mild nausea in week 18.", messages[1]["content"])
+        self.assertEqual(messages[1]["role"], "system")
+
+
+class DailyLogApiTests(HotPathTestCase):
+    # setUpTestData's logs (2026-01-01 .. 2026-01-10) bypass the rollups.
+
+    def test_rollups_follow_writes(self):
+        user = self.user
+        daily_logs.save_entry(user, date(2026, 3, 2), {"type": "symptom", "text": "nausea"})
+        daily_logs.save_entry(user, date(2026, 3, 3), {"type": "mood", "text": "tired"})
+        daily_logs.save_entry(user, date(2026, 3, 3), {"type": "symptom", "text": "cramps"})  # replaces the mood
+        daily_logs.save_entry(user, date(2026, 3, 9), {"type": "symptom", "text": "better"})
+
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                "/main/daily-logs/weekly/", {"start": "2026-03-01", "end": "2026-03-15", "type": "symptom"}
+            )
+        self.assertEqual(response.json()["weeks"], [
+            {"week_start": "2026-03-02", "days_logged": 2, "counts": {"symptom": 2}, "count": 2},
+            {"week_start": "2026-03-09", "days_logged": 1, "counts": {"symptom": 1}, "count": 1},
+        ])
+
+    def test_entries_in_a_window(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                "/main/daily-logs/", {"start": "2026-01-03", "end": "2026-01-05", "type": "symptom"}
+            )
+        self.assertEqual([e["date"] for e in response.json()["entries"]], ["2026-01-03", "2026-01-04", "2026-01-05"])
+        moods = self.client.get("/main/daily-logs/", {"type": "mood", "start": "2026-01-01"})
+        self.assertEqual(moods.json()["entries"], [])
+        backwards = self.client.get("/main/daily-logs/", {"start": "2026-02-01", "end": "2026-01-01"})
+        self.assertEqual(backwards.status_code, 400)
+
+
+class ProfileApiTests(HotPathTestCase):
+    def test_fields_projection(self):
+        response = self.client.get("/main/get-user-profile/", {"fields": "language,pregnancy_details,name,missing"})
+        self.assertEqual(response.json(), {
+            "language": "en",
+            "pregnancy_details": PROFILE["pregnancy_details"],
+            "name": "patient",
+            "missing": None,
+        })
+        bad = self.client.get("/main/get-user-profile/", {"fields": "language,data->>'x'"})
+        self.assertEqual(bad.status_code, 400)
+
+    def test_etag_follows_the_report_version(self):
+        etag = self.client.get("/main/get-user-profile/")["ETag"]
+        report = PatientReport.objects.get(user=self.user)
+        report.data = {**report.data, "language": "hi"}
+        report.save(update_fields=["data"])
+        response = self.client.get("/main/get-user-profile/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_gzip_keeps_a_strong_etag_and_revalidates(self):
+        report = PatientReport.objects.get(user=self.user)
+        report.data = {**report.data, "analysis": "Routine findings. " * 20}
+        report.save(update_fields=["data"])
+        response = self.client.get("/main/get-user-profile/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        etag = response["ETag"]
+        self.assertRegex(etag, r'^"\d+-\d+-gzip"$')
+        self.assertEqual(json.loads(gzip.decompress(response.content))["language"], "en")
+
+        response = self.client.get("/main/get-user-profile/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+
+class PatientReportSaveTests(HotPathTestCase):
+    UPDATED = {**PROFILE, "doctorName": "Dr. Rao", "hospitalName": "City Hospital"}
+
+    def setUp(self):
+        self.report = PatientReport.objects.get(user=self.user)
+        self.assertIn("Doctor's Name: Not provided.", self.report.context_summary)
+        self.assertEqual(self.report.emergency_info, "")
+
+    def assertRerendered(self, report, version):
+        stored = PatientReport.objects.get(pk=report.pk)
+        self.assertIn("Doctor's Name: Dr. Rao.", stored.context_summary)
+        self.assertEqual(stored.emergency_info, "\nYour registered hospital is: City Hospital.")
+        self.assertEqual(stored.version, version + 1)
+
+    def test_save(self):
+        version = self.report.version
+        self.report.data = self.UPDATED
+        self.report.save()
+        self.assertRerendered(self.report, version)
+
+    def test_save_with_update_fields(self):
+        version = self.report.version
+        self.report.data = self.UPDATED
+        self.report.save(update_fields=["data"])
+        self.assertRerendered(self.report, version)
+
+    def test_update_or_create(self):
+        version = self.report.version
+        report, created = PatientReport.objects.update_or_create(user=self.user, defaults={"data": self.UPDATED})
+        self.assertFalse(created)
+        self.assertRerendered(report, version)
+
+    def test_other_fields_only_bump_the_version(self):
+        version, summary = self.report.version, self.report.context_summary
+        self.report.save(update_fields=["created_at"])
+        stored = PatientReport.objects.get(pk=self.report.pk)
+        self.assertEqual((stored.version, stored.context_summary), (version + 1, summary))
+
+
+class ReportTextTests(HotPathTestCase):
+    @mock.patch("home.profile_setup.analyze_profile", return_value="All normal.")
+    @mock.patch("home.profile_setup.extract_pdf_text", side_effect=lambda path, label: f"{label} text")
+    def test_extracted_text_is_kept_out_of_the_profile(self, extract_pdf_text, analyze_profile):
+        report = PatientReport.objects.get(user=self.user)
+        job = BackgroundJob.objects.create(user=self.user, kind=PROFILE_SETUP_JOB)
+        run_profile_setup(job, report.pk, sonography_path="/nonexistent/s.pdf", blood_path="/nonexistent/b.pdf")
+
+        texts = PatientReportText.objects.get(report=report)
+        self.assertEqual((texts.sonography, texts.blood), ("sonography text", "blood report text"))
+        profile = self.client.get("/main/get-user-profile/").json()
+        self.assertEqual(profile["analysis"], "All normal.")
+        self.assertFalse({"extracted_sonography_report_content", "extracted_blood_report_content"} & profile.keys())
+
+
+@mock.patch("home.profile_setup.providers.complete", return_value=providers.Completion("All normal.", "openai"))
+@mock.patch("home.profile_setup.pdf_text.extract_text", wraps=pdf_text.extract_text)
+class ReportCacheTests(HotPathTestCase):
+    def upload(self, pdf):
+        # The job deletes its uploads, so every submission gets a fresh file.
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as fh:
+            fh.write(pdf)
+        self.addCleanup(lambda: os.path.exists(fh.name) and os.remove(fh.name))
+        return fh.name
+
+    def submit(self, pdf):
+        report = PatientReport.objects.get(user=self.user)
+        job = BackgroundJob.objects.create(user=self.user, kind=PROFILE_SETUP_JOB)
+        run_profile_setup(job, report.pk, sonography_path=self.upload(pdf))
+        return PatientReportText.objects.get(report=report).sonography
+
+    def test_repeat_upload_skips_extraction_and_the_model(self, extract_text, complete):
+        pdf = make_report_pdf(pages=2, lines_per_page=3)
+        first = self.submit(pdf)
+        self.assertEqual(self.submit(pdf), first)
+        self.assertEqual((extract_text.call_count, complete.call_count), (1, 1))
+
+    def test_changed_file_misses(self, extract_text, complete):
+        first = self.submit(make_report_pdf(pages=2, lines_per_page=3, seed=1))
+        self.assertNotEqual(self.submit(make_report_pdf(pages=2, lines_per_page=3, seed=2)), first)
+        self.assertEqual((extract_text.call_count, complete.call_count), (2, 2))
+
+    @override_settings(REPORT_CACHE_MAX_BYTES=25)
+    def test_least_recently_used_entries_are_evicted_past_the_size_bound(self, extract_text, complete):
+        report_cache.put(ReportCacheEntry.TEXT, "a", "a" * 10)
+        report_cache.put(ReportCacheEntry.TEXT, "b", "b" * 10)
+        self.assertEqual(report_cache.get(ReportCacheEntry.TEXT, "a"), "a" * 10)
+        report_cache.put(ReportCacheEntry.ANALYSIS, "c", "c" * 10)
+
+        self.assertEqual(set(ReportCacheEntry.objects.values_list("key", flat=True)), {"a", "c"})
+        self.assertIsNone(report_cache.get(ReportCacheEntry.TEXT, "b"))
+        report_cache.evict(0)
+        self.assertFalse(ReportCacheEntry.objects.exists())
+
+
+@override_settings(PDF_EXTRACT_WORKERS=2, PDF_PARALLEL_MIN_PAGES=2, PDF_EXTRACT_TIMEOUT_SECONDS=0.2)
+class PdfExtractionPoolTests(TestCase):
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as fh:
+            fh.write(make_report_pdf(pages=4, lines_per_page=3))
+        self.path = fh.name
+        self.addCleanup(os.remove, self.path)
+        self.addCleanup(setattr, pdf_text, "_pool", None)
+        with self.settings(PDF_EXTRACT_WORKERS=1):
+            self.expected = pdf_text.extract_text(self.path)
+
+    def test_broken_pool_is_replaced_and_the_document_finished_in_process(self):
+        broken = ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"))
+        with self.assertRaises(Exception):
+            broken.submit(os._exit, 1).result()
+        pdf_text._pool = broken
+
+        self.assertEqual(pdf_text.extract_text(self.path), self.expected)
+        self.assertIsNone(pdf_text._pool)
+
+    def test_stuck_pool_is_abandoned_after_the_timeout(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        stuck = ThreadPoolExecutor(max_workers=2)
+        pdf_text._pool = stuck
+
+        with mock.patch("home.pdf_text._extract_range", side_effect=lambda *args: release.wait()):
+            with self.assertRaises(pdf_text.PdfExtractTimeoutError):
+                pdf_text.extract_text(self.path)
+        self.assertIsNone(pdf_text._pool)
+
+
+@override_settings(LLM_HEDGING_ENABLED=False)
+class ReanalyzeReportsTests(TransactionTestCase):
+    # The command's worker threads need committed rows.
+    def setUp(self):
+        self.reports = [
+            PatientReport.objects.create(
+                user=User.objects.create_user(name), data={**PROFILE, "type": "pregnancy", "dob": name, "analysis": "Old."}
+            )
+            for name in ("alice", "bob", "carol")
+        ]
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+
+    def reanalyze(self, **options):
+        call_command("reanalyze_reports", checkpoint=self.checkpoint, rpm=0, stdout=StringIO(), stderr=StringIO(),
+                     **options)
+        return {report.user.username: report.data["analysis"] for report in PatientReport.objects.all()}
+
+    @mock.patch("home.llm.openai.ChatCompletion.acreate", new_callable=mock.AsyncMock)
+    def test_failed_reports_are_retried_on_the_next_run(self, create):
+        create.side_effect = [openai.error.APIError("upstream down"), _completion("**New** summary."),
+                              _completion("New summary.")]
+        analyses = self.reanalyze(concurrency=1, max_attempts=1)
+        self.assertEqual(analyses, {"alice": "Old.", "bob": "New summary.", "carol": "New summary."})
+        with open(self.checkpoint) as fh:
+            state = json.load(fh)
+        self.assertEqual((state["through"], state["done"]), (self.reports[0].pk - 1, [self.reports[1].pk, self.reports[2].pk]))
+        self.assertEqual(list(state["failed"]), [str(self.reports[0].pk)])
+
+        create.side_effect = [_completion("Recovered.")]
+        analyses = self.reanalyze()
+        # Only the failed report is sent again.
+        self.assertEqual(create.call_count, 4)
+        self.assertEqual(analyses, {"alice": "Recovered.", "bob": "New summary.", "carol": "New summary."})
+
+    @mock.patch("home.llm.openai.ChatCompletion.acreate", new_callable=mock.AsyncMock)
+    def test_rate_limits_are_waited_out(self, create):
+        limited = openai.error.RateLimitError("slow down", headers={"retry-after": "0"})
+        create.side_effect = [limited, _completion("Fine."), _completion("Fine."), _completion("Fine.")]
+        versions = [report.version for report in self.reports]
+        analyses = self.reanalyze(concurrency=1, user=["alice", "bob"])
+        self.assertEqual(analyses, {"alice": "Fine.", "bob": "Fine.", "carol": "Old."})
+        self.assertEqual(
+            [report.version for report in PatientReport.objects.order_by("pk")],
+            [versions[0] + 1, versions[1] + 1, versions[2]],
+        )
+
+
+@override_settings(BACKGROUND_JOB_RETRY_BACKOFF_SECONDS=2)
+@mock.patch("home.jobs.traceback.print_exc")
+@mock.patch("home.jobs.time.sleep")
+class BackgroundJobTests(TransactionTestCase):
+    # The runner closes its DB connection when a job ends, which a TestCase
+    # transaction would not survive.
+    def setUp(self):
+        self.user = User.objects.create_user("patient")
+        self.client.force_login(self.user)
+        self.report = PatientReport.objects.create(user=self.user, data=PROFILE)
+
+    def job(self, kind="test", max_attempts=3):
+        return BackgroundJob.objects.create(user=self.user, kind=kind, max_attempts=max_attempts)
+
+    def run_job(self, job, func, *args, **kwargs):
+        jobs._run(job.pk, func, args, kwargs)
+        return BackgroundJob.objects.filter(pk=job.pk).first()
+
+    def test_failed_attempts_are_retried_with_backoff(self, sleep, print_exc):
+        func = mock.Mock(side_effect=[ValueError("first"), ValueError("second"), None])
+        job = self.run_job(self.job(), func)
+        self.assertEqual((job.status, job.attempts, job.error), (BackgroundJob.SUCCEEDED, 3, "ValueError: second"))
+        self.assertEqual(sleep.call_args_list, [mock.call(2), mock.call(4)])
+
+    def test_job_fails_after_max_attempts(self, sleep, print_exc):
+        func = mock.Mock(side_effect=ValueError("broken"))
+        job = self.run_job(self.job(), func)
+        self.assertEqual((job.status, job.attempts, job.error), (BackgroundJob.FAILED, 3, "ValueError: broken"))
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_job_deleted_while_running_stops_quietly(self, sleep, print_exc):
+        def clear_then_fail(job):
+            BackgroundJob.objects.filter(pk=job.pk).delete()
+            raise ValueError("report is gone")
+
+        func = mock.Mock(side_effect=clear_then_fail)
+        self.assertIsNone(self.run_job(self.job(), func))
+        func.assert_called_once()
+        sleep.assert_not_called()
+
+    @mock.patch("home.profile_setup.analyze_profile", side_effect=[openai.error.APIError("down"), "All normal."])
+    def test_profile_setup_posts_the_welcome_message_once(self, analyze_profile, sleep, print_exc):
+        job = self.run_job(self.job(PROFILE_SETUP_JOB), run_profile_setup, self.report.pk)
+        self.assertEqual((job.status, job.attempts), (BackgroundJob.SUCCEEDED, 2))
+        welcome = ChatMessage.objects.filter(user=self.user, role="bot")
+        self.assertEqual(welcome.count(), 1)
+        self.assertIn("All normal.", welcome.get().content)
+        self.assertEqual(PatientReport.objects.get(pk=self.report.pk).data["analysis"], "All normal.")
+
+    @mock.patch("home.profile_setup.analyze_profile", return_value="Stale.")
+    def test_superseded_profile_setup_is_skipped(self, analyze_profile, sleep, print_exc):
+        stale = self.job(PROFILE_SETUP_JOB)
+        newer = self.job(PROFILE_SETUP_JOB)
+        BackgroundJob.objects.filter(pk=newer.pk).update(created_at=stale.created_at + timedelta(seconds=1))
+
+        self.assertEqual(self.run_job(stale, run_profile_setup, self.report.pk).status, BackgroundJob.SUCCEEDED)
+        self.assertFalse(ChatMessage.objects.filter(user=self.user).exists())
+        self.assertFalse(PatientReportText.objects.exists())
+        self.assertNotIn("analysis", PatientReport.objects.get(pk=self.report.pk).data)
+
+    def test_profile_setup_stops_if_the_history_is_cleared_mid_run(self, sleep, print_exc):
+        def clear(*args):
+            self.client.post("/main/clear-all-chat-history/")
+            return "All normal."
+
+        with mock.patch("home.profile_setup.analyze_profile", side_effect=clear):
+            self.assertIsNone(self.run_job(self.job(PROFILE_SETUP_JOB), run_profile_setup, self.report.pk))
+        self.assertFalse(ChatMessage.objects.filter(user=self.user).exists())
+        self.assertFalse(PatientReportText.objects.exists())
+
+    def test_profile_setup_status(self, sleep, print_exc):
+        self.assertEqual(self.client.get("/main/profile-setup-status/").status_code, 404)
+        job = self.run_job(self.job(PROFILE_SETUP_JOB), mock.Mock(side_effect=ValueError("broken")))
+        self.assertEqual(self.client.get("/main/profile-setup-status/").json(), {
+            "status": "failed", "attempts": 3, "max_attempts": 3, "error": "ValueError: broken",
+            "updated_at": job.updated_at.isoformat(),
+        })
+
+
+class GeminiCircuitBreakerTests(TestCase):
+    RESET_SECONDS = 0.2
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = start_stub_server()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.shutdown()
+        cls.stub.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.stub.latency, self.stub.error_rate = 0.0, 0.0
+        self.breaker = gemini.CircuitBreaker(failure_threshold=3, reset_seconds=self.RESET_SECONDS)
+        self.client = gemini.GeminiClient(
+            api_key="stub", model="stub", base_url=f"{self.stub.base_url}/v1beta", connect_timeout=1,
+            read_timeout=5, max_retries=0, backoff_seconds=0, breaker=self.breaker,
+        )
+
+    def generate(self):
+        return self.client.generate_content([{"text": "hello"}])
+
+    def trip(self):
+        self.stub.error_rate = 1.0
+        for _ in range(3):
+            with self.assertRaises(gemini.GeminiError):
+                self.generate()
+        self.stub.error_rate = 0.0
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        self.trip()
+        self.assertEqual(self.breaker.state, "open")
+        served = self.stub.requests
+        with self.assertRaises(gemini.CircuitOpenError):
+            self.generate()
+        self.assertEqual(self.stub.requests, served)
+
+    def test_half_open_after_the_reset_window_lets_one_trial_through(self):
+        self.trip()
+        time.sleep(self.RESET_SECONDS)
+        self.assertEqual(self.breaker.state, "half-open")
+
+        self.stub.latency = 0.3
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            trial = pool.submit(self.generate)
+            time.sleep(0.1)
+            with self.assertRaises(gemini.CircuitOpenError):
+                self.generate()
+            self.assertEqual(gemini.response_text(trial.result()), "Stay hydrated and rest; a short walk can help too.")
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_failed_trial_reopens(self):
+        self.trip()
+        time.sleep(self.RESET_SECONDS)
+        self.stub.error_rate = 1.0
+        with self.assertRaises(gemini.GeminiError):
+            self.generate()
+        self.assertEqual(self.breaker.state, "open")
+
+    def test_unexpected_errors_in_a_trial_are_recorded(self):
+        failures = [
+            mock.patch.object(self.client.session, "post", side_effect=requests.exceptions.ChunkedEncodingError),
+            mock.patch("requests.Response.json", side_effect=ValueError("not JSON")),
+        ]
+        self.trip()
+        for failure in failures:
+            time.sleep(self.RESET_SECONDS)
+            with failure, self.assertRaises(gemini.GeminiError):
+                self.generate()
+            self.assertEqual(self.breaker.state, "open")
+
+        time.sleep(self.RESET_SECONDS)
+        self.generate()
+        self.assertEqual(self.breaker.state, "closed")
+
+
+class MediaRequestTests(TestCase):
+    FRAME_FIELDS = {"frame": ("mime_type", "image/jpeg"), "audio": ("audio_mime_type", "audio/webm")}
+
+    def read(self, request):
+        return views._read_media_request(request, self.FRAME_FIELDS)
+
+    def test_multipart_files_and_fields(self):
+        request = RequestFactory().post("/main/gemini/send_frame/", {
+            "frame": SimpleUploadedFile("frame.png", b"png bytes", content_type="image/png"),
+            "audio": SimpleUploadedFile("q.wav", b"wav bytes", content_type="audio/wav"),
+            "question": "Is this ripe?",
+        })
+        media, fields = self.read(request)
+        self.assertEqual(media, {"frame": (b"png bytes", "image/png"), "audio": (b"wav bytes", "audio/wav")})
+        self.assertEqual(fields.get("question"), "Is this ripe?")
+
+    def test_multipart_mime_type_field_overrides_the_part_type(self):
+        request = RequestFactory().post("/main/gemini/send_frame/", {
+            "frame": SimpleUploadedFile("frame", b"bytes", content_type="image/jpeg"),
+            "mime_type": "image/webp",
+        })
+        media, _ = self.read(request)
+        self.assertEqual(media["frame"], (b"bytes", "image/webp"))
+
+    def test_multipart_generic_part_type_falls_back_to_the_default(self):
+        request = RequestFactory().post("/main/gemini/send_frame/", {
+            "frame": SimpleUploadedFile("blob", b"bytes", content_type="application/octet-stream"),
+        })
+        media, _ = self.read(request)
+        self.assertEqual(media, {"frame": (b"bytes", "image/jpeg")})
+
+    def test_every_encoding_reads_the_same_media(self):
+        factory = RequestFactory()
+        data_url = "data:image/png;base64," + base64.b64encode(b"png bytes").decode()
+        encodings = [
+            factory.post("/main/gemini/send_frame/", {
+                "frame": SimpleUploadedFile("frame.png", b"png bytes", content_type="image/png"),
+            }),
+            factory.post("/main/gemini/send_frame/?mime_type=image/png", b"png bytes",
+                         content_type="application/octet-stream"),
+            factory.post("/main/gemini/send_frame/", {"frame": data_url}, content_type="application/json"),
+        ]
+        for request in encodings:
+            with self.subTest(content_type=request.content_type):
+                media, _ = self.read(request)
+                self.assertEqual(media, {"frame": (b"png bytes", "image/png")})
+
+    @mock.patch("home.views.GEMINI_API_KEY", "stub")
+    @mock.patch("home.views.live_assistant.answer_audio", return_value=({"reply": "Rest."}, 200))
+    def test_send_audio_accepts_multipart(self, answer_audio):
+        response = self.client.post("/main/gemini/send_audio/", {
+            "audio": SimpleUploadedFile("q.ogg", b"ogg bytes", content_type="audio/ogg"),
+            "hint": "about sleep",
+        })
+        self.assertEqual(response.json(), {"reply": "Rest."})
+        answer_audio.assert_called_once_with((b"ogg bytes", "audio/ogg"), "about sleep")
+
+
+@mock.patch.dict(os.environ, {"GEMINI_API_KEY": "stub"})
+class LiveSocketTests(TransactionTestCase):
+    # The socket authenticates and answers from other threads, so the session
+    # row has to be committed.
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("patient"))
+        self.session_key = self.client.session.session_key
+        self.inbox = asyncio.Queue()
+        self.sent = []
+
+    def headers(self, cookie=None, origin="http://testserver"):
+        cookie = f"{settings.SESSION_COOKIE_NAME}={cookie or self.session_key}"
+        return [(b"host", b"testserver"), (b"origin", origin.encode()), (b"cookie", cookie.encode())]
+
+    async def connect(self, **headers):
+        scope = {"type": "websocket", "path": live_socket.PATH, "headers": self.headers(**headers)}
+
+        async def send(message):
+            self.sent.append(message)
+
+        await self.inbox.put({"type": "websocket.connect"})
+        self.app = asyncio.create_task(live_socket.application(scope, self.inbox.get, send))
+
+    async def push(self, *messages):
+        for message in messages:
+            if isinstance(message, bytes):
+                await self.inbox.put({"type": "websocket.receive", "bytes": message})
+            else:
+                await self.inbox.put({"type": "websocket.receive", "text": json.dumps(message)})
+
+    async def until(self, predicate):
+        for _ in range(500):
+            if predicate():
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f"timed out; sent {self.sent}")
+
+    def replies(self):
+        return [json.loads(m["text"]) for m in self.sent if m["type"] == "websocket.send"]
+
+    async def closed_with(self):
+        await asyncio.wait_for(self.app, 5)
+        return self.sent[-1]
+
+    async def disconnect(self):
+        await self.inbox.put({"type": "websocket.disconnect"})
+        await asyncio.wait_for(self.app, 5)
+
+    async def test_bad_session_cookie_is_refused(self):
+        await self.connect(cookie="not-a-session")
+        self.assertEqual(await self.closed_with(), {"type": "websocket.close", "code": 1008})
+        self.assertEqual(len(self.sent), 1)
+
+    async def test_foreign_origin_is_refused(self):
+        await self.connect(origin="https://elsewhere.example")
+        self.assertEqual(await self.closed_with(), {"type": "websocket.close", "code": 1008})
+        self.assertEqual(len(self.sent), 1)
+
+    @mock.patch("home.live_socket.live_assistant.answer_frame", return_value=({"reply": "A pattern."}, 200))
+    async def test_frame_turn_with_recording_and_question(self, answer_frame):
+        await self.connect()
+        await self.push({"type": "audio", "mime_type": "audio/ogg"}, b"part 1 ", b"part 2",
+                        {"type": "frame", "id": 7, "question": " Is it safe? "}, b"jpeg bytes")
+        await self.until(self.replies)
+        await self.disconnect()
+
+        self.assertEqual(self.sent[0], {"type": "websocket.accept"})
+        self.assertEqual(self.replies(), [{"type": "reply", "id": 7, "status": 200, "reply": "A pattern."}])
+        answer_frame.assert_called_once_with(
+            self.session_key, (b"jpeg bytes", "image/jpeg"), (b"part 1 part 2", "audio/ogg"), "Is it safe?"
+        )
+
+    @override_settings(LIVE_SOCKET_MAX_PENDING=1)
+    async def test_stale_frame_is_dropped_when_the_queue_is_full(self):
+        started, release, answered = threading.Event(), threading.Event(), []
+
+        def answer(turn, session_key):
+            answered.append(turn.id)
+            started.set()
+            release.wait(5)
+            return {"reply": f"seen {turn.id}"}, 200
+
+        with mock.patch("home.live_socket._answer", side_effect=answer):
+            await self.connect()
+            await self.push({"type": "frame", "id": 1}, b"frame 1")
+            await self.until(started.is_set)
+            # Turn 1 is being answered; 2 waits and is superseded by 3.
+            await self.push({"type": "frame", "id": 2}, b"frame 2", {"type": "frame", "id": 3}, b"frame 3")
+            await self.until(self.replies)
+            release.set()
+            await self.until(lambda: len(self.replies()) == 3)
+            await self.disconnect()
+
+        self.assertEqual(self.replies(), [
+            {"type": "dropped", "id": 2},
+            {"type": "reply", "id": 1, "status": 200, "reply": "seen 1"},
+            {"type": "reply", "id": 3, "status": 200, "reply": "seen 3"},
+        ])
+        self.assertEqual(answered, [1, 3])
+
+    @override_settings(LIVE_SOCKET_MAX_MEDIA_BYTES=10)
+    async def test_oversized_media_closes_the_socket(self):
+        await self.connect()
+        await self.push({"type": "audio"}, b"123456", b"789012")
+        self.assertEqual(await self.closed_with(), {"type": "websocket.close", "code": live_socket.CLOSE_TOO_BIG})
+
+    async def test_ask_audio_without_a_recording_is_a_bad_request(self):
+        await self.connect()
+        await self.push({"type": "ask_audio", "id": 5})
+        await self.until(self.replies)
+        await self.disconnect()
+        self.assertEqual(self.replies(), [{"type": "reply", "id": 5, "status": 400, "reply": "Missing 'audio'."}])
+
+
+def _image(width, height, format="JPEG", mode="RGB", **save_kwargs):
+    """Encoded bytes of a ``width`` x ``height`` gradient image."""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    img = Image.merge("RGB", (gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT), gradient))
+    out = io.BytesIO()
+    img.convert(mode).save(out, format, **save_kwargs)
+    return out.getvalue()
+
+
+@override_settings(FRAME_MAX_EDGE=768, FRAME_JPEG_QUALITY=80)
+class FrameNormalizationTests(TestCase):
+    def normalized(self, data, **kwargs):
+        jpeg, mime = frames.normalize_frame(data, **kwargs)
+        self.assertEqual(mime, "image/jpeg")
+        return Image.open(io.BytesIO(jpeg))
+
+    def test_large_frame_is_downscaled_to_the_max_edge(self):
+        img = self.normalized(_image(1280, 720, quality=95))
+        self.assertEqual((img.format, img.size), ("JPEG", (768, 432)))
+
+    def test_max_edge_zero_keeps_the_resolution(self):
+        self.assertEqual(self.normalized(_image(1280, 720), max_edge=0).size, (1280, 720))
+
+    def test_other_formats_become_rgb_jpeg(self):
+        img = self.normalized(_image(200, 100, format="PNG", mode="RGBA"))
+        self.assertEqual((img.format, img.mode, img.size), ("JPEG", "RGB", (200, 100)))
+
+    def test_exif_orientation_is_applied_and_metadata_dropped(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90 degrees clockwise
+        img = self.normalized(_image(200, 100, exif=exif.tobytes()))
+        self.assertEqual(img.size, (100, 200))
+        self.assertNotIn("exif", img.info)
+
+    def test_small_clean_jpeg_is_passed_through(self):
+        data = _image(320, 240, quality=30)
+        self.assertEqual(frames.normalize_frame(data), (data, "image/jpeg"))
+
+    def test_undecodable_and_oversized_frames_are_rejected(self):
+        with self.assertRaises(frames.InvalidFrameError):
+            frames.normalize_frame(b"not an image")
+        with mock.patch("home.frames.MAX_FRAME_PIXELS", 640 * 480):
+            with self.assertRaisesMessage(frames.InvalidFrameError, "too large"):
+                frames.normalize_frame(_image(1280, 720))
+
+    @mock.patch("home.views.GEMINI_API_KEY", "stub")
+    @mock.patch("home.live_assistant.ask")
+    def test_send_frame_rejects_an_undecodable_frame(self, ask):
+        response = self.client.post("/main/gemini/send_frame/", {
+            "frame": SimpleUploadedFile("frame.jpg", b"not an image", content_type="image/jpeg"),
+        })
+        self.assertEqual(response.status_code, 400)
+        ask.assert_not_called()
+
+
+def _scene(quality=90, flip=False):
+    """A JPEG camera-like frame; ``flip`` mirrors the scene."""
+    img = Image.effect_mandelbrot((320, 240), (-2.2, -1.2, 1.0, 1.2), 64).convert("RGB")
+    if flip:
+        img = img.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=quality)
+    return out.getvalue()
+
+
+class FrameDedupTests(TestCase):
+    def dedup(self, **kwargs):
+        options = {"max_distance": 6, "history": 4, "ttl_seconds": 60, "max_sessions": 10, **kwargs}
+        return frame_dedup.FrameDedup(**options)
+
+    def test_dhash_is_stable_across_re_encoding_and_differs_between_scenes(self):
+        frame_hash = frame_dedup.dhash(_scene())
+        self.assertEqual(frame_hash, frame_dedup.dhash(_scene()))
+        self.assertLessEqual(frame_dedup.hamming(frame_hash, frame_dedup.dhash(_scene(quality=40))), 6)
+        self.assertGreater(frame_dedup.hamming(frame_hash, frame_dedup.dhash(_scene(flip=True))), 6)
+
+    def test_near_duplicates_hit_within_the_session_only(self):
+        dedup = self.dedup()
+        frame_hash = frame_dedup.dhash(_scene())
+        self.assertIsNone(dedup.lookup("a", frame_hash))
+        dedup.remember("a", frame_hash, "A colourful pattern.")
+
+        self.assertEqual(dedup.lookup("a", frame_dedup.dhash(_scene(quality=40))), "A colourful pattern.")
+        self.assertIsNone(dedup.lookup("a", frame_dedup.dhash(_scene(flip=True))))
+        self.assertIsNone(dedup.lookup("b", frame_hash))
+        self.assertEqual(dedup.stats()["hits"], 1)
+        self.assertEqual(dedup.stats()["misses"], 3)
+
+    def test_expired_and_evicted_frames_miss(self):
+        dedup = self.dedup(ttl_seconds=0)
+        dedup.remember("a", 0, "stale")
+        self.assertIsNone(dedup.lookup("a", 0))
+
+        dedup = self.dedup(history=2, max_sessions=1)
+        for value in (0b1111111, 0, 0b11111110000000):
+            dedup.remember("a", value, f"frame {value}")
+        self.assertIsNone(dedup.lookup("a", 0b1111111))  # pushed out of the history
+        self.assertEqual(dedup.lookup("a", 0), "frame 0")
+        dedup.remember("b", 0, "other session")
+        self.assertIsNone(dedup.lookup("a", 0))  # least recently used session dropped
+        self.assertEqual(dedup.stats()["sessions"], 1)
+
+    @mock.patch("home.live_assistant.providers.complete", return_value=providers.Completion("A pattern.", "gemini"))
+    def test_repeated_frame_skips_the_model_unless_asked_a_question(self, complete):
+        with mock.patch("home.live_assistant.get_frame_dedup", return_value=self.dedup()):
+            first = live_assistant.answer_frame("session", (_scene(), "image/jpeg"))
+            again = live_assistant.answer_frame("session", (_scene(quality=40), "image/jpeg"))
+            asked = live_assistant.answer_frame("session", (_scene(), "image/jpeg"), question="Is it safe?")
+        self.assertEqual(first, ({"reply": "A pattern."}, 200))
+        self.assertEqual(again, ({"reply": "A pattern.", "cached": True}, 200))
+        self.assertEqual(asked, ({"reply": "A pattern."}, 200))
+        self.assertEqual(complete.call_count, 2)
+
+
+class FakeProvider:
+    configured = True
+    model = "fake"
+    timeout = 5
+
+    def __init__(self, name, delay, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def accepts(self, messages):
+        return True
+
+    async def acomplete(self, messages, pooled):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return providers.Completion(f"from {self.name}", self.name)
+
+
+@override_settings(
+    LLM_ROUTES={"chat": ["primary", "hedge"]}, LLM_HEDGING_ENABLED=True, LLM_HEDGE_INITIAL_DELAY_SECONDS=0.05,
+    LLM_HEDGE_MIN_DELAY_SECONDS=0.01, LLM_LATENCY_MIN_SAMPLES=5,
+)
+class ProviderHedgingTests(TestCase):
+    MESSAGES = [{"role": "user", "content": "Hello"}]
+
+    def route(self, primary, hedge):
+        router = providers.Router({"primary": primary, "hedge": hedge})
+        return router, asyncio.run(router.acomplete("chat", self.MESSAGES))
+
+    def test_slow_primary_is_hedged(self):
+        before = metrics.HEDGED_REQUESTS.value(route="chat", winner="hedge")
+        router, completion = self.route(FakeProvider("primary", 1), FakeProvider("hedge", 0))
+        self.assertEqual(completion.provider, "hedge")
+        self.assertEqual(metrics.HEDGED_REQUESTS.value(route="chat", winner="hedge") - before, 1)
+        # The cancelled primary still reports how long it had been running.
+        self.assertGreaterEqual(router.tracker("chat", router.providers["primary"]).quantile(1), 0.05)
+
+    def test_fast_primary_is_not_hedged(self):
+        hedge = FakeProvider("hedge", 0)
+        _, completion = self.route(FakeProvider("primary", 0), hedge)
+        self.assertEqual((completion.provider, hedge.calls), ("primary", 0))
+
+    def test_failed_primary_is_hedged_at_once_and_its_error_kept(self):
+        error = openai.error.APIError("primary down")
+        _, completion = self.route(FakeProvider("primary", 0, error), FakeProvider("hedge", 0))
+        self.assertEqual(completion.provider, "hedge")
+        with self.assertRaises(openai.error.APIError):
+            self.route(FakeProvider("primary", 0, error), FakeProvider("hedge", 0, ValueError("hedge down")))
+
+    def test_hedge_delay_follows_recent_latency(self):
+        primary = FakeProvider("primary", 0)
+        router = providers.Router({"primary": primary, "hedge": FakeProvider("hedge", 0)})
+        self.assertEqual(router.hedge_delay("chat", primary), 0.05)
+        for seconds in (0.1, 0.2, 0.3, 0.4, 2.0):
+            router.tracker("chat", primary).observe(seconds)
+        self.assertEqual(router.hedge_delay("chat", primary), 2.0)
+        for _ in range(5):
+            router.tracker("chat", primary).observe(10.0)
+        self.assertEqual(router.hedge_delay("chat", primary), primary.timeout)
+
+    def test_requests_are_translated_per_provider(self):
+        messages = [
+            {"role": "system", "content": "Be brief."},
+            {"role": "assistant", "content": "Hi!"},
+            {"role": "user", "content": ["What is this?", (b"jpeg", "image/jpeg")]},
+        ]
+        contents, system = providers.GeminiProvider("gemini-test", 5, 1)._request(messages)
+        self.assertEqual(system, "Be brief.")
+        self.assertEqual([turn["role"] for turn in contents], ["model", "user"])
+        self.assertEqual(contents[1]["parts"][1], {"inline_data": {"mime_type": "image/jpeg", "data": "anBlZw=="}})
+
+        openai_provider = providers.OpenAIProvider("gpt-test", 5)
+        self.assertEqual(openai_provider._message(messages[2])["content"][1]["image_url"]["url"],
+                         "data:image/jpeg;base64,anBlZw==")
+        self.assertFalse(openai_provider.accepts([{"role": "user", "content": [(b"webm", "audio/webm")]}]))
+
+
+class MetricsTests(HotPathTestCase):
+    def test_metrics_are_staff_only(self):
+        response = self.client.get("/main/metrics/")
+        self.assertEqual(response.status_code, 302)
+
+    @mock.patch("home.llm.openai.ChatCompletion.acreate", new_callable=mock.AsyncMock)
+    def test_chat_turn_is_timed_and_its_usage_counted(self, acreate):
+        acreate.return_value = {
+            **_completion("Try a short walk."),
+            "model": "gpt-4o-mini",
+            "usage": {"prompt_tokens": 120, "completion_tokens": 9},
+        }
+        before = metrics.OPENAI_TOKENS.value(model="gpt-4o-mini", type="prompt")
+        self.client.get("/main/chat/", {"message": "Can I eat mango?", "lang": "en"})
+        self.assertEqual(metrics.OPENAI_TOKENS.value(model="gpt-4o-mini", type="prompt") - before, 120)
+
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.client.get("/main/metrics/")
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        body = response.content.decode()
+        self.assertIn('gynac_http_request_duration_seconds_count{view="chat",method="GET",status="200"}', body)
+        self.assertIn('gynac_stage_duration_seconds_count{stage="db"}', body)
+        self.assertIn('gynac_stage_duration_seconds_count{stage="openai"}', body)
+        self.assertIn('gynac_upstream_requests_total{upstream="openai",outcome="ok"}', body)
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite only")
+class SQLiteTuningTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_connection_pragmas(self):
+        self.assertEqual(self.pragma("busy_timeout"), 5000)
+        self.assertEqual(self.pragma("synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma("cache_size"), -20000)
+
+    def test_journal_mode_is_set_by_the_migration_not_on_connect(self):
+        path = os.path.join(tempfile.mkdtemp(), "db.sqlite3")
+        wrapper = type(connections["default"])({**connection.settings_dict, "NAME": path}, alias="journal_mode_test")
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "delete")
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)  # the per-connection hook still ran
+
+        migration = import_module("home.migrations.0013_sqlite_journal_mode")
+        migration.set_journal_mode(None, SimpleNamespace(connection=wrapper))
+        with wrapper.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+
+
+@skipUnless(connection.vendor == "sqlite", "plans are asserted in SQLite's EXPLAIN QUERY PLAN format")
+class QueryPlanTests(HotPathTestCase):
+    """The hot queries must be answered from an index, without a table scan or a sort."""
+
+    def assertIndexed(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f"INDEX {index_name}", plan)
+        self.assertNotIn("SCAN", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_latest_report(self):
+        # home and login (language only), get_user_profile
+        latest = PatientReport.objects.filter(user=self.user)[:1]
+        self.assertIndexed(latest.values_list("data__language", flat=True), "patientreport_user_created_idx")
+        self.assertIndexed(latest.values_list("data", flat=True), "patientreport_user_created_idx")
+
+    def test_chat_context(self):
+        self.assertIndexed(
+            PatientReport.objects.filter(user=self.user).values("context_summary", "emergency_info")[:1],
+            "patientreport_user_created_idx",
+        )
+
+    def test_transcript_in_order(self):
+        self.assertIndexed(ChatMessage.objects.filter(user=self.user), "chatmessage_user_ts_idx")
+
+    def test_history_pages(self):
+        messages = ChatMessage.objects.filter(user=self.user)
+        self.assertIndexed(messages.order_by("-id")[:51], "chatmessage_user_id_idx")
+        self.assertIndexed(messages.filter(id__lt=100).order_by("-id")[:51], "chatmessage_user_id_idx")
+        self.assertIndexed(messages.filter(id__gt=10).order_by("id")[:51], "chatmessage_user_id_idx")
+
+    def test_daily_logs(self):
+        # log_symptom's lookup and the newest-first listing share the unique index.
+        unique_index = "home_dailylog_user_id_log_date_"
+        self.assertIndexed(DailyLog.objects.filter(user=self.user), unique_index)
+        self.assertIndexed(DailyLog.objects.filter(user=self.user, log_date=date(2026, 1, 3)), unique_index)
+        window = (date(2026, 1, 1), date(2026, 1, 31))
+        self.assertIndexed(daily_logs.entries(self.user, *window, log_type="symptom"), unique_index)
+        self.assertIndexed(daily_logs.weeks(self.user, *window), "home_dailylogweek_user_id_week_start_")
@@ -0,0 +1,147 @@
+"""
+Chat transcript writes, optionally write-behind.
+
+By default every message is its own ``INSERT`` (and, on SQLite, its own
+write transaction on the database-wide write lock). With
+``CHAT_WRITE_BEHIND_ENABLED`` rows are collected in a per-process buffer and
+written with one ``bulk_create`` when ``CHAT_WRITE_BEHIND_MAX_ROWS`` are
+waiting or every ``CHAT_WRITE_BEHIND_FLUSH_SECONDS``, and once more at
+process exit (and on ASGI lifespan shutdown).
+
+- Call ``flush()`` before reading or deleting ``ChatMessage`` rows that may
+  still be buffered; ``get_chat_history`` does, so a user always reads their
+  own writes from the process that took them. With several worker processes
+  that only holds if a user's requests stay on one process.
+- ``pending(user_id)`` lists a user's rows that are not readable from the
+  database yet, for callers that only need their content (``home.memory``).
+- ``timestamp`` is ``auto_now_add``, so buffered rows are stamped when they
+  are written, at most one flush interval late. Order is preserved.
+- A full buffer is flushed by the caller that filled it, so the buffer never
+  grows past its bound.
+"""
+import atexit
+import threading
+import traceback
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from .models import ChatMessage
+
+
+class TranscriptBuffer:
+    def __init__(self, max_rows, flush_seconds):
+        self.max_rows = max_rows
+        self.flush_seconds = flush_seconds
+        self.flushes = 0
+        self.rows_written = 0
+        self._rows = []
+        self._inflight = []  # taken by the running flush, not committed yet
+        self._lock = threading.Lock()
+        # Serializes flushes so rows are inserted in the order they were added.
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="transcript-flush", daemon=True)
+        self._thread.start()
+
+    def add(self, message):
+        """Buffer ``message``; return True if the buffer is now full."""
+        with self._lock:
+            self._rows.append(message)
+            return len(self._rows) >= self.max_rows
+
+    def flush(self):
+        """Write every buffered row; return how many were written."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                self._inflight = rows
+            if not rows:
+                return 0
+            try:
+                ChatMessage.objects.bulk_create(rows)
+            except Exception:
+                with self._lock:
+                    self._rows[:0] = rows
+                    self._inflight = []
+                raise
+            with self._lock:
+                self._inflight = []
+            self.flushes += 1
+            self.rows_written += len(rows)
+            return len(rows)
+
+    def pending(self, user_id):
+        """``(role, content)`` of ``user_id``'s unwritten rows, oldest first."""
+        with self._lock:
+            rows = self._inflight + self._rows
+        return [(m.role, m.content) for m in rows if m.user_id == user_id]
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception:
+                # The rows were put back; the next tick retries them.
+                traceback.print_exc()
+            finally:
+                connection.close()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """The process-wide buffer, or ``None`` when write-behind is off."""
+    global _buffer
+    if not settings.CHAT_WRITE_BEHIND_ENABLED:
+        return None
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = TranscriptBuffer(
+                    max_rows=settings.CHAT_WRITE_BEHIND_MAX_ROWS,
+                    flush_seconds=settings.CHAT_WRITE_BEHIND_FLUSH_SECONDS,
+                )
+                atexit.register(_buffer.stop)
+    return _buffer
+
+
+def record(user, role, content):
+    buffer = get_buffer()
+    if buffer is None:
+        ChatMessage.objects.create(user=user, role=role, content=content)
+    elif buffer.add(ChatMessage(user=user, role=role, content=content)):
+        buffer.flush()
+
+
+async def arecord(user, role, content):
+    buffer = get_buffer()
+    if buffer is None:
+        await ChatMessage.objects.acreate(user=user, role=role, content=content)
+    elif buffer.add(ChatMessage(user=user, role=role, content=content)):
+        await sync_to_async(buffer.flush)()
+
+
+def pending(user_id):
+    """``user_id``'s rows that are still buffered; always empty when write-behind is off."""
+    if _buffer is None:
+        return []
+    return _buffer.pending(user_id)
+
+
+def flush():
+    """Write any buffered rows now; a no-op when write-behind is off."""
+    if _buffer is not None:
+        _buffer.flush()
+
+
+async def aflush():
+    if _buffer is not None:
+        await sync_to_async(_buffer.flush)()
@@ -9,8 +9,13 @@ urlpatterns = [
     path('clear-all-chat-history/', views.clear_all_chat_history, name='clear_all_chat_history'),
     path('get-user-profile/', views.get_user_profile, name='get_user_profile'),
     path('log-symptom/', views.log_symptom, name='log_symptom'),
+    path('daily-logs/', views.daily_log_entries, name='daily_log_entries'),
+    path('daily-logs/weekly/', views.daily_log_weeks, name='daily_log_weeks'),
+    path('profile-setup-status/', views.profile_setup_status, name='profile_setup_status'),
+    path('metrics/', views.metrics_view, name='metrics'),
 
     path('gemini/', views.gemini, name='gemini'),
     path('gemini/send_frame/', views.send_frame, name='send_frame'),
     path('gemini/send_audio/', views.send_audio, name='send_audio'),
+    path('gemini/frame-dedup-stats/', views.frame_dedup_stats, name='frame_dedup_stats'),
 ]
\ No newline at end of file
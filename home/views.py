@@ -1,51 +1,48 @@
 import base64
 import json
 import re
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db.models import Count, Max
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-import requests
 import os
 from dotenv import load_dotenv
 import openai
-import PyPDF2
-import io
 import traceback
 
-from PIL import Image as PilImage  # kept for completeness
-from .models import PatientReport, ChatMessage, DailyLog
+from . import daily_logs, jobs, live_assistant, llm, memory, metrics, pdf_text, providers, transcript
+from .compression import compress_response
+from .models import (
+    BackgroundJob, PatientReport, PatientReportText, ChatMessage, ConversationMemory, DailyLog, DailyLogWeek,
+    latest_report_language,
+)
+from .frame_dedup import get_frame_dedup
+from .frames import InvalidFrameError
+from .profile_setup import PROFILE_SETUP_JOB, run_profile_setup
+from .red_flags import find_red_flag
+from .reply_cache import get_reply_cache, make_key as make_reply_cache_key
 
 load_dotenv()
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-_RED_FLAG_KEYWORDS = [
-    "no movement", "less movement", "not moving", "haven't felt the baby",
-    "bleeding", "spotting", "gush of fluid", "water broke",
-    "severe headache", "blurry vision", "seeing spots",
-    "intense pain", "severe cramp", "unbearable pain", "constant contraction"
-]
-
 # ------------------------------
 # CORE VIEWS (preserved)
 # ------------------------------
 @csrf_exempt
 @login_required
 def home(request):
-    latest_report = PatientReport.objects.filter(user=request.user).first()
-
-    language = None
-    if latest_report is not None:
-        language = latest_report.data.get("language")
-
-        if language is not None:
-            return render(request, 'index.html')
-        else:
-            return redirect("/main/details")
-    else:
-        return redirect("/main/details")
+    if latest_report_language(request.user) is not None:
+        return render(request, 'index.html')
+    return redirect("/main/details")
 
 
 @login_required
@@ -108,79 +105,30 @@ def pregnancy_details_view(request):
                 pass
         form_data["weeks_pregnant"] = weeks_pregnant
 
-        # === STEP 2: FILES ===
+        # === STEP 2: SAVE PROFILE ===
+        # The AI analysis and the extracted report text (PatientReportText) are
+        # filled in by the background job below; the profile itself is usable
+        # straight away.
+        report_data = {"type": "pregnancy", **form_data, "analysis": ""}
+        report, _ = PatientReport.objects.update_or_create(user=request.user, defaults={'data': report_data})
+        PatientReportText.objects.filter(report=report).delete()
+        transcript.flush()
+        ChatMessage.objects.filter(user=request.user).delete()  # Clear old messages
+        ConversationMemory.objects.filter(user=request.user).delete()
+
+        # === STEP 3: PDF EXTRACTION + AI ANALYSIS (background) ===
+        # The runner posts the welcome ChatMessage when it finishes; the
+        # dashboard polls profile_setup_status until then.
         sonography_report_file = request.FILES.get("sonographyReport")
         blood_report_file = request.FILES.get("bloodReport")
-        
-        extracted_text_from_sonography = ""
-        if sonography_report_file:
-            try:
-                reader = PyPDF2.PdfReader(io.BytesIO(sonography_report_file.read()))
-                extracted_text_from_sonography = "\n".join(
-                    page.extract_text() for page in reader.pages if page.extract_text()
-                )
-            except Exception as e:
-                extracted_text_from_sonography = f"Error processing sonography PDF: {e}"
-
-        extracted_text_from_blood_report = ""
-        if blood_report_file:
-            try:
-                reader = PyPDF2.PdfReader(io.BytesIO(blood_report_file.read()))
-                extracted_text_from_blood_report = "\n".join(
-                    page.extract_text() for page in reader.pages if page.extract_text()
-                )
-            except Exception as e:
-                extracted_text_from_blood_report = f"Error processing blood report PDF: {e}"
-
-        # === STEP 3: AI ANALYSIS ===
-        user_provided_summary = f"""
-        - Patient is {weeks_pregnant} weeks pregnant.
-        - DOB: {form_data.get('dob')}. Conditions: {', '.join([k for k, v in form_data.get('conditions', {}).items() if v]) or 'None'}.
-        - Vitals: Current Weight {form_data.get('vitals', {}).get('currentWeight')}kg, Height {form_data.get('vitals', {}).get('height')}cm.
-        - Allergies: Drug: {form_data.get('allergies',{}).get('drug') or 'None'}, Food: {form_data.get('allergies',{}).get('food') or 'None'}.
-        """
-        cleaned_response = "Could not generate AI analysis."
-        try:
-            full_context_for_ai = (
-                f"### User Profile:\n{user_provided_summary}\n\n"
-                f"### Sonography Report Text:\n{extracted_text_from_sonography}\n\n"
-                f"### Blood Report Text:\n{extracted_text_from_blood_report}"
-            )
-
-            prompt = (
-                "Analyze the following patient profile and lab reports. Provide a concise, 2 line summary "
-                "highlighting key findings, potential concerns, and topics to discuss with a doctor. "
-                "Be empathetic and professional."
-            )
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are an expert obstetrics assistant AI."},
-                    {"role": "user", "content": f"{prompt}\n\n--- DATA ---\n{full_context_for_ai}"}
-                ]
-            )
-            ai_analysis = response["choices"][0]["message"]["content"]
-            cleaned_response = re.sub(r"[\*#]+", "", ai_analysis).strip()
-        except Exception as e:
-            cleaned_response = f"An error occurred during AI analysis: {e}"
-
-        # === STEP 4: SAVE ===
-        report_data = {
-            "type": "pregnancy",
-            **form_data,
-            "extracted_sonography_report_content": extracted_text_from_sonography,
-            "extracted_blood_report_content": extracted_text_from_blood_report,
-            "analysis": cleaned_response,
-        }
-        PatientReport.objects.update_or_create(user=request.user, defaults={'data': report_data})
-
-        bot_message_content = (
-            "Thank you for setting up your profile. Based on the information and reports provided, "
-            "here is a quick summary:\n\n"
-            f"{cleaned_response}\n\nI am now ready to help. How are you feeling today?"
+        jobs.enqueue(
+            request.user,
+            PROFILE_SETUP_JOB,
+            run_profile_setup,
+            report.pk,
+            sonography_path=pdf_text.save_upload(sonography_report_file) if sonography_report_file else None,
+            blood_path=pdf_text.save_upload(blood_report_file) if blood_report_file else None,
         )
-        ChatMessage.objects.filter(user=request.user).delete()  # Clear old messages
-        ChatMessage.objects.create(user=request.user, role='bot', content=bot_message_content)
 
         return redirect('home')
 
@@ -188,59 +136,33 @@ def pregnancy_details_view(request):
 
 
 
-@login_required
-@csrf_exempt
-def chat(request):
-    user_input = request.GET.get("message", "").strip()
-    lang = request.GET.get("lang", "en").strip()
+async def _patient_context(user):
+    """
+    One cheap lookup of the pre-rendered context columns; ``PatientReport.data``
+    itself is never loaded on the chat path.
+    """
+    return await (
+        PatientReport.objects.filter(user=user)
+        .values("context_summary", "emergency_info")
+        .afirst()
+    )
 
-    if not user_input:
-        return JsonResponse({"reply": "No message provided."}, status=400)
 
-    # Save user's message
-    ChatMessage.objects.create(user=request.user, role='user', content=user_input)
-
-    # --- Red Flag Check (No change here, this is a good safety feature) ---
-    normalized_input = user_input.lower()
-    for keyword in _RED_FLAG_KEYWORDS:
-        if keyword in normalized_input:
-            report = PatientReport.objects.filter(user=request.user).first()
-            emergency_info = ""
-            if report and report.data:
-                contact_name = report.data.get("emergencyContact", {}).get("name")
-                hospital = report.data.get("hospitalName")
-                if hospital:
-                    emergency_info += f"\nYour registered hospital is: {hospital}."
-                if contact_name:
-                    emergency_info += f"\nYour emergency contact is {contact_name}."
-            reply = (
-                "This could be serious. Please contact your doctor immediately or visit the nearest emergency room. "
-                "Your health and your baby's health are the top priority."
-                f"{emergency_info}"
-            )
-            ChatMessage.objects.create(user=request.user, role='bot', content=reply)
-            return JsonResponse({"reply": reply, "is_alert": True})
+def _emergency_reply(patient_context):
+    emergency_info = patient_context["emergency_info"] if patient_context else ""
+    return (
+        "This could be serious. Please contact your doctor immediately or visit the nearest emergency room. "
+        "Your health and your baby's health are the top priority."
+        f"{emergency_info}"
+    )
+
 
-    # --- MODIFIED: Build a much more detailed context from the saved report data ---
-    latest_report_obj = PatientReport.objects.filter(user=request.user).first()
+def _chat_messages(user, patient_context, user_input, lang, history):
     context_summary = "No detailed patient profile available."
-    if latest_report_obj and latest_report_obj.data:
-        data = latest_report_obj.data
-        # Create a list of known conditions
-        conditions_list = [k for k, v in data.get('conditions', {}).items() if v]
-        conditions_str = ', '.join(conditions_list) or 'None'
-        
-        # Build the detailed context string
+    if patient_context and patient_context["context_summary"]:
         context_summary = (
-            f"- Patient Name: {request.user.get_full_name() or request.user.username}.\n"
-            f"- DOB: {data.get('dob', '1-1-2000')}.\n"
-            f"- Due Date: {data.get('dueDate', 'Not provided')}.\n"
-            f"- Known Medical Conditions: {conditions_str}.\n"
-            f"- Previous C-Section: {'Yes' if data.get('previousCSection') else 'No'}.\n"
-            f"- Drug Allergies: {data.get('allergies', {}).get('drug', 'None reported')}.\n"
-            f"- Food Allergies: {data.get('allergies', {}).get('food', 'None reported')}.\n"
-            f"- Doctor's Name: {data.get('doctorName', 'Not provided')}.\n"
-            f"- Location: {data.get('location', {}).get('city', 'Not provided')}."
+            f"- Patient Name: {user.get_full_name() or user.username}.\n"
+            f"{patient_context['context_summary']}"
         )
 
     # --- MODIFIED: New system prompt to force specific advice ---
@@ -255,33 +177,180 @@ def chat(request):
         f"--- End Context ---\n"
         f"Your answers should be caring, but direct and concise (2-3 sentences)."
     )
+    return [
+        {"role": "system", "content": system_prompt.strip()},
+        *history.prompt_messages(),
+        {"role": "user", "content": user_input}
+    ]
+
+
+_CHAT_FALLBACK_REPLY = "I'm having a little trouble connecting right now. Please try again in a moment."
+
+
+def _ndjson(event):
+    return json.dumps(event) + "\n"
+
+
+async def _stream_chat_reply(user, messages, pooled, cache_key=None):
+    """
+    Yields NDJSON events: ``{"delta": ...}`` per token chunk, then one
+    ``{"done": true, "reply": ...}`` once the full reply has been saved.
 
+    If the upstream stream fails, even partway, the fallback reply is saved
+    instead of the cut-off text and the last event is
+    ``{"done": true, "interrupted": true, "reply": <fallback>}``.
+    """
+    parts = []
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt.strip()},
-                {"role": "user", "content": user_input}
-            ]
+        stream = await llm.achat_completion(
+            messages=messages, model=settings.LLM_OPENAI_MODEL, pooled=pooled, stream=True
+        )
+        async for chunk in stream:
+            delta = chunk["choices"][0].get("delta", {}).get("content")
+            if delta:
+                parts.append(delta)
+                yield _ndjson({"delta": delta})
+    except Exception as e:
+        print(f"OpenAI API Error: {e}")
+        if not parts:
+            yield _ndjson({"delta": _CHAT_FALLBACK_REPLY})
+        await transcript.arecord(user, 'bot', _CHAT_FALLBACK_REPLY)
+        yield _ndjson({"done": True, "interrupted": True, "reply": _CHAT_FALLBACK_REPLY})
+        return
+
+    reply = "".join(parts)
+    if cache_key is not None:
+        get_reply_cache().set(cache_key, reply)
+    await transcript.arecord(user, 'bot', reply)
+    yield _ndjson({"done": True, "reply": reply})
+
+
+@login_required
+@csrf_exempt
+async def chat(request):
+    """
+    Async chat turn. Under ASGI the upstream OpenAI round-trip only parks this
+    coroutine, so one worker can hold many in-flight turns at once.
+
+    With ``?stream=1`` the reply is sent as NDJSON token deltas as they arrive
+    (see ``_stream_chat_reply``). Token-by-token delivery needs ASGI; under
+    WSGI Django buffers the stream and sends it in one piece.
+
+    Plain replies go through the ``chat`` provider route (home/providers.py),
+    so a slow OpenAI call can be hedged with Gemini. Streams stay on OpenAI.
+    """
+    user_input = request.GET.get("message", "").strip()
+    lang = request.GET.get("lang", "en").strip()
+    stream = request.GET.get("stream") == "1"
+
+    if not user_input:
+        return JsonResponse({"reply": "No message provided."}, status=400)
+
+    user = await request.auser()
+    patient_context = await _patient_context(user)
+
+    # --- Red Flag Check: one pass over the message for every language's keywords ---
+    if find_red_flag(user_input) is not None:
+        reply = _emergency_reply(patient_context)
+        await transcript.arecord(user, 'user', user_input)
+        await transcript.arecord(user, 'bot', reply)
+        return JsonResponse({"reply": reply, "is_alert": True})
+
+    # Recent turns and the rolling summary (home/memory.py), read before this
+    # message is saved so it isn't in the window twice.
+    history = await memory.abuild_history(user)
+    await transcript.arecord(user, 'user', user_input)
+    if history.needs_fold:
+        await sync_to_async(memory.schedule_fold)(user, history)
+
+    messages = _chat_messages(user, patient_context, user_input, lang, history)
+
+    # Opt-in reply cache, keyed on the question, the system prompt (patient
+    # context) and the language. Only a conversation's opening question is
+    # cached: once there is a summary or earlier turns, a question like "why?"
+    # depends on them. A hit is answered as plain JSON even in stream mode;
+    # sendMessage() handles both.
+    reply_cache = get_reply_cache()
+    cache_key = None
+    if reply_cache is not None and not history.messages and not history.summary:
+        cache_key = make_reply_cache_key(user_input, messages[0]["content"], lang)
+        cached_reply = reply_cache.get(cache_key)
+        if cached_reply is not None:
+            await transcript.arecord(user, 'bot', cached_reply)
+            return JsonResponse({"reply": cached_reply, "cached": True})
+
+    # Only pool connections on a long-lived ASGI loop; under WSGI every
+    # request runs on a throwaway loop (see home.llm.achat_completion).
+    pooled = isinstance(request, ASGIRequest)
+
+    if stream:
+        response = StreamingHttpResponse(
+            _stream_chat_reply(user, messages, pooled, cache_key), content_type="application/x-ndjson"
         )
-        reply = response["choices"][0]["message"]["content"]
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # keep reverse proxies from buffering the stream
+        return response
+
+    try:
+        completion = await providers.acomplete("chat", messages, pooled=pooled)
+        reply = completion.text
+        if cache_key is not None:
+            reply_cache.set(cache_key, reply)
     except Exception as e:
         # It's good practice to log the actual error
         print(f"OpenAI API Error: {e}") 
-        reply = "I'm having a little trouble connecting right now. Please try again in a moment."
+        reply = _CHAT_FALLBACK_REPLY
 
     # Save bot's reply
-    ChatMessage.objects.create(user=request.user, role='bot', content=reply)
+    await transcript.arecord(user, 'bot', reply)
     return JsonResponse({"reply": reply})
 
+PROFILE_MAX_FIELDS = 32
+_PROFILE_FIELD = re.compile(r"^\w{1,64}$")
+
+
+def _profile_etag(request):
+    # ``version`` is bumped on every save and a new report gets a new pk.
+    if not request.user.is_authenticated:
+        return None
+    report = PatientReport.objects.filter(user=request.user).values_list("pk", "version").first()
+    return f"{report[0]}-{report[1]}" if report else None
+
+
 @login_required
+@compress_response
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_profile_etag)
 def get_user_profile(request):
-    latest_report = PatientReport.objects.filter(user=request.user).first()
-    if latest_report and isinstance(latest_report.data, dict):
-        profile_data = {"name": request.user.username, **latest_report.data}
-        return JsonResponse(profile_data)
-    else:
+    """
+    The profile document, plus ``name``. ``?fields=language,dob,...`` returns
+    only those top-level keys (``null`` for a key the profile doesn't have),
+    read out of the JSON column by the database. Responses carry an ETag of
+    the report version, so an unchanged profile is answered with 304.
+    """
+    fields = None
+    if request.GET.get("fields"):
+        fields = list(dict.fromkeys(f.strip() for f in request.GET["fields"].split(",") if f.strip()))
+        if len(fields) > PROFILE_MAX_FIELDS or not all(_PROFILE_FIELD.match(f) for f in fields):
+            return JsonResponse(
+                {"error": f"fields must be at most {PROFILE_MAX_FIELDS} comma-separated key names."}, status=400
+            )
+
+    latest = PatientReport.objects.filter(user=request.user)
+    if fields is None:
+        data = latest.values_list("data", flat=True).first()
+        if not isinstance(data, dict):
+            return JsonResponse({"error": "No profile data found."}, status=404)
+        return JsonResponse({"name": request.user.username, **data})
+
+    keys = [f for f in fields if f != "name"]
+    row = latest.values_list("pk", *(f"data__{key}" for key in keys)).first()
+    if row is None:
         return JsonResponse({"error": "No profile data found."}, status=404)
+    profile_data = dict(zip(keys, row[1:]))
+    if "name" in fields:
+        profile_data["name"] = request.user.username
+    return JsonResponse({f: profile_data[f] for f in fields})
 
 
 @login_required
@@ -294,34 +363,167 @@ def log_symptom(request):
 
             if not symptom_text:
                 return JsonResponse({"status": "error", "message": "Symptom text cannot be empty."}, status=400)
-            DailyLog.objects.update_or_create(
-                user=request.user,
-                log_date=date.today(),
-                defaults={'data': {'type': 'symptom', 'text': symptom_text}}
-            )
+            daily_logs.save_entry(request.user, date.today(), {'type': 'symptom', 'text': symptom_text})
             return JsonResponse({"status": "success", "message": "Symptom logged successfully."})
         except json.JSONDecodeError:
             return JsonResponse({"status": "error", "message": "Invalid JSON."}, status=400)
     return JsonResponse({"status": "error", "message": "Invalid request method."}, status=405)
 
 
+DAILY_LOG_DEFAULT_DAYS = 30
+DAILY_LOG_WEEKS_DEFAULT_DAYS = 42 * 7  # a whole pregnancy
+DAILY_LOG_MAX_DAYS = 2 * 366
+
+
+def _log_window(request, default_days):
+    """``(start, end)`` from ``?start=`` / ``?end=`` (ISO dates, inclusive); raises ValueError."""
+    end = date.fromisoformat(request.GET["end"]) if request.GET.get("end") else date.today()
+    start = end - timedelta(days=default_days - 1)
+    if request.GET.get("start"):
+        start = date.fromisoformat(request.GET["start"])
+    if start > end or (end - start).days >= DAILY_LOG_MAX_DAYS:
+        raise ValueError("bad window")
+    return start, end
+
+
+_LOG_WINDOW_ERROR = f"start and end must be ISO dates, start <= end, at most {DAILY_LOG_MAX_DAYS} days apart."
+
+
+@login_required
+def daily_log_entries(request):
+    """
+    The user's daily log entries from ``start`` to ``end`` (default: the last
+    30 days), oldest first, optionally only those of one ``type``.
+    """
+    try:
+        start, end = _log_window(request, DAILY_LOG_DEFAULT_DAYS)
+    except ValueError:
+        return JsonResponse({"error": _LOG_WINDOW_ERROR}, status=400)
+    log_type = request.GET.get("type") or None
+    entries = [
+        {"date": log["log_date"].isoformat(), "data": log["data"]}
+        for log in daily_logs.entries(request.user, start, end, log_type)
+    ]
+    return JsonResponse({"start": start.isoformat(), "end": end.isoformat(), "type": log_type, "entries": entries})
+
+
+@login_required
+def daily_log_weeks(request):
+    """
+    Weekly rollups (Monday-start calendar weeks) overlapping ``start`` to
+    ``end`` (default: the last 42 weeks): days logged per week and per log
+    type. With ``type``, ``count`` is that type's days. Weeks without any
+    entries are omitted.
+    """
+    try:
+        start, end = _log_window(request, DAILY_LOG_WEEKS_DEFAULT_DAYS)
+    except ValueError:
+        return JsonResponse({"error": _LOG_WINDOW_ERROR}, status=400)
+    log_type = request.GET.get("type") or None
+    weeks = []
+    for week in daily_logs.weeks(request.user, start, end):
+        row = {"week_start": week["week_start"].isoformat(), "days_logged": week["days_logged"], "counts": week["counts"]}
+        if log_type:
+            row["count"] = week["counts"].get(log_type, 0)
+        weeks.append(row)
+    return JsonResponse({"start": start.isoformat(), "end": end.isoformat(), "type": log_type, "weeks": weeks})
+
+
+CHAT_HISTORY_PAGE_SIZE = 50
+CHAT_HISTORY_MAX_PAGE_SIZE = 200
+
+
+def _chat_history_etag(request):
+    # Messages are only ever added or deleted, so (count, newest id) changes
+    # whenever any page of the history could have.
+    if not request.user.is_authenticated:
+        return None
+    transcript.flush()  # read-your-writes when transcript writes are buffered
+    stats = ChatMessage.objects.filter(user=request.user).aggregate(count=Count("id"), newest=Max("id"))
+    if not stats["count"]:
+        # An empty history is answered with a welcome line if a report exists.
+        return f"0-0-{int(PatientReport.objects.filter(user=request.user).exists())}"
+    return f"{stats['count']}-{stats['newest']}"
+
+
 @login_required
 @csrf_exempt
+@compress_response
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_chat_history_etag)
 def get_chat_history(request):
-    messages = ChatMessage.objects.filter(user=request.user).order_by('timestamp')
-    history = [{'who': msg.role, 'text': msg.content} for msg in messages]
-    if not history and PatientReport.objects.filter(user=request.user).exists():
+    """
+    One page of the user's chat, oldest message first.
+
+    - no cursor: the newest ``limit`` messages
+    - ``before=<id>``: the ``limit`` messages before that one (scrolling back)
+    - ``since=<id>``: up to ``limit`` messages after that one (catching up)
+
+    ``has_more`` says whether another page exists in the same direction. The
+    response carries an ETag, so an unchanged history is answered with 304.
+    """
+    try:
+        limit = int(request.GET.get("limit") or CHAT_HISTORY_PAGE_SIZE)
+        before = int(request.GET["before"]) if request.GET.get("before") else None
+        since = int(request.GET["since"]) if request.GET.get("since") else None
+    except ValueError:
+        return JsonResponse({"error": "limit, before and since must be integers."}, status=400)
+    limit = min(max(limit, 1), CHAT_HISTORY_MAX_PAGE_SIZE)
+
+    messages = ChatMessage.objects.filter(user=request.user).values("id", "role", "content")
+    if since is not None:
+        page = list(messages.filter(id__gt=since).order_by("id")[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+    else:
+        if before is not None:
+            messages = messages.filter(id__lt=before)
+        page = list(messages.order_by("-id")[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit][::-1]
+
+    history = [{'id': msg['id'], 'who': msg['role'], 'text': msg['content']} for msg in page]
+    if not history and before is None and since is None and PatientReport.objects.filter(user=request.user).exists():
         history.append({'who': 'bot', 'text': "Welcome back! How can I help you today?"})
-    return JsonResponse({"history": history})
+    return JsonResponse({
+        "history": history,
+        "has_more": has_more,
+        "oldest_id": page[0]['id'] if page else None,
+        "newest_id": page[-1]['id'] if page else None,
+    })
+
+
+@login_required
+def profile_setup_status(request):
+    """Status of the user's latest profile-setup job, for the dashboard to poll."""
+    job = BackgroundJob.objects.filter(user=request.user, kind=PROFILE_SETUP_JOB).first()
+    if job is None:
+        return JsonResponse({"error": "No profile setup job found."}, status=404)
+    return JsonResponse({
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "error": job.error,
+        "updated_at": job.updated_at.isoformat(),
+    })
+
+
+@staff_member_required
+def metrics_view(request):
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 
 @login_required
 @csrf_exempt
 def clear_all_chat_history(request):
     if request.method == "POST":
+        BackgroundJob.objects.filter(user=request.user).delete()
         PatientReport.objects.filter(user=request.user).delete()
+        transcript.flush()
         ChatMessage.objects.filter(user=request.user).delete()
+        ConversationMemory.objects.filter(user=request.user).delete()
         DailyLog.objects.filter(user=request.user).delete()
+        DailyLogWeek.objects.filter(user=request.user).delete()
         return JsonResponse({"status": "success", "message": "All user data cleared."})
 
 # =========================================================================
@@ -330,17 +532,80 @@ def clear_all_chat_history(request):
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+
 def gemini(request):
     return render(request, 'geminiBot.html')
 
+
+@staff_member_required
+def frame_dedup_stats(request):
+    dedup = get_frame_dedup()
+    if dedup is None:
+        return JsonResponse({"enabled": False})
+    return JsonResponse({"enabled": True, **dedup.stats()})
+
+
+def _decode_media_string(value):
+    """Split a data URL (or bare base64 string) into ``(bytes, mime type or None)``."""
+    if value.startswith("data:") and "," in value:
+        header, b64 = value.split(",", 1)
+        return base64.b64decode(b64), header.split(";")[0].replace("data:", "") or None
+    return base64.b64decode(value), None
+
+
+def _read_media_request(request, media_fields):
+    """
+    Read a Gemini endpoint's payload, sent in any of three encodings:
+
+    - ``multipart/form-data``: one file part per media field, other fields as
+      form values. The part's content type is the media's mime type.
+    - ``application/octet-stream``: the raw bytes of the first media field as
+      the body, its mime type and any other fields in the query string.
+    - JSON (the original format): each media field as a data URL or bare
+      base64 string.
+
+    ``media_fields`` maps each media field name to ``(mime_type_key,
+    default_mime)``. Returns ``(media, fields)``: ``media`` maps the fields
+    that were sent to ``(bytes, mime type)``; ``fields`` holds the text values.
+    """
+    content_type = request.content_type
+    media = {}
+
+    if content_type == "multipart/form-data":
+        fields = request.POST
+        for name, (mime_key, default_mime) in media_fields.items():
+            upload = request.FILES.get(name)
+            if upload:
+                mime = fields.get(mime_key) or upload.content_type
+                if not mime or mime == "application/octet-stream":
+                    mime = default_mime
+                media[name] = (upload.read(), mime)
+    elif content_type == "application/octet-stream":
+        fields = request.GET
+        name, (mime_key, default_mime) = next(iter(media_fields.items()))
+        if request.body:
+            media[name] = (request.body, fields.get(mime_key) or default_mime)
+    else:
+        fields = json.loads(request.body or "{}")
+        for name, (mime_key, default_mime) in media_fields.items():
+            value = fields.get(name)
+            if value:
+                data, mime = _decode_media_string(value)
+                media[name] = (data, mime or fields.get(mime_key) or default_mime)
+
+    return media, fields
+
+
 @csrf_exempt
 def send_frame(request):
     """
     Gemini Vision endpoint.
-    - Always expects an image (data URL or raw base64) in "frame".
+    - Always expects an image in "frame".
     - Optionally accepts:
-        * "audio": data URL (audio/webm or audio/wav) to ask a spoken question
+        * "audio": audio/webm or audio/wav recording of a spoken question
         * "question": plain text question
+    Media can be uploaded as multipart files, as a raw octet-stream frame, or
+    as data URLs / base64 in a JSON body (see ``_read_media_request``).
     The model will answer ABOUT THIS IMAGE using the provided question (audio or text).
     If neither audio nor text question is given, it returns a brief 1–2 line description.
     """
@@ -348,87 +613,24 @@ def send_frame(request):
         return JsonResponse({"reply": "Error: GEMINI_API_KEY not configured on the server."}, status=500)
 
     try:
-        data = json.loads(request.body or "{}")
-
-        # ---- image ----
-        frame = data.get("frame", "")
-        if not frame:
+        try:
+            media, data = _read_media_request(request, {
+                "frame": ("mime_type", "image/jpeg"),
+                "audio": ("audio_mime_type", "audio/webm"),
+            })
+        except ValueError as e:
+            return JsonResponse({"reply": f"Invalid request body: {e}"}, status=400)
+
+        if "frame" not in media:
             return JsonResponse({"reply": "Missing 'frame'."}, status=400)
-
-        if "," in frame and frame.startswith("data:"):
-            header, img_b64 = frame.split(",", 1)
-            img_mime = header.split(";")[0].replace("data:", "") or "image/jpeg"
-        else:
-            img_b64 = frame
-            img_mime = data.get("mime_type", "image/jpeg")
-
-        # ---- optional audio question ----
-        audio_b64, audio_mime = None, None
-        audio = data.get("audio")
-        if audio:
-            if "," in audio and audio.startswith("data:"):
-                aheader, audio_b64 = audio.split(",", 1)
-                audio_mime = aheader.split(";")[0].replace("data:", "") or "audio/webm"
-            else:
-                audio_b64 = audio
-                audio_mime = data.get("audio_mime_type", "audio/webm")
-
-        # ---- optional text question ----
         user_q = (data.get("question") or "").strip()
-
-        # ---- prompt ----
-        base = (
-            "You are Shrishti.ai, an empathetic pregnancy companion.\n"
-            "Use the image and any provided user question (audio or text) to answer briefly.\n"
-            "- If there IS a user question: answer it in 1 sentences grounded in the image.\n"
-            "- If there is NO question: give a 1 line friendly description of what's in the image. Ask Question.\n"
-        )
-
-        # ---- build parts ----
-        parts = [{"text": base}]
-        parts.append({"inline_data": {"mime_type": img_mime, "data": img_b64}})  # image first
-        if audio_b64:
-            parts.append({"inline_data": {"mime_type": audio_mime, "data": audio_b64}})
-        if user_q:
-            parts.append({"text": f"User question: {user_q}"})
-
-        GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
-        url = (
-            f"https://generativelanguage.googleapis.com/"
-            f"v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
-        )
-
-        payload = {"contents": [{"role": "user", "parts": parts}]}
-
-        resp = requests.post(url, json=payload, timeout=60)
         try:
-            resp.raise_for_status()
-        except requests.exceptions.HTTPError as http_err:
-            extra = ""
-            try:
-                j = resp.json()
-                extra = f" - {j}"
-            except Exception:
-                pass
-            msg = (
-                f"HTTP error occurred: {http_err}{extra}\n"
-                "Tip: Set GEMINI_MODEL to a listed model (e.g., 'gemini-2.0-flash', 'gemini-2.5-flash-lite'). "
-                "Verify via: GET https://generativelanguage.googleapis.com/v1beta/models?key=YOUR_KEY"
+            payload, status = live_assistant.answer_frame(
+                request.session.session_key, media["frame"], media.get("audio"), user_q
             )
-            return JsonResponse({"reply": msg}, status=500)
-
-        data_json = resp.json()
-        text = (
-            data_json.get("candidates", [{}])[0]
-            .get("content", {})
-            .get("parts", [{}])[0]
-            .get("text", "")
-        )
-
-        if not text:
-            return JsonResponse({"reply": "Received response but no text was returned.", "raw": data_json}, status=200)
-
-        return JsonResponse({"reply": text})
+        except InvalidFrameError as e:
+            return JsonResponse({"reply": f"Invalid frame: {e}"}, status=400)
+        return JsonResponse(payload, status=status)
 
     except Exception as e:
         traceback.print_exc()
@@ -439,75 +641,22 @@ def send_frame(request):
 def send_audio(request):
     """
     Kept for standalone audio → text use cases (chat/mic card).
+    Accepts "audio" in the same encodings as ``send_frame``.
     """
     if not GEMINI_API_KEY:
         return JsonResponse({"reply": "Error: GEMINI_API_KEY not configured on the server."}, status=500)
 
     try:
-        data = json.loads(request.body or "{}")
-        audio = data.get("audio", "")
-        user_hint = (data.get("hint") or "").strip()
-
-        if "," in audio and audio.startswith("data:"):
-            header, b64 = audio.split(",", 1)
-            mime_type = header.split(";")[0].replace("data:", "") or "audio/webm"
-        else:
-            b64 = audio
-            mime_type = data.get("mime_type", "audio/webm")
-
-        base_prompt = (
-            "You are Shrishti.ai, an empathetic pregnancy companion. "
-            "Listen to the user's audio. If they asked a question, answer it in 1-2 sentences. "
-            "If it's general speech, summarize it in one friendly line and ask a gentle follow-up. "
-        )
-        if user_hint:
-            base_prompt += f"\nUser hint: {user_hint}"
-
-        GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
-        url = (
-            f"https://generativelanguage.googleapis.com/"
-            f"v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
-        )
-
-        payload = {
-            "contents": [{
-                "role": "user",
-                "parts": [
-                    {"text": base_prompt},
-                    {"inline_data": {"mime_type": mime_type, "data": b64}}
-                ]
-            }]
-        }
-
-        resp = requests.post(url, json=payload, timeout=60)
         try:
-            resp.raise_for_status()
-        except requests.exceptions.HTTPError as http_err:
-            extra = ""
-            try:
-                j = resp.json()
-                extra = f" - {j}"
-            except Exception:
-                pass
-            msg = (
-                f"HTTP error occurred: {http_err}{extra}\n"
-                "Tip: If you get 404, set GEMINI_MODEL to a listed model "
-                "(e.g., 'gemini-2.0-flash' or 'gemini-2.5-flash-lite') and verify with GET /v1beta/models."
-            )
-            return JsonResponse({"reply": msg}, status=500)
-
-        data_json = resp.json()
-        text = (
-            data_json.get("candidates", [{}])[0]
-            .get("content", {})
-            .get("parts", [{}])[0]
-            .get("text", "")
-        )
+            media, data = _read_media_request(request, {"audio": ("mime_type", "audio/webm")})
+        except ValueError as e:
+            return JsonResponse({"reply": f"Invalid request body: {e}"}, status=400)
 
-        if not text:
-            return JsonResponse({"reply": "Received response but no text was returned.", "raw": data_json}, status=200)
-
-        return JsonResponse({"reply": text})
+        if "audio" not in media:
+            return JsonResponse({"reply": "Missing 'audio'."}, status=400)
+        user_hint = (data.get("hint") or "").strip()
+        payload, status = live_assistant.answer_audio(media["audio"], user_hint)
+        return JsonResponse(payload, status=status)
 
     except Exception as e:
         traceback.print_exc()